@@ -13,6 +13,7 @@ from dotenv import load_dotenv
 from custom_range_query import get_custom_range_metrics
 from claiming_custom_range_query import get_custom_range_metrics as get_claiming_custom_range_metrics
 from top_claimers_query import get_top_claimers, format_claimer_data
+from modules.compact_storage import blob_to_hex
 
 # Load environment variables
 load_dotenv('.env.local')  # Load local environment first
@@ -331,7 +332,7 @@ async def select_raffle_winner(request: dict):
                 from_address,
                 timestamp,
                 n_cards
-            FROM betting_transactions 
+            FROM betting_transactions_v 
             WHERE timestamp BETWEEN ? AND ?
             ORDER BY timestamp ASC
         """, [query_start, query_end])
@@ -347,7 +348,7 @@ async def select_raffle_winner(request: dict):
         # Debug: Run the same query as our manual test
         cursor.execute("""
             SELECT COUNT(*) as total_submissions, 
-                   COUNT(DISTINCT from_address) as distinct_users, 
+                   COUNT(DISTINCT wallet_id) as distinct_users, 
                    SUM(n_cards) as sum_of_n_cards 
             FROM betting_transactions 
             WHERE timestamp BETWEEN ? AND ?
@@ -359,7 +360,7 @@ async def select_raffle_winner(request: dict):
         # Also check with the exact format from our manual query
         cursor.execute("""
             SELECT COUNT(*) as total_submissions, 
-                   COUNT(DISTINCT from_address) as distinct_users, 
+                   COUNT(DISTINCT wallet_id) as distinct_users, 
                    SUM(n_cards) as sum_of_n_cards 
             FROM betting_transactions 
             WHERE timestamp BETWEEN '2025-07-01T00:00:00' AND '2025-07-02T23:59:59'
@@ -375,7 +376,7 @@ async def select_raffle_winner(request: dict):
                 from_address,
                 timestamp,
                 n_cards
-            FROM betting_transactions 
+            FROM betting_transactions_v 
             WHERE timestamp BETWEEN ? AND ?
             ORDER BY timestamp ASC
         """, [query_start, query_end])
@@ -429,7 +430,7 @@ async def select_raffle_winner(request: dict):
                 bet_id,
                 block_number
             FROM betting_transactions 
-            WHERE from_address = ? 
+            WHERE wallet_id = (SELECT id FROM wallets WHERE address = ?) 
             AND timestamp BETWEEN ? AND ?
             ORDER BY timestamp DESC
             LIMIT 10
@@ -442,7 +443,7 @@ async def select_raffle_winner(request: dict):
         for tx in winner_transactions:
             tx_hash, timestamp, token, amount, n_cards, bet_id, block_number = tx
             formatted_transactions.append({
-                "tx_hash": tx_hash,
+                "tx_hash": blob_to_hex(tx_hash),
                 "timestamp": timestamp,
                 "token": token,
                 "amount": amount,
@@ -457,7 +458,7 @@ async def select_raffle_winner(request: dict):
         result = {
             "winner": {
                 "bet_id": winner_bet_id,
-                "wallet_address": winner_address,
+                "wallet_address": blob_to_hex(winner_address),
                 "entries": winner_entries
             },
             "total_entries": len(entry_pool),
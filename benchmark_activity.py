@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Activity Over Time Benchmark
+============================
+
+Checks that the bucketed FlexibleAnalytics.get_activity_over_time (one GROUP BY
+on the period start of each rollup row, periods filled in Python) returns what
+the original raw-row query returned: a recursive periods CTE joined against
+every row of betting_transactions on DATE(timestamp, 'utc'), with first bets
+from a MIN(timestamp) per address. Both run on a synthetic betting database of
+--rows bets for the day, week and month timeframes, with and without a
+since_timestamp, and their timings are reported. Counts and dates must match
+exactly, volumes and averages up to float summation order.
+
+Timestamps are stored as local time, like ingestion does, so the results depend
+on the timezone: the comparison runs once per --timezones entry (UTC and
+America/New_York by default), each on a database built in that timezone. The
+original query joins every period against every row, so it is the slow part
+of a large run. The largest run checked so far is the default --rows 1000000
+in both default timezones: all outputs identical, about 25 minutes, nearly all
+of it in the original query.
+
+Usage:
+    python benchmark_activity.py --rows 1000000
+    python benchmark_activity.py --rows 100000 --timezones America/New_York --keep data/bench_activity
+"""
+
+import argparse
+import math
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from json_query import FlexibleAnalytics
+from modules.daily_rollups import ensure_daily_rollups
+from modules.time_columns import ensure_time_columns
+
+DEFAULT_ROWS = 1_000_000
+DEFAULT_TIMEZONES = ['UTC', 'America/New_York']
+SYNTHETIC_WALLETS = 50_000
+SYNTHETIC_DAYS = 400
+FIRST_SYNTHETIC_DAY = 20122  # 2025-02-03
+START_DATE = '2025-02-03'
+SINCE_TIMESTAMP = '2025-09-01T00:00:00'
+
+# The recursive periods CTEs of the original implementation
+PERIOD_GENERATORS = {
+    'day': """
+        WITH RECURSIVE periods AS (
+            SELECT DATE('{start_date}') as period_start, DATE('{start_date}') as period_end, 1 as period_number
+            UNION ALL
+            SELECT DATE(period_start, '+1 day'), DATE(period_start, '+1 day'), period_number + 1
+            FROM periods WHERE period_start <= DATE('now')
+        )""",
+    'week': """
+        WITH RECURSIVE periods AS (
+            SELECT DATE('{start_date}', 'weekday 0', '-6 days') as period_start,
+                   DATE('{start_date}', 'weekday 0', '+0 days') as period_end, 1 as period_number
+            UNION ALL
+            SELECT DATE(period_start, '+7 days'), DATE(period_end, '+7 days'), period_number + 1
+            FROM periods WHERE period_start <= DATE('now')
+        )""",
+    'month': """
+        WITH RECURSIVE periods AS (
+            SELECT DATE('{start_date}', 'start of month') as period_start,
+                   DATE('{start_date}', 'start of month', '+1 month', '-1 day') as period_end, 1 as period_number
+            UNION ALL
+            SELECT DATE(period_start, '+1 month'), DATE(period_start, '+2 months', '-1 day'), period_number + 1
+            FROM periods WHERE period_start <= DATE('now')
+        )""",
+}
+
+
+def build_synthetic_database(path: str, num_rows: int):
+    """
+    A betting table with the columns both queries read, filled deterministically
+    (timestamps in the current timezone), plus its time columns and rollups.
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("""
+            CREATE TABLE betting_transactions (
+                timestamp DATETIME NOT NULL,
+                tx_hash TEXT PRIMARY KEY,
+                from_address TEXT NOT NULL,
+                token TEXT NOT NULL,
+                amount REAL NOT NULL,
+                n_cards INTEGER NOT NULL,
+                block_number INTEGER NOT NULL,
+                wallet_id INTEGER
+            )
+        """)
+        # Rows in time order, a skewed wallet mix and a bit of every token
+        conn.execute(f"""
+            WITH RECURSIVE seq(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM seq WHERE i < ? - 1),
+            rows AS (
+                SELECT i, {FIRST_SYNTHETIC_DAY} * 86400 + i * ({SYNTHETIC_DAYS} * 86400 / ?) as ts,
+                       (i * 2654435761) % ((i % 97) * {SYNTHETIC_WALLETS} / 97 + 1) as wallet_id
+                FROM seq
+            )
+            INSERT INTO betting_transactions (timestamp, tx_hash, from_address, token, amount, n_cards, block_number, wallet_id)
+            SELECT
+                strftime('%Y-%m-%dT%H:%M:%S', ts, 'unixepoch', 'localtime'),
+                printf('0x%064x', i),
+                printf('0x%040x', wallet_id),
+                CASE i % 10 WHEN 0 THEN 'Jerry' WHEN 1 THEN 'RBSD' ELSE 'MON' END,
+                ((i * 7919) % 10007) / 1000.0,
+                1 + (i * 31) % 7,
+                i,
+                wallet_id
+            FROM rows
+        """, (num_rows, num_rows))
+        conn.execute("CREATE INDEX idx_timestamp ON betting_transactions(timestamp)")
+        ensure_time_columns(conn, "betting_transactions")
+        ensure_daily_rollups(conn, "betting_transactions")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def raw_rows_activity(cursor: sqlite3.Cursor, start_date: str, timeframe: str,
+                      since_timestamp: Optional[str] = None) -> List[Dict]:
+    """The original get_activity_over_time: every period joined against the raw rows."""
+    timestamp_filter = ""
+    if since_timestamp:
+        timestamp_filter = f"AND t.timestamp > '{since_timestamp}'"
+
+    cursor.execute(f"""
+        {PERIOD_GENERATORS[timeframe].format(start_date=start_date)},
+        first_time_users AS (
+            SELECT 
+                from_address,
+                MIN(timestamp) as first_bet_date
+            FROM betting_transactions
+            GROUP BY from_address
+        )
+        SELECT 
+            p.period_start,
+            p.period_end,
+            p.period_number,
+            COUNT(t.tx_hash) as submissions,
+            COUNT(DISTINCT t.from_address) as active_addresses,
+            COUNT(DISTINCT CASE WHEN DATE(ftu.first_bet_date) >= p.period_start AND DATE(ftu.first_bet_date) <= p.period_end THEN t.from_address END) as new_bettors,
+            SUM(CASE WHEN t.token = 'MON' THEN t.amount ELSE 0 END) as mon_volume,
+            SUM(CASE WHEN t.token = 'Jerry' THEN t.amount ELSE 0 END) as jerry_volume,
+            SUM(t.n_cards) as total_cards,
+            ROUND(AVG(t.n_cards), 2) as avg_cards_per_submission,
+            AVG(t.amount) as avg_bet_amount,
+            SUM(CASE WHEN t.token = 'MON' THEN 1 ELSE 0 END) as mon_transactions,
+            SUM(CASE WHEN t.token = 'Jerry' THEN 1 ELSE 0 END) as jerry_transactions
+        FROM periods p
+        LEFT JOIN betting_transactions t ON 
+            DATE(t.timestamp, 'utc') >= p.period_start AND DATE(t.timestamp, 'utc') <= p.period_end
+            {timestamp_filter}
+        LEFT JOIN first_time_users ftu ON t.from_address = ftu.from_address
+        GROUP BY p.period_start, p.period_end, p.period_number
+        HAVING COUNT(t.tx_hash) > 0
+        ORDER BY p.period_start
+    """)
+    activity_data = []
+    for row in cursor.fetchall():
+        period_start, period_end, period_num, submissions, active_addresses, new_bettors, mon_vol, jerry_vol, cards, avg_cards, avg_bet, mon_txs, jerry_txs = row
+        activity_data.append({
+            'period': period_num,
+            'start_date': period_start,
+            'end_date': period_end,
+            'submissions': submissions or 0,
+            'active_addresses': active_addresses or 0,
+            'new_bettors': new_bettors or 0,
+            'mon_volume': mon_vol or 0.0,
+            'jerry_volume': jerry_vol or 0.0,
+            'total_volume': (mon_vol or 0.0) + (jerry_vol or 0.0),
+            'total_cards': cards or 0,
+            'avg_cards_per_submission': avg_cards or 0.0,
+            'avg_bet_amount': avg_bet or 0.0,
+            'mon_transactions': mon_txs or 0,
+            'jerry_transactions': jerry_txs or 0
+        })
+    return activity_data
+
+
+def same_value(old, new) -> bool:
+    # The rollups add up daily subtotals, so float sums can differ in the last bits
+    if isinstance(old, float) or isinstance(new, float):
+        return new is not None and math.isclose(old, new, rel_tol=1e-9)
+    return old == new
+
+
+def first_difference(expected: List[Dict], actual: List[Dict]) -> str:
+    if len(expected) != len(actual):
+        return f"{len(actual)} periods instead of {len(expected)}"
+    for old, new in zip(expected, actual):
+        for key in old:
+            if not same_value(old[key], new.get(key)):
+                return f"period {old['start_date']} {key}: {new.get(key)!r} instead of {old[key]!r}"
+    return ""
+
+
+def run_comparison(db_path: str) -> bool:
+    identical = True
+    print(f"\n{'Timeframe':<10} {'Since':<22} {'Periods':>8} {'Raw rows':>13} {'Bucketed':>10} {'Speedup':>8}  Result")
+    print("-" * 90)
+    with FlexibleAnalytics(db_path) as analytics:
+        for timeframe in ('day', 'week', 'month'):
+            for since_timestamp in (None, SINCE_TIMESTAMP):
+                start = time.perf_counter()
+                expected = raw_rows_activity(analytics.cursor, START_DATE, timeframe, since_timestamp)
+                join_seconds = time.perf_counter() - start
+
+                start = time.perf_counter()
+                actual = analytics.get_activity_over_time(START_DATE, timeframe, since_timestamp)
+                bucket_seconds = time.perf_counter() - start
+
+                difference = first_difference(expected, actual)
+                identical = identical and not difference
+                print(f"{timeframe:<10} {since_timestamp or '-':<22} {len(actual):>8} {join_seconds:>12.2f}s "
+                      f"{bucket_seconds:>9.2f}s {join_seconds / bucket_seconds if bucket_seconds else 0:>7.1f}x  "
+                      f"{'✅ identical' if not difference else '❌ ' + difference}")
+    return identical
+
+
+def set_timezone(name: str):
+    """Make this process (and SQLite's 'localtime'/'utc' modifiers) use timezone name."""
+    os.environ['TZ'] = name
+    time.tzset()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the bucketed and original raw-row activity over time queries")
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS, help="Synthetic bets to generate")
+    parser.add_argument("--timezones", nargs="+", default=DEFAULT_TIMEZONES,
+                        help="Timezones to build and compare in, e.g. UTC America/New_York")
+    parser.add_argument("--keep", type=str,
+                        help="Write the synthetic databases to this directory and keep them (reused if they exist)")
+    args = parser.parse_args()
+
+    db_dir = args.keep or tempfile.mkdtemp(prefix="bench_activity_")
+    os.makedirs(db_dir, exist_ok=True)
+    identical = True
+    try:
+        for timezone in args.timezones:
+            set_timezone(timezone)
+            db_path = os.path.join(db_dir, f"betting_{args.rows}_{timezone.replace('/', '_')}.db")
+            print(f"\n🌍 Timezone {timezone}")
+            if not os.path.exists(db_path):
+                print(f"🔨 Building a synthetic database with {args.rows:,} bets at {db_path}...")
+                start = time.time()
+                build_synthetic_database(db_path, args.rows)
+                print(f"   built in {time.time() - start:.1f}s")
+            identical = run_comparison(db_path) and identical
+    finally:
+        if not args.keep:
+            shutil.rmtree(db_dir)
+
+    print(f"\n{'✅ All outputs identical' if identical else '❌ Outputs differ'}")
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Decode Benchmark
+================
+
+Compares the row-by-row decoders (Python Transaction/Log objects, hex_to_int,
+one dict per row) against the columnar Arrow decoders in modules/arrow_decode.py,
+including the SQLite insert, on a recorded dataset.
+
+Record a dataset once (needs Hypersync access):
+    python benchmark_decode.py --record data/bench --start-block 0 --end-block 5000000
+
+Replay it offline:
+    python benchmark_decode.py --dataset data/bench
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import betting_database
+import claiming_database
+from modules.arrow_decode import decode_bets_arrow, decode_claiming_arrow
+from modules.adaptive_pager import AdaptivePager
+
+DATASETS = {
+    "bets": (betting_database.build_bets_query, 10000),
+    "claiming": (claiming_database.build_claiming_query, 500000),
+}
+TABLES = ["blocks", "transactions", "logs"]
+
+# =============================================================================
+# RECORDING
+# =============================================================================
+
+async def record_dataset(path: str, start_block: int, end_block: int):
+    """Fetch the betting and claiming queries with get_arrow and store the raw tables as Parquet."""
+    client = betting_database.HypersyncClient(betting_database.ClientConfig(
+        url=betting_database.MONAD_HYPERSYNC_URL,
+        bearer_token=betting_database.HYPERSYNC_BEARER_TOKEN
+    ))
+    os.makedirs(path, exist_ok=True)
+
+    for name, (build_query, window) in DATASETS.items():
+        print(f"Recording {name} from {start_block} to {end_block}...")
+        collected = {table: [] for table in TABLES}
+        current_block = start_block
+        pager = AdaptivePager(name, window)
+        while current_block < end_block:
+            to_block = pager.request_range(current_block, end_block)
+            request_start = time.perf_counter()
+            response = await client.get_arrow(build_query(current_block, to_block))
+            request_seconds = time.perf_counter() - request_start
+            for table in TABLES:
+                data = getattr(response.data, table)
+                if data is not None and data.num_rows:
+                    collected[table].append(data)
+            current_block = pager.observe(current_block, to_block, response, request_seconds)
+
+        for table, parts in collected.items():
+            if parts:
+                pq.write_table(pa.concat_tables(parts, promote_options="default"), os.path.join(path, f"{name}_{table}.parquet"))
+        print(f"  {name}: {sum(p.num_rows for p in collected['transactions']):,} transactions, "
+              f"{sum(p.num_rows for p in collected['logs']):,} logs")
+
+def load_dataset(path: str, name: str) -> SimpleNamespace:
+    """Load one recorded dataset as an ArrowResponse-like data object."""
+    tables = {}
+    for table in TABLES:
+        file_path = os.path.join(path, f"{name}_{table}.parquet")
+        tables[table] = pq.read_table(file_path) if os.path.exists(file_path) else None
+    return SimpleNamespace(**tables)
+
+# =============================================================================
+# ROW-OBJECT CONVERSION (setup for the baseline, not timed)
+# =============================================================================
+
+def _hex(value) -> str:
+    return "0x" + value.hex() if value is not None else None
+
+def _quantity(value) -> str:
+    return hex(int.from_bytes(value, "big")) if value is not None else None
+
+def to_row_response(data: SimpleNamespace) -> SimpleNamespace:
+    """Rebuild the Python object response the row decoders expect from Arrow tables."""
+    def rows(table) -> List[Dict]:
+        return table.to_pylist() if table is not None else []
+
+    blocks = [SimpleNamespace(number=b["number"], timestamp=_quantity(b["timestamp"]))
+              for b in rows(data.blocks)]
+    transactions = [SimpleNamespace(
+        hash=_hex(t["hash"]), from_=_hex(t["from"]), to=_hex(t.get("to")),
+        value=_quantity(t.get("value")), input=_hex(t.get("input")),
+        status=t["status"], block_number=t["block_number"]
+    ) for t in rows(data.transactions)]
+    logs = [SimpleNamespace(
+        address=_hex(l["address"]),
+        topics=[_hex(l.get(f"topic{i}")) for i in range(4)],
+        data=_hex(l["data"]), transaction_hash=_hex(l["transaction_hash"])
+    ) for l in rows(data.logs)]
+    return SimpleNamespace(data=SimpleNamespace(blocks=blocks, transactions=transactions, logs=logs))
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def run_betting_rows(db, response) -> int:
+    rows = betting_database.decode_bets_response(response)
+    db.insert_transactions(rows)
+    return len(rows)
+
+def run_betting_arrow(db, data) -> int:
+    batch = decode_bets_arrow(data)
+    db.insert_arrow_batch(batch)
+    return batch.num_rows
+
+def run_claiming_rows(db, response) -> int:
+    mon, jerry, rbsd = claiming_database.decode_claiming_response(response)
+    rows = mon + jerry + rbsd
+    db.insert_transactions(rows)
+    return len(rows)
+
+def run_claiming_arrow(db, data) -> int:
+    batch = decode_claiming_arrow(data)
+    db.insert_arrow_batch(batch)
+    return batch.num_rows
+
+def time_run(label: str, make_db, run, payload, repeat: int) -> Dict:
+    """Run decode + insert into a fresh database `repeat` times and keep the best time."""
+    best = None
+    rows = 0
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as tmp:
+            with contextlib.redirect_stdout(io.StringIO()):
+                db = make_db(os.path.join(tmp, "bench.db"))
+                start = time.perf_counter()
+                rows = run(db, payload)
+                elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+    rate = rows / best if best else 0
+    print(f"  {label:<18} {rows:>10,} rows  {best:>8.3f}s  {rate:>12,.0f} rows/s")
+    return {"rows": rows, "seconds": best, "rows_per_second": rate}
+
+def run_benchmark(path: str, repeat: int):
+    print(f"Loading dataset from {path}...")
+    arrow_data = SimpleNamespace(**{name: load_dataset(path, name) for name in DATASETS})
+    row_data = SimpleNamespace(**{name: to_row_response(getattr(arrow_data, name)) for name in DATASETS})
+
+    print(f"\n⏱️  DECODE + INSERT (best of {repeat})")
+    print("=" * 66)
+    results = {}
+    print("Betting:")
+    results["betting_rows"] = time_run("row decoder", betting_database.BettingDatabase, run_betting_rows, row_data.bets, repeat)
+    results["betting_arrow"] = time_run("arrow decoder", betting_database.BettingDatabase, run_betting_arrow, arrow_data.bets, repeat)
+    print("Claiming:")
+    results["claiming_rows"] = time_run("row decoder", claiming_database.ComprehensiveClaimingDatabase, run_claiming_rows, row_data.claiming, repeat)
+    results["claiming_arrow"] = time_run("arrow decoder", claiming_database.ComprehensiveClaimingDatabase, run_claiming_arrow, arrow_data.claiming, repeat)
+    print("=" * 66)
+
+    for name in ("betting", "claiming"):
+        before, after = results[f"{name}_rows"], results[f"{name}_arrow"]
+        if before["rows"] != after["rows"]:
+            print(f"⚠️  {name}: row count mismatch ({before['rows']} vs {after['rows']})")
+        if before["rows_per_second"]:
+            print(f"{name.capitalize()} speedup: {after['rows_per_second'] / before['rows_per_second']:.1f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark row vs Arrow decoding")
+    parser.add_argument("--record", type=str, help="Record a dataset into this directory")
+    parser.add_argument("--start-block", type=int, default=0, help="First block to record")
+    parser.add_argument("--end-block", type=int, help="Block to stop recording at (exclusive)")
+    parser.add_argument("--dataset", type=str, default="data/bench", help="Recorded dataset directory to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per decoder (best time is reported)")
+    args = parser.parse_args()
+
+    if args.record:
+        if args.end_block is None:
+            parser.error("--record requires --end-block")
+        asyncio.run(record_dataset(args.record, args.start_block, args.end_block))
+    else:
+        run_benchmark(args.dataset, args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -29,7 +29,25 @@ sqlite3.register_adapter(datetime, adapt_datetime)
 sqlite3.register_converter("datetime", convert_datetime)
 
 from hypersync import HypersyncClient, ClientConfig, TransactionSelection, LogSelection, FieldSelection, Query
-from hypersync import LogField, TransactionField, BlockField
+from hypersync import LogField, TransactionField, BlockField, StreamConfig, JoinMode
+
+from modules.response_index import build_response_index
+from modules.contracts import (
+    CONTRACT_ADDRESSES_1, SIG_HASH_1, CONTRACT_ADDRESS_2_TX_TO, CONTRACT_ADDRESS_2_LOG_A,
+    CONTRACT_ADDRESS_2_LOG_B, SIG_HASH_2, TOPIC_0_LOG_A, CARDS_LOG_TOPIC_0, BETTING_COLUMNS
+)
+from modules.bulk_writer import BulkWriter, DEFAULT_INSERT_BATCH_SIZE
+from modules.ingest_metrics import IngestMetrics
+from modules.ingest_pipeline import iter_batches, run_pipeline, DEFAULT_QUEUE_SIZE
+from modules.adaptive_pager import AdaptivePager, DEFAULT_MIN_WINDOW, DEFAULT_MAX_WINDOW
+from modules.shard_backfill import run_shards, merge_shards, remove_shards
+from modules.follow_loop import follow_chain, DEFAULT_POLL_INTERVAL
+from modules.reorg_guard import ReorgGuard, ReorgTooDeepError, DEFAULT_REORG_DEPTH
+from modules.block_cache import ensure_blocks_table, block_rows, write_blocks, BLOCK_COLUMNS
+from modules.wallets import ensure_wallet_ids, wallet_converters, drop_unused_wallets, WALLET_RENAMES
+from modules.time_columns import ensure_time_columns, assign_time_columns
+from modules.daily_rollups import ensure_daily_rollups, update_daily_rollups, rebuild_daily_rollups
+from modules.compact_storage import compact_converters, blob_to_hex, HEX_COLUMNS
 
 # =============================================================================
 # CONFIGURATION
@@ -45,26 +63,29 @@ IS_PRODUCTION = os.getenv('IS_PRODUCTION', 'false').lower() == 'true'
 MONAD_HYPERSYNC_URL = os.getenv("MONAD_HYPERSYNC_URL", "https://monad-testnet.hypersync.xyz")
 HYPERSYNC_BEARER_TOKEN = os.getenv("HYPERSYNC_BEARER_TOKEN")
 
-# Contract addresses and signatures - matching original query exactly
-CONTRACT_ADDRESSES_1 = ['0x3ad50059d6008b711209a509fe58e68f0b672a42', '0x740990cb01e893a371a050736c62ae0b779109e7']
-SIG_HASH_1 = '0x5029defb'
-
-CONTRACT_ADDRESS_2_TX_TO = '0x740990cb01e893a371a050736c62ae0b779109e7'
-CONTRACT_ADDRESS_2_LOG_A = '0xda054a96254776346386060c480b42a10c870cd2'
-CONTRACT_ADDRESS_2_LOG_B = '0x740990cb01e893a371a050736c62ae0b779109e7'
-SIG_HASH_2 = '0xb65c106f'
-TOPIC_0_LOG_A = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
-CARDS_LOG_TOPIC_0 = '0xefc52bf7792453af1461fa9a7097486359b41a048898b6d542c0f03389487187'
+# Stream ingestion defaults (--stream mode)
+DEFAULT_STREAM_CONCURRENCY = 10
 
 # =============================================================================
 # DATABASE MANAGEMENT
 # =============================================================================
 
 class BettingDatabase:
-    """SQLite database manager for betting transactions."""
+    """
+    SQLite database manager for betting transactions.
+    Rows store the wallet_id of their address (readers that need the address
+    use the betting_transactions_v view). raw databases (backfill shards) only
+    store transactions with their address, blocks and the checkpoint; wallet
+    ids are resolved by the merge, time columns and rollups derived after it.
+    """
     
-    def __init__(self, db_path: str = "betting_transactions.db"):
+    def __init__(self, db_path: str = "betting_transactions.db", insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE,
+                 raw: bool = False):
         self.db_path = db_path
+        self.raw = raw
+        self.metrics = None  # IngestMetrics, set by main() when metrics are exported
+        self.writer = BulkWriter("betting_transactions", BETTING_COLUMNS, insert_batch_size,
+                                 renames=None if raw else WALLET_RENAMES)
         self.init_database()
     
     def init_database(self):
@@ -72,12 +93,15 @@ class BettingDatabase:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # Shards keep the address, the merge resolves it to a wallet id
+            wallet_column = "from_address TEXT NOT NULL" if self.raw else "wallet_id INTEGER NOT NULL REFERENCES wallets(id)"
+            
             # Create betting_transactions table with specified schema
-            cursor.execute("""
+            cursor.execute(f"""
                 CREATE TABLE IF NOT EXISTS betting_transactions (
                     timestamp DATETIME NOT NULL,
                     tx_hash TEXT PRIMARY KEY,
-                    from_address TEXT NOT NULL,
+                    {wallet_column},
                     to_address TEXT NOT NULL,
                     token TEXT NOT NULL,
                     amount REAL NOT NULL,
@@ -90,7 +114,6 @@ class BettingDatabase:
             
             # Create indexes for faster queries
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON betting_transactions(timestamp)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_from_address ON betting_transactions(from_address)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_token ON betting_transactions(token)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_block_number ON betting_transactions(block_number)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_bet_id ON betting_transactions(bet_id)")
@@ -104,6 +127,23 @@ class BettingDatabase:
                 )
             """)
             
+            # Block timestamp cache filled as a side effect of ingestion
+            ensure_blocks_table(conn)
+            
+            self.converters = {}
+            if not self.raw:
+                # Integer wallet ids in place of from_address, the view joins the address back in
+                ensure_wallet_ids(conn, "betting_transactions")
+                # Integer ts_epoch / day_id for index range filters on dates
+                ensure_time_columns(conn, "betting_transactions")
+                # Per-day rollups read by json_query.py, maintained with every insert
+                ensure_daily_rollups(conn, "betting_transactions")
+                
+                # Databases migrated by compact_database.py store hashes and addresses as BLOBs
+                self.converters = compact_converters(conn, "betting_transactions")
+                # Addresses are resolved to their wallet id before the insert
+                self.writer.set_converters(wallet_converters(self.converters))
+            
             # Insert initial checkpoint if none exists
             cursor.execute("SELECT COUNT(*) FROM checkpoints")
             if cursor.fetchone()[0] == 0:
@@ -129,17 +169,58 @@ class BettingDatabase:
             result = cursor.fetchone()
             return result[0] if result else 0
     
+    def _set_checkpoint(self, conn: sqlite3.Connection, block_number: int):
+        """Write the checkpoint on an open connection (the caller commits)."""
+        conn.execute("""
+            UPDATE checkpoints 
+            SET last_processed_block = ?, last_update = CURRENT_TIMESTAMP
+            WHERE id = (SELECT id FROM checkpoints ORDER BY id DESC LIMIT 1)
+        """, (block_number,))
+    
+    def rollback_to_block(self, block_number: int) -> int:
+        """
+        Delete rows at or above block_number and move the checkpoint back to it (reorg recovery).
+        Rollups, first-seen entries and wallets of the deleted rows are updated in the same transaction.
+        """
+        with self.get_connection() as conn:
+            first_day, = conn.execute("SELECT MIN(day_id) FROM betting_transactions WHERE block_number >= ?",
+                                      (block_number,)).fetchone()
+            wallet_ids = [row[0] for row in conn.execute(
+                "SELECT DISTINCT wallet_id FROM betting_transactions WHERE block_number >= ?",
+                (block_number,))]
+            cursor = conn.execute("DELETE FROM betting_transactions WHERE block_number >= ?", (block_number,))
+            deleted_count = cursor.rowcount
+            conn.execute("DELETE FROM blocks WHERE block_number >= ?", (block_number,))
+            # First bets in the orphaned blocks no longer exist, the rebuild below re-adds surviving ones
+            conn.execute("DELETE FROM wallet_first_seen WHERE first_block >= ?", (block_number,))
+            if first_day is not None:
+                # Recompute the rollups of the days the orphaned rows belonged to
+                rebuild_daily_rollups(conn, "betting_transactions", first_day)
+            # Wallets only seen in the orphaned blocks are registered again if they come back
+            drop_unused_wallets(conn, "betting_transactions", wallet_ids)
+            last_block = conn.execute("SELECT last_processed_block FROM checkpoints ORDER BY id DESC LIMIT 1").fetchone()
+            if last_block is None or last_block[0] > block_number:
+                self._set_checkpoint(conn, block_number)
+            conn.commit()
+        if self.metrics:
+            self.metrics.set_checkpoint(block_number)
+        return deleted_count
+    
+    def update_derived(self, conn: sqlite3.Connection):
+        """Assign time columns to new rows and fold them into the rollups (no-op for raw databases)."""
+        if self.raw:
+            return
+        assign_time_columns(conn, "betting_transactions")
+        update_daily_rollups(conn, "betting_transactions")
+    
     def update_last_processed_block(self, block_number: int):
         """Update the last processed block number."""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE checkpoints 
-                SET last_processed_block = ?, last_update = CURRENT_TIMESTAMP
-                WHERE id = (SELECT id FROM checkpoints ORDER BY id DESC LIMIT 1)
-            """, (block_number,))
+            self._set_checkpoint(conn, block_number)
             conn.commit()
             print(f"Updated last processed block to: {block_number}")
+        if self.metrics:
+            self.metrics.set_checkpoint(block_number)
     
     def insert_transactions(self, transactions: List[Dict[str, Any]]) -> int:
         """Insert multiple transactions into the database."""
@@ -147,42 +228,63 @@ class BettingDatabase:
             return 0
         
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            inserted_count = 0
-            
-            for tx in transactions:
-                try:
-                    cursor.execute("""
-                        INSERT INTO betting_transactions 
-                        (timestamp, tx_hash, from_address, to_address, token, amount, n_cards, bet_id, block_number)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        tx['timestamp'],
-                        tx['tx_hash'],
-                        tx['from_address'],
-                        tx['to_address'],
-                        tx['token'],
-                        tx['amount'],
-                        tx['n_cards'],
-                        tx['bet_id'],
-                        tx['block_number']
-                    ))
-                    inserted_count += 1
-                except sqlite3.IntegrityError:
-                    continue  # Skip duplicates
-            
+            inserted_count, skipped_count = self.writer.write_dicts(conn, transactions)
+            self.update_derived(conn)
+            conn.commit()
+            print(f"Inserted {inserted_count} new transactions (skipped {skipped_count} duplicates)")
+            return inserted_count
+    
+    def insert_arrow_batch(self, batch) -> int:
+        """Insert a decoded Arrow batch (see modules/arrow_decode.py), skipping duplicates."""
+        from modules.arrow_decode import arrow_rows
+        with self.get_connection() as conn:
+            inserted_count, _ = self.writer.write_rows(conn, arrow_rows(batch, self.writer.columns))
+            self.update_derived(conn)
             conn.commit()
-            print(f"Inserted {inserted_count} new transactions (skipped {len(transactions) - inserted_count} duplicates)")
             return inserted_count
     
+    def commit_batch(self, batch, block_number: Optional[int] = None, blocks: Optional[List[tuple]] = None) -> int:
+        """
+        Insert a batch and advance the checkpoint in the same SQLite transaction.
+
+        batch is either a list of row dicts or a decoded Arrow table. A crash can
+        therefore never leave rows without their checkpoint (or the reverse), and
+        a restart resumes after the last committed batch.
+        blocks are the (block_number, timestamp) pairs of the batch's response,
+        stored in the blocks cache in the same transaction.
+        """
+        with self.get_connection() as conn:
+            if isinstance(batch, list):
+                inserted_count, skipped_count = self.writer.write_dicts(conn, batch)
+            else:
+                # Only --arrow runs produce Arrow batches, numpy/pyarrow are not needed otherwise
+                from modules.arrow_decode import arrow_rows
+                inserted_count, skipped_count = self.writer.write_rows(conn, arrow_rows(batch, self.writer.columns))
+            self.update_derived(conn)
+            if blocks:
+                write_blocks(conn, blocks)
+            if block_number is not None:
+                self._set_checkpoint(conn, block_number)
+            conn.commit()
+        
+        if self.metrics:
+            self.metrics.observe_write(inserted_count + skipped_count, inserted_count, block_number)
+        if block_number is not None:
+            print(f"Committed {inserted_count} new transactions (skipped {skipped_count} duplicates), checkpoint at block {block_number}")
+        return inserted_count
+    
     def get_all_transactions(self) -> pd.DataFrame:
         """Get all transactions as a pandas DataFrame."""
         with self.get_connection() as conn:
-            return pd.read_sql_query("""
+            df = pd.read_sql_query("""
                 SELECT timestamp, tx_hash, from_address, to_address, token, amount, n_cards, bet_id, block_number
-                FROM betting_transactions 
+                FROM betting_transactions_v 
                 ORDER BY timestamp
             """, conn)
+        if self.converters:
+            for column in HEX_COLUMNS:
+                df[column] = df[column].map(blob_to_hex)
+        return df
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
@@ -201,8 +303,8 @@ class BettingDatabase:
             """)
             token_stats = cursor.fetchall()
             
-            # Unique users
-            cursor.execute("SELECT COUNT(DISTINCT from_address) FROM betting_transactions")
+            # Unique users (wallets only holds addresses that have rows)
+            cursor.execute("SELECT COUNT(*) FROM wallets")
             unique_users = cursor.fetchone()[0]
             
             # Date range
@@ -283,218 +385,252 @@ def calculate_cards_in_slip_sql_style(data: str) -> int:
 # DATA FETCHING FUNCTIONS
 # =============================================================================
 
-async def fetch_mon_transactions(client: HypersyncClient, start_block: int, end_block: int) -> List[Dict[str, Any]]:
-    """Fetch MON betting transactions - matching original query logic exactly."""
-    print(f"Fetching MON transactions from {start_block} to {end_block}...")
-    
-    all_tx_data = []
-    current_block = start_block
-
-    while current_block < end_block:
-        print(f"  Processing blocks {current_block} to {min(current_block + 10000, end_block)}...")
-        
-        query = Query(
-            from_block=current_block,
-            to_block=min(current_block + 10000, end_block),
-            transactions=[TransactionSelection(
-                to=CONTRACT_ADDRESSES_1,
-                sighash=[SIG_HASH_1]
-            )],
-            field_selection=FieldSelection(
-                block=['timestamp', 'number'],
-                transaction=['hash', 'from', 'to', 'value', 'input', 'status', 'block_number'],
-                log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
-                     LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
-            )
+def build_mon_query(from_block: int, to_block: int) -> Query:
+    """Build the Hypersync query for MON betting transactions."""
+    return Query(
+        from_block=from_block,
+        to_block=to_block,
+        transactions=[TransactionSelection(
+            to=CONTRACT_ADDRESSES_1,
+            sighash=[SIG_HASH_1]
+        )],
+        field_selection=FieldSelection(
+            block=['timestamp', 'number'],
+            transaction=['hash', 'from', 'to', 'value', 'input', 'status', 'block_number'],
+            log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
+                 LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
         )
+    )
 
-        response = await client.get(query)
+def build_jerry_query(from_block: int, to_block: int) -> Query:
+    """Build the Hypersync query for Jerry betting transactions (function signature and logs)."""
+    return Query(
+        from_block=from_block,
+        to_block=to_block,
+        transactions=[TransactionSelection(
+            to=[CONTRACT_ADDRESS_2_TX_TO],
+            sighash=[SIG_HASH_2]
+        )],
+        logs=[
+            LogSelection(address=[CONTRACT_ADDRESS_2_LOG_A], topics=[[TOPIC_0_LOG_A]]),
+            LogSelection(address=[CONTRACT_ADDRESS_2_LOG_B])
+        ],
+        field_selection=FieldSelection(
+            block=['timestamp', 'number'],
+            transaction=['hash', 'from', 'status', 'block_number'],
+            log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
+                 LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
+        )
+    )
 
-        if response.data:
-            block_timestamp_map = {
-                b.number: hex_to_int(b.timestamp)
-                for b in response.data.blocks if b.number and b.timestamp
-            }
+def build_bets_query(from_block: int, to_block: int) -> Query:
+    """
+    Build one query that covers both MON and Jerry bets for a block range.
+
+    The response holds the MON bet transactions, the Jerry bet transactions, the
+    Jerry transfer logs, every RareBet log (cards event) and the cards events of
+    the other RBS contract, so a single scan replaces the two separate queries.
+    JoinMode.DEFAULT pulls in the transactions of the selected logs (as the Jerry
+    query always did) but not all logs of every transaction, which JOIN_ALL would.
+    decode_bets_response() splits the result into the two bet types.
+    """
+    return Query(
+        from_block=from_block,
+        to_block=to_block,
+        transactions=[
+            TransactionSelection(to=CONTRACT_ADDRESSES_1, sighash=[SIG_HASH_1]),
+            TransactionSelection(to=[CONTRACT_ADDRESS_2_TX_TO], sighash=[SIG_HASH_2])
+        ],
+        logs=[
+            LogSelection(address=[CONTRACT_ADDRESS_2_LOG_A], topics=[[TOPIC_0_LOG_A]]),
+            LogSelection(address=[CONTRACT_ADDRESS_2_LOG_B]),
+            LogSelection(address=CONTRACT_ADDRESSES_1, topics=[[CARDS_LOG_TOPIC_0]])
+        ],
+        join_mode=JoinMode.DEFAULT,
+        field_selection=FieldSelection(
+            block=['timestamp', 'number'],
+            transaction=['hash', 'from', 'to', 'value', 'input', 'status', 'block_number'],
+            log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
+                 LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
+        )
+    )
 
-            for tx in response.data.transactions:
-                if tx.status != 1:  # Only successful transactions
-                    continue
-
-                timestamp = block_timestamp_map.get(tx.block_number)
-                if not timestamp:
-                    continue
-
-                # Calculate cards in slip from transaction input
-                cards_in_slip = calculate_cards_in_slip_from_tx(tx.input)
-
-                # Get bet_id_decoded from logs
-                bet_id_decoded = 0
-                if response.data.logs:
-                    for log in response.data.logs:
-                        if log.transaction_hash == tx.hash and len(log.topics) >= 3:
-                            # Look for the card event log (topic 0 = CARDS_LOG_TOPIC_0)
-                            if (log.topics and log.topics[0] and 
-                                log.topics[0].lower() == '0xefc52bf7792453af1461fa9a7097486359b41a048898b6d542c0f03389487187'):
-                                bet_id_decoded = hex_to_int(log.topics[2])
-                                break
-                
-                # Calculate bet amount (MON units)
-                bet_amt = hex_to_int(tx.value) / 1e18
-                
-                all_tx_data.append({
-                    "timestamp": datetime.fromtimestamp(timestamp),
-                    "tx_hash": tx.hash,
-                    "from_address": tx.from_,
-                    "to_address": tx.to,
-                    "token": "MON",
-                    "amount": bet_amt,
-                    "n_cards": cards_in_slip,
-                    "bet_id": bet_id_decoded,
-                    "block_number": tx.block_number,
-                })
+def is_mon_bet(tx) -> bool:
+    """Check whether a transaction matches the MON bet selection (RBS contract + SIG_HASH_1)."""
+    return (bool(tx.to) and tx.to.lower() in CONTRACT_ADDRESSES_1
+            and bool(tx.input) and tx.input[:10].lower() == SIG_HASH_1)
+
+def decode_mon_response(response) -> List[Dict[str, Any]]:
+    """Decode MON betting transactions from a single Hypersync response."""
+    tx_data = []
+    if not response.data:
+        return tx_data
+
+    block_timestamp_map = {
+        b.number: hex_to_int(b.timestamp)
+        for b in response.data.blocks if b.number and b.timestamp
+    }
+    index = build_response_index(response)
+
+    for tx in response.data.transactions:
+        if tx.status != 1:  # Only successful transactions
+            continue
+
+        # Combined responses also carry Jerry bets and log-joined transactions
+        if not is_mon_bet(tx):
+            continue
+
+        timestamp = block_timestamp_map.get(tx.block_number)
+        if not timestamp:
+            continue
+
+        # Calculate cards in slip from transaction input
+        cards_in_slip = calculate_cards_in_slip_from_tx(tx.input)
+
+        # Get bet_id_decoded from the card event log (topic 0 = CARDS_LOG_TOPIC_0)
+        bet_id_decoded = 0
+        card_event_log = next((
+            log for log in index.logs_for(tx.hash, topic0=CARDS_LOG_TOPIC_0)
+            if len(log.topics) >= 3
+        ), None)
+        if card_event_log:
+            bet_id_decoded = hex_to_int(card_event_log.topics[2])
         
-        if response.next_block and response.next_block > current_block:
-            current_block = response.next_block
-        else:
-            current_block += 10000
-
-    print(f"Found {len(all_tx_data)} MON transactions")
-    return all_tx_data
-
-async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, end_block: int) -> List[Dict[str, Any]]:
-    """Fetch Jerry betting transactions - matching original query logic exactly."""
-    print(f"Fetching Jerry transactions from {start_block} to {end_block}...")
-    
-    all_tx_data = []
-    current_block = start_block
-    
-    while current_block < end_block:
-        print(f"  Processing blocks {current_block} to {min(current_block + 10000, end_block)}...")
+        # Calculate bet amount (MON units)
+        bet_amt = hex_to_int(tx.value) / 1e18
         
-        # Query for Jerry transactions with both function signature and logs
-        query = Query(
-            from_block=current_block,
-            to_block=min(current_block + 10000, end_block),
-            transactions=[TransactionSelection(
-                to=[CONTRACT_ADDRESS_2_TX_TO],
-                sighash=[SIG_HASH_2]
-            )],
-            logs=[
-                LogSelection(address=[CONTRACT_ADDRESS_2_LOG_A], topics=[[TOPIC_0_LOG_A]]),
-                LogSelection(address=[CONTRACT_ADDRESS_2_LOG_B])
-            ],
-            field_selection=FieldSelection(
-                block=['timestamp', 'number'],
-                transaction=['hash', 'from', 'status', 'block_number'],
-                log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
-                     LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
-            )
-        )
-
-        response = await client.get(query)
-
-        if response.data:
-            block_timestamp_map = {
-                b.number: hex_to_int(b.timestamp)
-                for b in response.data.blocks if b.number and b.timestamp
-            }
+        tx_data.append({
+            "timestamp": datetime.fromtimestamp(timestamp),
+            "tx_hash": tx.hash,
+            "from_address": tx.from_,
+            "to_address": tx.to,
+            "token": "MON",
+            "amount": bet_amt,
+            "n_cards": cards_in_slip,
+            "bet_id": bet_id_decoded,
+            "block_number": tx.block_number,
+        })
+
+    return tx_data
+
+def decode_jerry_response(response) -> List[Dict[str, Any]]:
+    """Decode Jerry betting transactions from a single Hypersync response."""
+    tx_data = []
+    if not response.data:
+        return tx_data
+
+    block_timestamp_map = {
+        b.number: hex_to_int(b.timestamp)
+        for b in response.data.blocks if b.number and b.timestamp
+    }
+    index = build_response_index(response)
+
+    # Process transactions that have both required logs
+    for tx_hash in index.tx_hashes_with(CONTRACT_ADDRESS_2_LOG_A, TOPIC_0_LOG_A):
+        if not index.has_log(tx_hash, address=CONTRACT_ADDRESS_2_LOG_B):
+            continue
+
+        tx = index.get_transaction(tx_hash)
+        if not tx or tx.status != 1:
+            continue
+
+        timestamp = block_timestamp_map.get(tx.block_number)
+        if not timestamp:
+            continue
+        
+        # Get Jerry log for bet amount
+        jerry_log = index.first_log(tx_hash, CONTRACT_ADDRESS_2_LOG_A, TOPIC_0_LOG_A)
+        
+        # Get card event log for cards in slip
+        card_event_log = index.first_log(tx_hash, CONTRACT_ADDRESS_2_LOG_B, CARDS_LOG_TOPIC_0)
 
-            # Group logs by transaction hash
-            logs_by_tx_hash = {}
-            for log in response.data.logs:
-                if log.transaction_hash not in logs_by_tx_hash:
-                    logs_by_tx_hash[log.transaction_hash] = []
-                logs_by_tx_hash[log.transaction_hash].append(log)
-
-            # Process transactions that have both required logs
-            for tx_hash, tx_logs in logs_by_tx_hash.items():
-                has_jerry_log = any(
-                    log.address.lower() == CONTRACT_ADDRESS_2_LOG_A.lower() 
-                    and log.topics and log.topics[0] and log.topics[0].lower() == TOPIC_0_LOG_A.lower()
-                    for log in tx_logs
-                )
-                has_rarebet_log = any(
-                    log.address.lower() == CONTRACT_ADDRESS_2_LOG_B.lower()
-                    for log in tx_logs
-                )
-                
-                if has_jerry_log and has_rarebet_log:
-                    tx = next((t for t in response.data.transactions if t.hash == tx_hash), None)
-                    if not tx or tx.status != 1:
-                        continue
-
-                    timestamp = block_timestamp_map.get(tx.block_number)
-                    if not timestamp:
-                        continue
-                    
-                    # Get Jerry log for bet amount
-                    jerry_log = next((
-                        log for log in tx_logs 
-                        if log.address.lower() == CONTRACT_ADDRESS_2_LOG_A.lower()
-                        and log.topics and log.topics[0] and log.topics[0].lower() == TOPIC_0_LOG_A.lower()
-                    ), None)
-                    
-                    # Get card event log for cards in slip
-                    card_event_log = next((
-                        log for log in tx_logs
-                        if log.address.lower() == CONTRACT_ADDRESS_2_LOG_B.lower()
-                        and log.topics and log.topics[0] and log.topics[0].lower() == CARDS_LOG_TOPIC_0.lower()
-                    ), None)
-
-                    # Calculate cards in slip
-                    cards_in_slip = 0
-                    bet_id_decoded = 0
-                    
-                    if card_event_log and card_event_log.data:
-                        data_hex = card_event_log.data[2:] if card_event_log.data.startswith('0x') else card_event_log.data
-                        start_index = 192
-                        end_index = start_index + 64
-                        
-                        if len(data_hex) >= end_index:
-                            card_count_hex = data_hex[start_index:end_index]
-                            cards_in_slip = hex_to_int(card_count_hex)
-                        
-                        if len(card_event_log.topics) >= 3:
-                            bet_id_decoded = hex_to_int(card_event_log.topics[2])
-
-                    # Calculate bet amount from Jerry log
-                    bet_amt = 0
-                    if jerry_log and jerry_log.data:
-                        bet_amt = hex_to_int(jerry_log.data) / 1e18
-
-                    all_tx_data.append({
-                        "timestamp": datetime.fromtimestamp(timestamp),
-                        "tx_hash": tx.hash,
-                        "from_address": tx.from_,
-                        "to_address": CONTRACT_ADDRESS_2_TX_TO,
-                        "token": "Jerry",
-                        "amount": bet_amt,
-                        "n_cards": cards_in_slip,
-                        "bet_id": bet_id_decoded,
-                        "block_number": tx.block_number,
-                    })
+        # Calculate cards in slip
+        cards_in_slip = 0
+        bet_id_decoded = 0
         
-        if response.next_block and response.next_block > current_block:
-            current_block = response.next_block
-        else:
-            current_block += 10000
+        if card_event_log and card_event_log.data:
+            data_hex = card_event_log.data[2:] if card_event_log.data.startswith('0x') else card_event_log.data
+            start_index = 192
+            end_index = start_index + 64
+            
+            if len(data_hex) >= end_index:
+                card_count_hex = data_hex[start_index:end_index]
+                cards_in_slip = hex_to_int(card_count_hex)
+            
+            if len(card_event_log.topics) >= 3:
+                bet_id_decoded = hex_to_int(card_event_log.topics[2])
+
+        # Calculate bet amount from Jerry log
+        bet_amt = 0
+        if jerry_log and jerry_log.data:
+            bet_amt = hex_to_int(jerry_log.data) / 1e18
+
+        tx_data.append({
+            "timestamp": datetime.fromtimestamp(timestamp),
+            "tx_hash": tx.hash,
+            "from_address": tx.from_,
+            "to_address": CONTRACT_ADDRESS_2_TX_TO,
+            "token": "Jerry",
+            "amount": bet_amt,
+            "n_cards": cards_in_slip,
+            "bet_id": bet_id_decoded,
+            "block_number": tx.block_number,
+        })
+
+    return tx_data
+
+def decode_bets_response(response) -> List[Dict[str, Any]]:
+    """Split a build_bets_query() response into MON and Jerry bet rows."""
+    return decode_mon_response(response) + decode_jerry_response(response)
 
-    print(f"Found {len(all_tx_data)} Jerry transactions")
-    return all_tx_data
+# =============================================================================
+# STREAM-BASED FETCHING
+# =============================================================================
+
+def build_stream_config(concurrency: int = DEFAULT_STREAM_CONCURRENCY,
+                        min_batch_size: Optional[int] = None,
+                        max_batch_size: Optional[int] = None,
+                        response_bytes_ceiling: Optional[int] = None) -> StreamConfig:
+    """Build the StreamConfig used by the concurrent ingestion mode."""
+    return StreamConfig(
+        concurrency=concurrency,
+        min_batch_size=min_batch_size,
+        max_batch_size=max_batch_size,
+        response_bytes_ceiling=response_bytes_ceiling
+    )
 
 # =============================================================================
 # MAIN EXECUTION
 # =============================================================================
 
-async def process_all_transactions(db: BettingDatabase, client: HypersyncClient, start_block: int = None):
-    """Process all transactions from start_block to current height."""
+async def process_all_transactions(db: BettingDatabase, client: HypersyncClient, start_block: int = None,
+                                   stream_config: Optional[StreamConfig] = None, use_arrow: bool = False,
+                                   queue_size: int = DEFAULT_QUEUE_SIZE, min_window: int = DEFAULT_MIN_WINDOW,
+                                   max_window: int = DEFAULT_MAX_WINDOW, end_block: Optional[int] = None):
+    """
+    Process all transactions from start_block to end_block (defaults to current height).
+
+    MON and Jerry bets are fetched with one combined query. Decoded batches go
+    through a bounded queue and the writer commits each batch together with
+    the advanced checkpoint, so only a few batches are held in memory and an
+    interrupted run resumes from the last committed batch.
+    When stream_config is given, the query is fetched with the concurrent
+    stream API instead of the serial paging loop, whose block window starts at
+    10,000 and adapts between min_window and max_window.
+    When use_arrow is set, responses are fetched as Arrow tables and decoded
+    column-wise.
+    """
     if start_block is None:
         start_block = db.get_last_processed_block()
         if start_block == 0:
             start_block = 0  # Start from block 0 for complete historical data
     
-    end_block = await client.get_height()
-    print(f"Current blockchain height: {end_block}")
+    if end_block is None:
+        end_block = await client.get_height()
+        print(f"Current blockchain height: {end_block}")
+    
+    if db.metrics:
+        db.metrics.set_height(end_block)
     
     if start_block >= end_block:
         print(f"No new blocks to process (last processed: {start_block}, current: {end_block})")
@@ -502,24 +638,85 @@ async def process_all_transactions(db: BettingDatabase, client: HypersyncClient,
     
     print(f"Processing blocks {start_block} to {end_block}")
     
-    # Fetch new data using the same logic as block_check_fixed.py
-    mon_data, jerry_data = await asyncio.gather(
-        fetch_mon_transactions(client, start_block, end_block),
-        fetch_jerry_transactions(client, start_block, end_block)
+    # One combined MON + Jerry scan, split into the two bet types per response;
+    # each batch also carries its block timestamps for the blocks cache
+    if use_arrow:
+        # numpy/pyarrow are only imported for --arrow runs
+        from modules.arrow_decode import decode_bets_arrow as decode, arrow_block_rows as blocks_of
+    else:
+        decode, blocks_of = decode_bets_response, block_rows
+    batches = iter_batches(client, build_bets_query,
+                           lambda response: (decode(response), blocks_of(response)),
+                           "bets", start_block, end_block,
+                           stream_config=stream_config, use_arrow=use_arrow,
+                           pager=AdaptivePager("bets", 10000, min_window, max_window), metrics=db.metrics)
+    
+    # Rows, blocks and checkpoint are committed together, so a restart loses at most one batch
+    inserted_count = await run_pipeline(
+        {"bets": batches},
+        lambda batch, checkpoint: db.commit_batch(batch[0], checkpoint, blocks=batch[1]),
+        start_block, queue_size
     )
     
-    all_tx_data = mon_data + jerry_data
+    # The scan reached end_block, make sure the checkpoint says so
+    db.update_last_processed_block(end_block)
     
-    if not all_tx_data:
-        print("No new transactions found.")
-        db.update_last_processed_block(end_block)
+    return inserted_count
+
+def backfill_shard(db_path: str, from_block: int, to_block: int, use_arrow: bool = False,
+                   insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE, stream_options: Optional[Dict[str, Any]] = None,
+                   queue_size: int = DEFAULT_QUEUE_SIZE, min_window: int = DEFAULT_MIN_WINDOW,
+                   max_window: int = DEFAULT_MAX_WINDOW) -> int:
+    """
+    Worker process entry point: ingest [from_block, to_block) into its own shard database.
+    stream_options are build_stream_config() arguments (the StreamConfig itself is built
+    in the worker, plain values are what gets pickled to spawned processes).
+    """
+    # Shards only hold raw rows and blocks, the derived columns are filled once after the merge
+    db = BettingDatabase(db_path=db_path, insert_batch_size=insert_batch_size, raw=True)
+    client = HypersyncClient(ClientConfig(
+        url=MONAD_HYPERSYNC_URL,
+        bearer_token=HYPERSYNC_BEARER_TOKEN
+    ))
+    # A shard left over from an interrupted backfill resumes from its own checkpoint
+    start_block = max(from_block, db.get_last_processed_block())
+    stream_config = build_stream_config(**stream_options) if stream_options is not None else None
+    return asyncio.run(process_all_transactions(db, client, start_block, stream_config, use_arrow=use_arrow,
+                                                queue_size=queue_size, min_window=min_window, max_window=max_window,
+                                                end_block=to_block))
+
+def process_sharded_backfill(db: BettingDatabase, start_block: int, end_block: int, shards: int,
+                             processes: Optional[int] = None, use_arrow: bool = False,
+                             stream_options: Optional[Dict[str, Any]] = None, queue_size: int = DEFAULT_QUEUE_SIZE,
+                             min_window: int = DEFAULT_MIN_WINDOW, max_window: int = DEFAULT_MAX_WINDOW) -> int:
+    """
+    Rebuild [start_block, end_block) with one worker process per block shard, then
+    merge the shard databases into db and advance its checkpoint to the plan's end.
+    Every shard is fetched with the given stream / paging options.
+    """
+    if start_block >= end_block:
+        print(f"No new blocks to process (last processed: {start_block}, current: {end_block})")
         return 0
     
-    # Store transactions in database
-    inserted_count = db.insert_transactions(all_tx_data)
+    if db.metrics:
+        db.metrics.set_height(end_block)
     
-    # Update checkpoint
-    db.update_last_processed_block(end_block)
+    plan = run_shards(backfill_shard, db.db_path, start_block, end_block, shards, processes,
+                      use_arrow=use_arrow, insert_batch_size=db.writer.batch_size, stream_options=stream_options,
+                      queue_size=queue_size, min_window=min_window, max_window=max_window)
+    
+    print(f"Merging {len(plan['paths'])} shards into {db.db_path}...")
+    inserted_count = merge_shards(db.db_path, plan['paths'], "betting_transactions", BETTING_COLUMNS,
+                                  converters=db.converters, wallet_column='from_address')
+    merge_shards(db.db_path, plan['paths'], "blocks", BLOCK_COLUMNS)
+    with db.get_connection() as conn:
+        db.update_derived(conn)
+        conn.commit()
+    if db.metrics:
+        # Worker processes do not report metrics, only the merged result is recorded
+        db.metrics.observe_write(inserted_count, inserted_count)
+    db.update_last_processed_block(plan['end_block'])
+    remove_shards(db.db_path)
     
     return inserted_count
 
@@ -529,6 +726,23 @@ async def main():
     parser.add_argument("--incremental", action="store_true", help="Only fetch new data")
     parser.add_argument("--start-block", type=int, help="Start from specific block")
     parser.add_argument("--stats", action="store_true", help="Show database statistics")
+    parser.add_argument("--stream", action="store_true", help="Use concurrent stream ingestion instead of serial paging")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_STREAM_CONCURRENCY, help="Parallel stream queries (--stream only)")
+    parser.add_argument("--min-batch-size", type=int, help="Minimum stream batch size in blocks (--stream only)")
+    parser.add_argument("--max-batch-size", type=int, help="Maximum stream batch size in blocks (--stream only)")
+    parser.add_argument("--response-bytes-ceiling", type=int, help="Response size ceiling for stream batch sizing (--stream only)")
+    parser.add_argument("--arrow", action="store_true", help="Fetch Arrow responses and decode them column-wise")
+    parser.add_argument("--insert-batch-size", type=int, default=DEFAULT_INSERT_BATCH_SIZE, help="Rows per executemany batch")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="Decoded batches buffered between fetchers and the writer")
+    parser.add_argument("--min-window", type=int, default=DEFAULT_MIN_WINDOW, help="Smallest adaptive paging window in blocks")
+    parser.add_argument("--max-window", type=int, default=DEFAULT_MAX_WINDOW, help="Largest adaptive paging window in blocks")
+    parser.add_argument("--shards", type=int, help="Split a full rebuild into N block shards fetched by separate worker processes")
+    parser.add_argument("--processes", type=int, help="Worker processes for --shards (defaults to the CPU count)")
+    parser.add_argument("--follow", action="store_true", help="Keep running and ingest new blocks as the chain head moves")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between chain height polls (--follow only)")
+    parser.add_argument("--reorg-depth", type=int, default=DEFAULT_REORG_DEPTH, help="Recent block hashes checked for reorgs (--follow only, 0 disables)")
+    parser.add_argument("--metrics-file", type=str, help="Write Prometheus text-format ingestion metrics to this file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus ingestion metrics on this port at /metrics")
     # Set default database path based on environment
     if IS_PRODUCTION:
         default_db_path = "/app/data/betting_transactions.db"
@@ -539,7 +753,7 @@ async def main():
     args = parser.parse_args()
     
     # Initialize database
-    db = BettingDatabase(db_path=args.db_path)
+    db = BettingDatabase(db_path=args.db_path, insert_batch_size=args.insert_batch_size)
     
     # Initialize Hypersync client
     config = ClientConfig(
@@ -548,6 +762,10 @@ async def main():
     )
     client = HypersyncClient(config)
     
+    if args.metrics_file or args.metrics_port is not None:
+        db.metrics = IngestMetrics("betting", args.metrics_file, args.metrics_port)
+        db.metrics.set_checkpoint(db.get_last_processed_block())
+    
     try:
         if args.stats:
             # Show database statistics
@@ -563,6 +781,26 @@ async def main():
                 print(f"  {token}: {count:,} txs, {total_volume:,.2f} volume, {avg_bet:.4f} avg")
             return
         
+        if args.follow:
+            # Tail the head from the stored checkpoint with one long-lived client
+            guard = ReorgGuard(client, db, args.reorg_depth) if args.reorg_depth > 0 else None
+            
+            async def ingest_head(end_block: int) -> int:
+                # Roll back orphaned rows before ingesting up to the new head
+                if guard:
+                    await guard.protect(end_block)
+                return await process_all_transactions(
+                    db, client, db.get_last_processed_block(), use_arrow=args.arrow, queue_size=args.queue_size,
+                    min_window=args.min_window, max_window=args.max_window, end_block=end_block)
+            
+            try:
+                await follow_chain(client, {"bets": ingest_head}, args.poll_interval)
+            except ReorgTooDeepError as e:
+                # Not retried: following on could keep orphaned rows, exit non-zero for the operator
+                print(f"❌ {e}")
+                raise SystemExit(1)
+            return
+        
         if args.start_block is not None:
             start_block = args.start_block
         elif args.incremental:
@@ -572,8 +810,29 @@ async def main():
         
         print(f"Starting data processing from block {start_block}")
         
-        # Process and store data
-        inserted_count = await process_all_transactions(db, client, start_block)
+        stream_options = None
+        if args.stream:
+            stream_options = dict(
+                concurrency=args.concurrency,
+                min_batch_size=args.min_batch_size,
+                max_batch_size=args.max_batch_size,
+                response_bytes_ceiling=args.response_bytes_ceiling
+            )
+        stream_config = build_stream_config(**stream_options) if stream_options is not None else None
+        
+        if args.shards:
+            # Full rebuild split across worker processes, merged back into this database
+            end_block = await client.get_height()
+            print(f"Current blockchain height: {end_block}")
+            inserted_count = process_sharded_backfill(db, start_block, end_block, args.shards,
+                                                      args.processes, use_arrow=args.arrow,
+                                                      stream_options=stream_options, queue_size=args.queue_size,
+                                                      min_window=args.min_window, max_window=args.max_window)
+        else:
+            # Process and store data
+            inserted_count = await process_all_transactions(db, client, start_block, stream_config,
+                                                            use_arrow=args.arrow, queue_size=args.queue_size,
+                                                            min_window=args.min_window, max_window=args.max_window)
         
         if inserted_count > 0:
             print(f"\nProcessing complete! Inserted {inserted_count} new transactions.")
@@ -593,6 +852,9 @@ async def main():
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if db.metrics:
+            db.metrics.close()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Small synthetic Monad chain for the ingestion tests.
+
+FakeChain holds MON and Jerry bets, claims of all three tokens and some noise
+(failed bets, Jerry transfers that are not bets), one block every 45 minutes so
+the data spans several local days. FakeHypersyncClient answers get(),
+get_arrow() and stream() by applying a Query's transaction/log selections,
+join mode and transaction field selection to that chain, in the shapes the
+row decoders (Transaction/Log objects with hex strings) and the Arrow
+decoders (binary columns) expect.
+"""
+
+from dataclasses import replace
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pyarrow as pa
+
+from modules.contracts import (
+    CONTRACT_ADDRESSES_1, SIG_HASH_1, CONTRACT_ADDRESS_2_TX_TO, CONTRACT_ADDRESS_2_LOG_A,
+    CONTRACT_ADDRESS_2_LOG_B, SIG_HASH_2, TOPIC_0_LOG_A, CARDS_LOG_TOPIC_0, CLAIM_FUNCTION_SIGNATURE,
+    CLAIM_EVENT_TOPIC, TRANSFER_EVENT_TOPIC, RBS_CONTRACT_ADDRESSES, JERRY_CONTRACT_ADDRESS,
+    RBSD_CONTRACT_ADDRESS
+)
+
+FIRST_TIMESTAMP = 1751320800  # 2025-06-30 22:00 UTC
+BLOCK_SECONDS = 45 * 60
+WEI = 10 ** 17
+
+TX_FIELDS = {'hash': 'hash', 'from': 'from_', 'to': 'to', 'value': 'value', 'input': 'input',
+             'status': 'status', 'block_number': 'block_number'}
+
+
+def _word(value: int) -> str:
+    return f"{value:064x}"
+
+
+def _address(n: int) -> str:
+    return f"0x{n:040x}"
+
+
+class FakeChain:
+    """Blocks first_block .. first_block + num_blocks - 1 with bets and claims derived from the block index."""
+
+    def __init__(self, first_block: int = 1, num_blocks: int = 60, wallets: int = 6):
+        self.blocks = []
+        self.transactions = []
+        self.logs = []
+        for i in range(num_blocks):
+            number = first_block + i
+            self.blocks.append(SimpleNamespace(number=number, timestamp=hex(FIRST_TIMESTAMP + i * BLOCK_SECONDS)))
+            wallet = _address(1 + (i * 5) % wallets)
+            if i % 2 == 0:
+                self._mon_bet(number, i, wallet)
+            if i % 3 == 0:
+                self._jerry_bet(number, i, wallet)
+            if i % 7 == 3:
+                # A Jerry transfer that is not a bet, joined in by the transfer log selection
+                tx = self._tx(0x03, number, i, wallet, _address(0xbeef), 0, '0xa9059cbb')
+                self._log(tx, CONTRACT_ADDRESS_2_LOG_A, [TOPIC_0_LOG_A, _word(1), _word(2)], _word(5 * WEI))
+            if i % 4 == 1:
+                self._claim(number, i, wallet)
+
+    @property
+    def height(self) -> int:
+        return self.blocks[-1].number + 1
+
+    def _tx(self, kind: int, number: int, i: int, wallet: str, to: str, value: int, input_: str, status: int = 1):
+        tx = SimpleNamespace(hash=f"0x{kind:02x}{i:062x}", from_=wallet, to=to.lower(), value=hex(value),
+                             input=input_, status=status, block_number=number)
+        self.transactions.append(tx)
+        return tx
+
+    def _log(self, tx, address: str, topics: List[str], data: str):
+        topics = ['0x' + t if not t.startswith('0x') else t for t in topics] + [None] * (4 - len(topics))
+        self.logs.append(SimpleNamespace(address=address.lower(), topics=topics, data='0x' + data,
+                                         transaction_hash=tx.hash, block_number=tx.block_number))
+
+    def _mon_bet(self, number: int, i: int, wallet: str):
+        cards = 1 + i % 4
+        to = CONTRACT_ADDRESSES_1[(i // 2) % 2]
+        input_ = SIG_HASH_1 + _word(64) + _word(cards) + _word(7) * cards
+        tx = self._tx(0x01, number, i, wallet, to, (1 + i % 5) * WEI, input_, status=0 if i % 11 == 0 else 1)
+        self._log(tx, to, [CARDS_LOG_TOPIC_0, wallet[2:].rjust(64, '0'), _word(1000 + i)], _word(0) * 4)
+
+    def _jerry_bet(self, number: int, i: int, wallet: str):
+        cards = 2 + i % 3
+        tx = self._tx(0x02, number, i, wallet, CONTRACT_ADDRESS_2_TX_TO, 0, SIG_HASH_2 + _word(cards))
+        self._log(tx, CONTRACT_ADDRESS_2_LOG_A, [TOPIC_0_LOG_A, wallet[2:].rjust(64, '0'), _word(9)],
+                  _word((3 + i % 4) * WEI))
+        self._log(tx, CONTRACT_ADDRESS_2_LOG_B, [CARDS_LOG_TOPIC_0, wallet[2:].rjust(64, '0'), _word(2000 + i)],
+                  _word(1) + _word(2) + _word(3) + _word(cards))
+
+    def _claim(self, number: int, i: int, wallet: str):
+        contract = RBS_CONTRACT_ADDRESSES[i % 2]
+        tx = self._tx(0x04, number, i, wallet, contract, 0, CLAIM_FUNCTION_SIGNATURE + _word(i))
+        self._log(tx, contract, [CLAIM_EVENT_TOPIC, wallet[2:].rjust(64, '0'), _word(1000 + i - 1)],
+                  _word((2 + i % 3) * WEI))
+        token = (JERRY_CONTRACT_ADDRESS, RBSD_CONTRACT_ADDRESS, None)[(i // 4) % 3]
+        if token:
+            self._log(tx, token, [TRANSFER_EVENT_TOPIC, _word(0), wallet[2:].rjust(64, '0')],
+                      _word((4 + i % 5) * WEI))
+
+
+def _selected(values: Optional[List[str]], value: Optional[str]) -> bool:
+    return values is None or (value is not None and value.lower() in [v.lower() for v in values])
+
+
+def _tx_matches(tx, selection) -> bool:
+    return (_selected(selection.to, tx.to)
+            and _selected(selection.sighash, tx.input[:10] if tx.input else None))
+
+
+def _log_matches(log, selection) -> bool:
+    if not _selected(selection.address, log.address):
+        return False
+    return all(not options or _selected(options, log.topics[i])
+               for i, options in enumerate(selection.topics or []))
+
+
+class FakeHypersyncClient:
+    """
+    Serves a FakeChain through the HypersyncClient methods ingestion uses.
+    Responses stop after page_blocks blocks when set, like a server time limit.
+    fail_after raises on the given call number to simulate a crash mid-run.
+    """
+
+    def __init__(self, chain: FakeChain, page_blocks: Optional[int] = None, fail_after: Optional[int] = None):
+        self.chain = chain
+        self.page_blocks = page_blocks
+        self.fail_after = fail_after
+        self.calls = 0
+
+    async def get_height(self) -> int:
+        return self.chain.height
+
+    def select(self, query):
+        """(blocks, transactions, logs, next_block) of the chain that the query returns."""
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise ConnectionError(f"fake Hypersync connection lost on call {self.calls}")
+
+        to_block = min(query.to_block or self.chain.height, self.chain.height)
+        if self.page_blocks:
+            to_block = min(to_block, query.from_block + self.page_blocks)
+        in_range = lambda item: query.from_block <= item.block_number < to_block
+        join_mode = str(query.join_mode or 'Default')
+
+        logs = [log for log in self.chain.logs if in_range(log)
+                and any(_log_matches(log, s) for s in query.logs or [])]
+        tx_hashes = {tx.hash for tx in self.chain.transactions if in_range(tx)
+                     and any(_tx_matches(tx, s) for s in query.transactions or [])}
+        if join_mode != 'JoinNothing':
+            tx_hashes |= {log.transaction_hash for log in logs}
+        if join_mode == 'JoinAll':
+            log_ids = {id(log) for log in logs}
+            logs += [log for log in self.chain.logs if log.transaction_hash in tx_hashes and id(log) not in log_ids]
+            logs.sort(key=self.chain.logs.index)
+
+        fields = [TX_FIELDS[f] for f in query.field_selection.transaction or []]
+        transactions = [
+            SimpleNamespace(**{name: getattr(tx, name) if name in fields else None for name in TX_FIELDS.values()})
+            for tx in self.chain.transactions if tx.hash in tx_hashes
+        ]
+        numbers = {tx.block_number for tx in transactions} | {log.block_number for log in logs}
+        blocks = [b for b in self.chain.blocks if b.number in numbers]
+        return blocks, transactions, logs, to_block
+
+    def _response(self, data, next_block: int):
+        return SimpleNamespace(data=data, next_block=next_block, archive_height=self.chain.height,
+                               rollback_guard=None)
+
+    async def get(self, query):
+        blocks, transactions, logs, next_block = self.select(query)
+        return self._response(SimpleNamespace(blocks=blocks, transactions=transactions, logs=logs), next_block)
+
+    async def get_arrow(self, query):
+        blocks, transactions, logs, next_block = self.select(query)
+        return self._response(arrow_data(blocks, transactions, logs), next_block)
+
+    async def stream(self, query, config):
+        return FakeReceiver(self, query)
+
+
+class FakeReceiver:
+    """Stream receiver that pages through the query range with get(), one response per recv()."""
+
+    def __init__(self, client: FakeHypersyncClient, query):
+        self.client = client
+        self.query = query
+        self.current_block = query.from_block
+        self.end_block = min(query.to_block or client.chain.height, client.chain.height)
+
+    async def recv(self):
+        if self.current_block >= self.end_block:
+            return None
+        response = await self.client.get(replace(self.query, from_block=self.current_block))
+        self.current_block = response.next_block
+        return response
+
+    async def close(self):
+        pass
+
+
+def _bytes(value: Optional[str]) -> Optional[bytes]:
+    return bytes.fromhex(value[2:]) if value is not None else None
+
+
+def _quantity(value: Optional[str]) -> Optional[bytes]:
+    if value is None:
+        return None
+    number = int(value, 16)
+    return number.to_bytes(max(1, (number.bit_length() + 7) // 8), 'big')
+
+
+def arrow_data(blocks, transactions, logs) -> SimpleNamespace:
+    """Row objects as Hypersync's binary Arrow tables (the layout modules/arrow_decode.py reads)."""
+    return SimpleNamespace(
+        blocks=pa.table({
+            'number': pa.array([b.number for b in blocks], pa.uint64()),
+            'timestamp': pa.array([_quantity(b.timestamp) for b in blocks], pa.binary()),
+        }),
+        transactions=pa.table({
+            'hash': pa.array([_bytes(t.hash) for t in transactions], pa.binary()),
+            'from': pa.array([_bytes(t.from_) for t in transactions], pa.binary()),
+            'to': pa.array([_bytes(t.to) for t in transactions], pa.binary()),
+            'value': pa.array([_quantity(t.value) for t in transactions], pa.binary()),
+            'input': pa.array([_bytes(t.input) for t in transactions], pa.binary()),
+            'status': pa.array([t.status for t in transactions], pa.uint8()),
+            'block_number': pa.array([t.block_number for t in transactions], pa.uint64()),
+        }),
+        logs=pa.table({
+            'address': pa.array([_bytes(l.address) for l in logs], pa.binary()),
+            **{f'topic{i}': pa.array([_bytes(l.topics[i]) for l in logs], pa.binary()) for i in range(4)},
+            'data': pa.array([_bytes(l.data) for l in logs], pa.binary()),
+            'transaction_hash': pa.array([_bytes(l.transaction_hash) for l in logs], pa.binary()),
+        }),
+    )
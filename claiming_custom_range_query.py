@@ -6,6 +6,8 @@ from typing import Dict, Any
 import os
 from dotenv import load_dotenv
 
+from modules.time_columns import day_id
+
 # Load environment variables
 load_dotenv('.env.local')  # Load local environment first
 load_dotenv()  # Load any other .env files
@@ -55,14 +57,14 @@ def get_custom_range_metrics(start_date: str, end_date: str) -> Dict[str, Any]:
         query = """
         SELECT
             COUNT(*) as total_claims,
-            COUNT(DISTINCT from_address) as total_unique_claimers,
+            COUNT(DISTINCT wallet_id) as total_unique_claimers,
             SUM(CASE WHEN token = 'MON' THEN CAST(amount AS REAL) ELSE 0 END) as total_mon_claimed,
             SUM(CASE WHEN token = 'JERRY' THEN CAST(amount AS REAL) ELSE 0 END) as total_jerry_claimed
         FROM claiming_transactions
-        WHERE DATE(timestamp, 'utc') >= ? AND DATE(timestamp, 'utc') <= ?
+        WHERE day_id >= ? AND day_id < ?
         """
         
-        cursor.execute(query, (start_date, end_date))
+        cursor.execute(query, (day_id(start_date), day_id(end_date) + 1))
         result = cursor.fetchone()
         
         if not result or result[0] == 0:
@@ -99,18 +101,18 @@ def get_daily_activity(start_date: str, end_date: str) -> list:
         
         query = """
         SELECT
-            DATE(timestamp, 'utc') as date,
+            DATE(day_id * 86400, 'unixepoch') as date,
             COUNT(*) as claims,
-            COUNT(DISTINCT from_address) as unique_claimers,
+            COUNT(DISTINCT wallet_id) as unique_claimers,
             SUM(CASE WHEN token = 'MON' THEN CAST(amount AS REAL) ELSE 0 END) as mon_claimed,
             SUM(CASE WHEN token = 'JERRY' THEN CAST(amount AS REAL) ELSE 0 END) as jerry_claimed
         FROM claiming_transactions
-        WHERE DATE(timestamp, 'utc') >= ? AND DATE(timestamp, 'utc') <= ?
-        GROUP BY DATE(timestamp, 'utc')
+        WHERE day_id >= ? AND day_id < ?
+        GROUP BY day_id
         ORDER BY date
         """
         
-        cursor.execute(query, (start_date, end_date))
+        cursor.execute(query, (day_id(start_date), day_id(end_date) + 1))
         results = cursor.fetchall()
         
         daily_data = []
@@ -15,7 +15,7 @@ import os
 import sqlite3
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from contextlib import contextmanager
 
 # Load environment variables
@@ -25,25 +25,27 @@ load_dotenv()
 from hypersync import HypersyncClient, ClientConfig, TransactionSelection, LogSelection, FieldSelection, Query
 from hypersync import LogField, TransactionField, BlockField
 
+from modules.response_index import build_response_index
+from modules.contracts import (
+    CLAIM_FUNCTION_SIGNATURE, CLAIM_EVENT_TOPIC, TRANSFER_EVENT_TOPIC, RBS_CONTRACT_ADDRESSES,
+    JERRY_CONTRACT_ADDRESS, RBSD_CONTRACT_ADDRESS, CLAIMING_COLUMNS
+)
+from modules.bulk_writer import BulkWriter, DEFAULT_INSERT_BATCH_SIZE
+from modules.ingest_metrics import IngestMetrics
+from modules.ingest_pipeline import iter_batches, run_pipeline
+from modules.adaptive_pager import AdaptivePager, DEFAULT_MIN_WINDOW, DEFAULT_MAX_WINDOW
+from modules.shard_backfill import run_shards, merge_shards, remove_shards
+from modules.follow_loop import follow_chain, DEFAULT_POLL_INTERVAL
+from modules.reorg_guard import ReorgGuard, ReorgTooDeepError, DEFAULT_REORG_DEPTH
+from modules.block_cache import ensure_blocks_table, block_rows, write_blocks, BLOCK_COLUMNS
+from modules.wallets import ensure_wallet_ids, wallet_converters, drop_unused_wallets, WALLET_RENAMES
+from modules.time_columns import ensure_time_columns, assign_time_columns
+from modules.compact_storage import compact_converters
+
 # Configuration
 MONAD_HYPERSYNC_URL = os.getenv("MONAD_HYPERSYNC_URL", "https://monad-testnet.hypersync.xyz")
 HYPERSYNC_BEARER_TOKEN = os.getenv("HYPERSYNC_BEARER_TOKEN")
 
-# Contract addresses and signatures
-CLAIM_FUNCTION_SIGNATURE = '0xa11fd1e3'
-CLAIM_EVENT_TOPIC = '0x9f930e45e5f186baa9054d3efb58f5f12c8894372119fb461d8abd2b9418cf2d'
-TRANSFER_EVENT_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
-
-# RBS Contract addresses
-RBS_CONTRACT_ADDRESSES = [
-    '0x3ad50059d6008b711209a509fe58e68f0b672a42',
-    '0x740990cb01e893a371a050736c62ae0b779109e7'
-]
-
-# Token contract addresses
-JERRY_CONTRACT_ADDRESS = '0xda054a96254776346386060c480b42a10c870cd2'
-RBSD_CONTRACT_ADDRESS = '0x8a86d48c867b76FF74A36d3AF4d2F1E707B143eD'
-
 def hex_to_int(hex_str: str) -> int:
     """Convert hex string to integer."""
     if not hex_str or hex_str == '0x':
@@ -51,8 +53,12 @@ def hex_to_int(hex_str: str) -> int:
     return int(hex_str, 16)
 
 class ComprehensiveClaimingDatabase:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE, raw: bool = False):
         self.db_path = db_path
+        self.raw = raw  # backfill shards: no wallet ids or time columns until the merge
+        self.metrics = None  # IngestMetrics, set by main() when metrics are exported
+        self.writer = BulkWriter("claiming_transactions", CLAIMING_COLUMNS, insert_batch_size,
+                                 renames=None if raw else WALLET_RENAMES)
         self.init_database()
     
     @contextmanager
@@ -69,13 +75,16 @@ class ComprehensiveClaimingDatabase:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
-            # Create claiming transactions table
-            cursor.execute('''
+            # Shards keep the address, the merge resolves it to a wallet id
+            wallet_column = "from_address TEXT NOT NULL" if self.raw else "wallet_id INTEGER NOT NULL REFERENCES wallets(id)"
+            
+            # Create claiming transactions table (readers that need the address use claiming_transactions_v)
+            cursor.execute(f'''
                 CREATE TABLE IF NOT EXISTS claiming_transactions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     timestamp DATETIME NOT NULL,
                     tx_hash TEXT UNIQUE NOT NULL,
-                    from_address TEXT NOT NULL,
+                    {wallet_column},
                     to_address TEXT NOT NULL,
                     token TEXT NOT NULL,
                     amount REAL NOT NULL,
@@ -86,7 +95,8 @@ class ComprehensiveClaimingDatabase:
             ''')
             
             # Create indexes for better performance
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_tx_hash ON claiming_transactions(tx_hash)')
+            # tx_hash is UNIQUE, its autoindex already serves lookups
+            cursor.execute('DROP INDEX IF EXISTS idx_tx_hash')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON claiming_transactions(timestamp)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_token ON claiming_transactions(token)')
             cursor.execute('CREATE INDEX IF NOT EXISTS idx_bet_id ON claiming_transactions(bet_id)')
@@ -101,6 +111,21 @@ class ComprehensiveClaimingDatabase:
                 )
             """)
             
+            # Block timestamp cache filled as a side effect of ingestion
+            ensure_blocks_table(conn)
+            
+            self.converters = {}
+            if not self.raw:
+                # Integer wallet ids in place of from_address, the view joins the address back in
+                ensure_wallet_ids(conn, "claiming_transactions")
+                # Integer ts_epoch / day_id for index range filters on dates
+                ensure_time_columns(conn, "claiming_transactions")
+                
+                # Databases migrated by compact_database.py store hashes and addresses as BLOBs
+                self.converters = compact_converters(conn, "claiming_transactions")
+                # Addresses are resolved to their wallet id before the insert
+                self.writer.set_converters(wallet_converters(self.converters))
+            
             # Insert initial checkpoint if none exists
             cursor.execute("SELECT COUNT(*) FROM checkpoints")
             if cursor.fetchone()[0] == 0:
@@ -109,39 +134,63 @@ class ComprehensiveClaimingDatabase:
             conn.commit()
             print(f"Database initialized: {self.db_path}")
     
+    def update_derived(self, conn: sqlite3.Connection):
+        """Assign time columns to new rows (no-op for raw databases)."""
+        if self.raw:
+            return
+        assign_time_columns(conn, "claiming_transactions")
+    
     def insert_transactions(self, transactions: List[Dict[str, Any]]) -> int:
         """Insert claiming transactions into the database."""
         if not transactions:
             return 0
         
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            inserted_count = 0
-            
-            for tx in transactions:
-                try:
-                    cursor.execute('''
-                        INSERT INTO claiming_transactions 
-                        (timestamp, tx_hash, from_address, to_address, token, amount, bet_id, block_number)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    ''', (
-                        tx['timestamp'],
-                        tx['tx_hash'],
-                        tx['from_address'],
-                        tx['to_address'],
-                        tx['token'],
-                        tx['amount'],
-                        tx['bet_id'],
-                        tx['block_number']
-                    ))
-                    inserted_count += 1
-                except sqlite3.IntegrityError:
-                    continue  # Skip duplicates
-            
+            inserted_count, skipped_count = self.writer.write_dicts(conn, transactions)
+            self.update_derived(conn)
+            conn.commit()
+            print(f"Inserted {inserted_count} new transactions (skipped {skipped_count} duplicates)")
+            return inserted_count
+    
+    def insert_arrow_batch(self, batch) -> int:
+        """Insert a decoded Arrow batch (see modules/arrow_decode.py), skipping duplicates."""
+        from modules.arrow_decode import arrow_rows
+        with self.get_connection() as conn:
+            inserted_count, _ = self.writer.write_rows(conn, arrow_rows(batch, self.writer.columns))
+            self.update_derived(conn)
             conn.commit()
-            print(f"Inserted {inserted_count} new transactions (skipped {len(transactions) - inserted_count} duplicates)")
             return inserted_count
     
+    def commit_batch(self, batch, block_number: Optional[int] = None, blocks: Optional[List[tuple]] = None) -> int:
+        """
+        Insert a batch and advance the checkpoint in the same SQLite transaction.
+
+        batch is either a list of row dicts or a decoded Arrow table. A crash can
+        therefore never leave rows without their checkpoint (or the reverse), and
+        a restart resumes after the last committed batch.
+        blocks are the (block_number, timestamp) pairs of the batch's response,
+        stored in the blocks cache in the same transaction.
+        """
+        with self.get_connection() as conn:
+            if isinstance(batch, list):
+                inserted_count, skipped_count = self.writer.write_dicts(conn, batch)
+            else:
+                # Only --arrow runs produce Arrow batches, numpy/pyarrow are not needed otherwise
+                from modules.arrow_decode import arrow_rows
+                inserted_count, skipped_count = self.writer.write_rows(conn, arrow_rows(batch, self.writer.columns))
+            self.update_derived(conn)
+            if blocks:
+                write_blocks(conn, blocks)
+            if block_number is not None:
+                self._set_checkpoint(conn, block_number)
+            conn.commit()
+        
+        if self.metrics:
+            self.metrics.observe_write(inserted_count + skipped_count, inserted_count, block_number)
+        if block_number is not None:
+            print(f"Committed {inserted_count} new transactions (skipped {skipped_count} duplicates), checkpoint at block {block_number}")
+        return inserted_count
+    
     def get_last_processed_block(self) -> int:
         """Get the last processed block number."""
         with self.get_connection() as conn:
@@ -150,17 +199,43 @@ class ComprehensiveClaimingDatabase:
             result = cursor.fetchone()
             return result[0] if result else 0
     
+    def _set_checkpoint(self, conn: sqlite3.Connection, block_number: int):
+        """Write the checkpoint on an open connection (the caller commits)."""
+        conn.execute("""
+            UPDATE checkpoints 
+            SET last_processed_block = ?, last_update = CURRENT_TIMESTAMP
+            WHERE id = (SELECT id FROM checkpoints ORDER BY id DESC LIMIT 1)
+        """, (block_number,))
+    
+    def rollback_to_block(self, block_number: int) -> int:
+        """
+        Delete rows at or above block_number and move the checkpoint back to it (reorg recovery).
+        Wallets that only the deleted rows referenced are removed in the same transaction.
+        """
+        with self.get_connection() as conn:
+            wallet_ids = [row[0] for row in conn.execute(
+                "SELECT DISTINCT wallet_id FROM claiming_transactions WHERE block_number >= ?",
+                (block_number,))]
+            cursor = conn.execute("DELETE FROM claiming_transactions WHERE block_number >= ?", (block_number,))
+            deleted_count = cursor.rowcount
+            conn.execute("DELETE FROM blocks WHERE block_number >= ?", (block_number,))
+            drop_unused_wallets(conn, "claiming_transactions", wallet_ids)
+            last_block = conn.execute("SELECT last_processed_block FROM checkpoints ORDER BY id DESC LIMIT 1").fetchone()
+            if last_block is None or last_block[0] > block_number:
+                self._set_checkpoint(conn, block_number)
+            conn.commit()
+        if self.metrics:
+            self.metrics.set_checkpoint(block_number)
+        return deleted_count
+    
     def update_last_processed_block(self, block_number: int):
         """Update the last processed block number."""
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                UPDATE checkpoints 
-                SET last_processed_block = ?, last_update = CURRENT_TIMESTAMP
-                WHERE id = (SELECT id FROM checkpoints ORDER BY id DESC LIMIT 1)
-            """, (block_number,))
+            self._set_checkpoint(conn, block_number)
             conn.commit()
             print(f"Updated last processed block to: {block_number}")
+        if self.metrics:
+            self.metrics.set_checkpoint(block_number)
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
@@ -171,7 +246,7 @@ class ComprehensiveClaimingDatabase:
             cursor.execute('''
                 SELECT 
                     COUNT(*) as total_transactions,
-                    COUNT(DISTINCT from_address) as unique_users,
+                    (SELECT COUNT(*) FROM wallets) as unique_users,
                     COUNT(DISTINCT tx_hash) as unique_transactions
                 FROM claiming_transactions
             ''')
@@ -199,244 +274,212 @@ class ComprehensiveClaimingDatabase:
                 'token_stats': token_stats
             }
 
-async def fetch_all_claiming_transactions_fixed(client: HypersyncClient, start_block: int, end_block: int) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
-    """Fetch all claiming transactions and properly categorize them based on contract interactions."""
-    print(f"Fetching all claiming transactions from {start_block} to {end_block}...")
-    
+def build_claiming_query(from_block: int, to_block: int) -> Query:
+    """Comprehensive query for all claiming transactions."""
+    return Query(
+        from_block=from_block,
+        to_block=to_block,
+        transactions=[
+            TransactionSelection(
+                to=RBS_CONTRACT_ADDRESSES,
+                sighash=[CLAIM_FUNCTION_SIGNATURE]
+            )
+        ],
+        logs=[
+            # RBS claiming logs
+            LogSelection(
+                address=RBS_CONTRACT_ADDRESSES,
+                topics=[[CLAIM_EVENT_TOPIC]]
+            ),
+            # JERRY transfer logs
+            LogSelection(
+                address=[JERRY_CONTRACT_ADDRESS],
+                topics=[[TRANSFER_EVENT_TOPIC]]
+            ),
+            # RBSD transfer logs
+            LogSelection(
+                address=[RBSD_CONTRACT_ADDRESS],
+                topics=[[TRANSFER_EVENT_TOPIC]]
+            )
+        ],
+        field_selection=FieldSelection(
+            block=['timestamp', 'number'],
+            transaction=['hash', 'from', 'to', 'value', 'input', 'status', 'block_number'],
+            log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
+                 LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
+        )
+    )
+
+def decode_claiming_response(response) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Decode and categorize the claiming transactions of a single Hypersync response."""
     mon_transactions = []
     jerry_transactions = []
     rbsd_transactions = []
-    current_block = start_block
-    
-    while current_block < end_block:
-        print(f"  Processing blocks {current_block} to {min(current_block + 500000, end_block)}...")
-        
-        # Comprehensive query for all claiming transactions
-        query = Query(
-            from_block=current_block,
-            to_block=min(current_block + 500000, end_block),
-            transactions=[
-                TransactionSelection(
-                    to=RBS_CONTRACT_ADDRESSES,
-                    sighash=[CLAIM_FUNCTION_SIGNATURE]
-                )
-            ],
-            logs=[
-                # RBS claiming logs
-                LogSelection(
-                    address=RBS_CONTRACT_ADDRESSES,
-                    topics=[[CLAIM_EVENT_TOPIC]]
-                ),
-                # JERRY transfer logs
-                LogSelection(
-                    address=[JERRY_CONTRACT_ADDRESS],
-                    topics=[[TRANSFER_EVENT_TOPIC]]
-                ),
-                # RBSD transfer logs
-                LogSelection(
-                    address=[RBSD_CONTRACT_ADDRESS],
-                    topics=[[TRANSFER_EVENT_TOPIC]]
-                )
-            ],
-            field_selection=FieldSelection(
-                block=['timestamp', 'number'],
-                transaction=['hash', 'from', 'to', 'value', 'input', 'status', 'block_number'],
-                log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
-                     LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
-            )
+    if not response.data:
+        return mon_transactions, jerry_transactions, rbsd_transactions
+
+    block_timestamp_map = {
+        b.number: hex_to_int(b.timestamp)
+        for b in response.data.blocks if b.number and b.timestamp
+    }
+
+    # Index logs by transaction hash and (address, topic0) once per response
+    index = build_response_index(response)
+
+    for tx in response.data.transactions:
+        if tx.status != 1:  # Only successful transactions
+            continue
+
+        timestamp = block_timestamp_map.get(tx.block_number)
+        if not timestamp:
+            continue
+
+        # Get all logs for this transaction
+        tx_logs = index.logs_for(tx.hash)
+
+        # Check if transaction has RBS claiming logs
+        has_rbs_claiming_log = any(
+            index.has_log(tx.hash, address, CLAIM_EVENT_TOPIC)
+            for address in RBS_CONTRACT_ADDRESSES
         )
 
-        response = await client.get(query)
+        if not has_rbs_claiming_log:
+            continue
 
-        print(f"    Query returned: {len(response.data.transactions) if response.data else 0} transactions, {len(response.data.logs) if response.data else 0} logs")
+        # Check for token contract interactions
+        has_jerry_transfer_log = index.has_log(tx.hash, JERRY_CONTRACT_ADDRESS, TRANSFER_EVENT_TOPIC)
 
-        if response.data:
-            block_timestamp_map = {
-                b.number: hex_to_int(b.timestamp)
-                for b in response.data.blocks if b.number and b.timestamp
-            }
+        has_rbsd_transfer_log = index.has_log(tx.hash, RBSD_CONTRACT_ADDRESS, TRANSFER_EVENT_TOPIC)
 
-            # Group logs by transaction hash
-            logs_by_tx_hash = {}
-            for log in response.data.logs:
-                if log.transaction_hash not in logs_by_tx_hash:
-                    logs_by_tx_hash[log.transaction_hash] = []
-                logs_by_tx_hash[log.transaction_hash].append(log)
+        # Categorize based on contract interactions
+        if has_jerry_transfer_log:
+            # This is a JERRY transaction
+            print(f"    Categorizing as JERRY: {tx.hash}")
 
-            # print(f"    Grouped logs by {len(logs_by_tx_hash)} transaction hashes")
+            # Extract JERRY data
+            bet_id = 0
+            claim_amount = 0
 
-            for tx in response.data.transactions:
-                if tx.status != 1:  # Only successful transactions
-                    continue
+            for log in tx_logs:
+                # Get claim amount from JERRY transfer log
+                if (log.address and log.address.lower() == JERRY_CONTRACT_ADDRESS.lower() and
+                    log.topics and log.topics[0] and log.topics[0].lower() == TRANSFER_EVENT_TOPIC.lower()):
+                    if log.data and len(log.data) >= 66:
+                        data_hex = log.data[2:66]
+                        try:
+                            claim_amount = hex_to_int(data_hex) / 1e18
+                            print(f"      Found claim amount: {claim_amount} Jerry from transfer log")
+                        except (ValueError, TypeError):
+                            print(f"      Failed to parse claim amount from transfer log: {log.data}")
 
-                timestamp = block_timestamp_map.get(tx.block_number)
-                if not timestamp:
-                    continue
+                # Get bet_id from RBS claiming log
+                elif (log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
+                      log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()):
+                    if len(log.topics) >= 3 and log.topics[2]:
+                        bet_id = hex_to_int(log.topics[2])
+                        print(f"      Found bet_id: {bet_id} from claiming log")
+
+            if claim_amount > 0:
+                jerry_transactions.append({
+                    "timestamp": datetime.fromtimestamp(timestamp),
+                    "tx_hash": tx.hash,
+                    "from_address": tx.from_,
+                    "to_address": tx.to,
+                    "token": "JERRY",
+                    "amount": claim_amount,
+                    "bet_id": bet_id,
+                    "block_number": tx.block_number,
+                })
+
+        elif has_rbsd_transfer_log:
+            # This is a RBSD transaction
+            print(f"    Categorizing as RBSD: {tx.hash}")
+            print(f"    🔍 RBSD TRANSACTION FOUND: {tx.hash}")
+
+            # Extract RBSD data
+            bet_id = 0
+            claim_amount = 0
+
+            for log in tx_logs:
+                # Get claim amount from RBSD transfer log
+                if (log.address and log.address.lower() == RBSD_CONTRACT_ADDRESS.lower() and
+                    log.topics and log.topics[0] and log.topics[0].lower() == TRANSFER_EVENT_TOPIC.lower()):
+                    if log.data and len(log.data) >= 66:
+                        data_hex = log.data[2:66]
+                        try:
+                            claim_amount = hex_to_int(data_hex) / 1e18
+                            print(f"      Found claim amount: {claim_amount} RBSD from transfer log")
+                        except (ValueError, TypeError):
+                            print(f"      Failed to parse claim amount from transfer log: {log.data}")
+
+                # Get bet_id from RBS claiming log
+                elif (log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
+                      log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()):
+                    if len(log.topics) >= 3 and log.topics[2]:
+                        bet_id = hex_to_int(log.topics[2])
+                        print(f"      Found bet_id: {bet_id} from claiming log")
+
+            if claim_amount > 0:
+                rbsd_transactions.append({
+                    "timestamp": datetime.fromtimestamp(timestamp),
+                    "tx_hash": tx.hash,
+                    "from_address": tx.from_,
+                    "to_address": tx.to,
+                    "token": "RBSD",
+                    "amount": claim_amount,
+                    "bet_id": bet_id,
+                    "block_number": tx.block_number,
+                })
+                print(f"    ✅ RBSD transaction added: {tx.hash} | Amount: {claim_amount} RBSD")
+            else:
+                print(f"    ❌ RBSD transaction skipped (no valid amount): {tx.hash}")
 
-                # Get all logs for this transaction
-                tx_logs = logs_by_tx_hash.get(tx.hash, [])
-                
-                # Check if transaction has RBS claiming logs
-                has_rbs_claiming_log = any(
-                    log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
-                    log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()
-                    for log in tx_logs
-                )
-                
-                if not has_rbs_claiming_log:
-                    continue
-                
-                # Check for token contract interactions
-                has_jerry_transfer_log = any(
-                    log.address and log.address.lower() == JERRY_CONTRACT_ADDRESS.lower() and
-                    log.topics and log.topics[0] and log.topics[0].lower() == TRANSFER_EVENT_TOPIC.lower()
-                    for log in tx_logs
-                )
-                
-                has_rbsd_transfer_log = any(
-                    log.address and log.address.lower() == RBSD_CONTRACT_ADDRESS.lower() and
-                    log.topics and log.topics[0] and log.topics[0].lower() == TRANSFER_EVENT_TOPIC.lower()
-                    for log in tx_logs
-                )
-                
-                # Categorize based on contract interactions
-                if has_jerry_transfer_log:
-                    # This is a JERRY transaction
-                    print(f"    Categorizing as JERRY: {tx.hash}")
-                    
-                    # Extract JERRY data
-                    bet_id = 0
-                    claim_amount = 0
-                    
-                    for log in tx_logs:
-                        # Get claim amount from JERRY transfer log
-                        if (log.address and log.address.lower() == JERRY_CONTRACT_ADDRESS.lower() and
-                            log.topics and log.topics[0] and log.topics[0].lower() == TRANSFER_EVENT_TOPIC.lower()):
-                            if log.data and len(log.data) >= 66:
-                                data_hex = log.data[2:66]
-                                try:
-                                    claim_amount = hex_to_int(data_hex) / 1e18
-                                    print(f"      Found claim amount: {claim_amount} Jerry from transfer log")
-                                except (ValueError, TypeError):
-                                    print(f"      Failed to parse claim amount from transfer log: {log.data}")
-                        
-                        # Get bet_id from RBS claiming log
-                        elif (log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
-                              log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()):
-                            if len(log.topics) >= 3 and log.topics[2]:
-                                bet_id = hex_to_int(log.topics[2])
-                                print(f"      Found bet_id: {bet_id} from claiming log")
-                    
-                    if claim_amount > 0:
-                        jerry_transactions.append({
-                            "timestamp": datetime.fromtimestamp(timestamp),
-                            "tx_hash": tx.hash,
-                            "from_address": tx.from_,
-                            "to_address": tx.to,
-                            "token": "JERRY",
-                            "amount": claim_amount,
-                            "bet_id": bet_id,
-                            "block_number": tx.block_number,
-                        })
-                
-                elif has_rbsd_transfer_log:
-                    # This is a RBSD transaction
-                    print(f"    Categorizing as RBSD: {tx.hash}")
-                    print(f"    🔍 RBSD TRANSACTION FOUND: {tx.hash}")
-                    
-                    # Extract RBSD data
-                    bet_id = 0
-                    claim_amount = 0
-                    
-                    for log in tx_logs:
-                        # Get claim amount from RBSD transfer log
-                        if (log.address and log.address.lower() == RBSD_CONTRACT_ADDRESS.lower() and
-                            log.topics and log.topics[0] and log.topics[0].lower() == TRANSFER_EVENT_TOPIC.lower()):
-                            if log.data and len(log.data) >= 66:
-                                data_hex = log.data[2:66]
-                                try:
-                                    claim_amount = hex_to_int(data_hex) / 1e18
-                                    print(f"      Found claim amount: {claim_amount} RBSD from transfer log")
-                                except (ValueError, TypeError):
-                                    print(f"      Failed to parse claim amount from transfer log: {log.data}")
-                        
-                        # Get bet_id from RBS claiming log
-                        elif (log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
-                              log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()):
-                            if len(log.topics) >= 3 and log.topics[2]:
-                                bet_id = hex_to_int(log.topics[2])
-                                print(f"      Found bet_id: {bet_id} from claiming log")
-                    
-                    if claim_amount > 0:
-                        rbsd_transactions.append({
-                            "timestamp": datetime.fromtimestamp(timestamp),
-                            "tx_hash": tx.hash,
-                            "from_address": tx.from_,
-                            "to_address": tx.to,
-                            "token": "RBSD",
-                            "amount": claim_amount,
-                            "bet_id": bet_id,
-                            "block_number": tx.block_number,
-                        })
-                        print(f"    ✅ RBSD transaction added: {tx.hash} | Amount: {claim_amount} RBSD")
-                    else:
-                        print(f"    ❌ RBSD transaction skipped (no valid amount): {tx.hash}")
-                
-                else:
-                    # This is a MON transaction (no JERRY or RBSD transfer logs)
-                    print(f"    Categorizing as MON: {tx.hash}")
-                    
-                    # Extract MON data
-                    bet_id = 0
-                    claim_amount = 0
-                    
-                    for log in tx_logs:
-                        if (log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
-                            log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()):
-                            bet_id = hex_to_int(log.topics[2]) if len(log.topics) >= 3 and log.topics[2] else 0
-                            
-                            # Extract claim amount from log data (first 32 bytes)
-                            if log.data and len(log.data) >= 66:
-                                data_hex = log.data[2:66]
-                                try:
-                                    claim_amount = hex_to_int(data_hex) / 1e18
-                                    print(f"      Found claim amount: {claim_amount} MON from log data")
-                                except (ValueError, TypeError):
-                                    print(f"      Failed to parse claim amount from log data: {log.data}")
-                            break
-                    
-                    if claim_amount > 0:
-                        mon_transactions.append({
-                            "timestamp": datetime.fromtimestamp(timestamp),
-                            "tx_hash": tx.hash,
-                            "from_address": tx.from_,
-                            "to_address": tx.to,
-                            "token": "MON",
-                            "amount": claim_amount,
-                            "bet_id": bet_id,
-                            "block_number": tx.block_number,
-                        })
-        
-        if response.next_block and response.next_block > current_block:
-            current_block = response.next_block
         else:
-            current_block += 500000
+            # This is a MON transaction (no JERRY or RBSD transfer logs)
+            print(f"    Categorizing as MON: {tx.hash}")
+
+            # Extract MON data
+            bet_id = 0
+            claim_amount = 0
+
+            for log in tx_logs:
+                if (log.address and log.address.lower() in [addr.lower() for addr in RBS_CONTRACT_ADDRESSES] and
+                    log.topics and log.topics[0] and log.topics[0].lower() == CLAIM_EVENT_TOPIC.lower()):
+                    bet_id = hex_to_int(log.topics[2]) if len(log.topics) >= 3 and log.topics[2] else 0
+
+                    # Extract claim amount from log data (first 32 bytes)
+                    if log.data and len(log.data) >= 66:
+                        data_hex = log.data[2:66]
+                        try:
+                            claim_amount = hex_to_int(data_hex) / 1e18
+                            print(f"      Found claim amount: {claim_amount} MON from log data")
+                        except (ValueError, TypeError):
+                            print(f"      Failed to parse claim amount from log data: {log.data}")
+                    break
+
+            if claim_amount > 0:
+                mon_transactions.append({
+                    "timestamp": datetime.fromtimestamp(timestamp),
+                    "tx_hash": tx.hash,
+                    "from_address": tx.from_,
+                    "to_address": tx.to,
+                    "token": "MON",
+                    "amount": claim_amount,
+                    "bet_id": bet_id,
+                    "block_number": tx.block_number,
+                })
 
-    print(f"Found {len(mon_transactions)} MON claiming transactions")
-    print(f"Found {len(jerry_transactions)} JERRY claiming transactions")
-    print(f"Found {len(rbsd_transactions)} RBSD claiming transactions")
-    
-    # Print all RBSD transaction hashes
-    if rbsd_transactions:
-        print(f"\n🔍 ALL RBSD TRANSACTION HASHES:")
-        for i, tx in enumerate(rbsd_transactions, 1):
-            print(f"  {i}. {tx['tx_hash']} | Amount: {tx['amount']} RBSD | Bet ID: {tx['bet_id']}")
-    else:
-        print(f"\n❌ No RBSD transactions found in this block range")
-    
     return mon_transactions, jerry_transactions, rbsd_transactions
 
-async def process_all_claiming_transactions(db: ComprehensiveClaimingDatabase, client: HypersyncClient, start_block: int = None, end_block: int = None):
+def decode_claiming_rows(response) -> List[Dict[str, Any]]:
+    """Decode a response into one list of MON, JERRY and RBSD claiming rows."""
+    mon_data, jerry_data, rbsd_data = decode_claiming_response(response)
+    print(f"    Decoded {len(mon_data)} MON, {len(jerry_data)} JERRY, {len(rbsd_data)} RBSD claiming transactions")
+    return mon_data + jerry_data + rbsd_data
+
+async def process_all_claiming_transactions(db: ComprehensiveClaimingDatabase, client: HypersyncClient, start_block: int = None, end_block: int = None,
+                                            use_arrow: bool = False, min_window: int = DEFAULT_MIN_WINDOW,
+                                            max_window: int = DEFAULT_MAX_WINDOW):
     """Process all claiming transactions from start_block to end_block."""
     if start_block is None:
         start_block = db.get_last_processed_block()
@@ -449,27 +492,82 @@ async def process_all_claiming_transactions(db: ComprehensiveClaimingDatabase, c
     else:
         print(f"Using specified end block: {end_block}")
     
+    if db.metrics:
+        db.metrics.set_height(end_block)
+    
     if start_block >= end_block:
         print(f"No new blocks to process (last processed: {start_block}, current: {end_block})")
         return 0
     
     print(f"Processing blocks {start_block} to {end_block}")
     
-    # Fetch new data
-    mon_data, jerry_data, rbsd_data = await fetch_all_claiming_transactions_fixed(client, start_block, end_block)
+    # Fetch and commit one response at a time; rows, block timestamps and checkpoint
+    # share a transaction, so a restart loses at most one batch of work
+    if use_arrow:
+        # numpy/pyarrow are only imported for --arrow runs
+        from modules.arrow_decode import decode_claiming_arrow as decode, arrow_block_rows as blocks_of
+    else:
+        decode, blocks_of = decode_claiming_rows, block_rows
+    batches = iter_batches(client, build_claiming_query,
+                           lambda response: (decode(response), blocks_of(response)),
+                           "claiming", start_block, end_block, use_arrow=use_arrow,
+                           pager=AdaptivePager("claiming", 500000, min_window, max_window), metrics=db.metrics)
+    inserted_count = await run_pipeline(
+        {"claiming": batches},
+        lambda batch, checkpoint: db.commit_batch(batch[0], checkpoint, blocks=batch[1]),
+        start_block
+    )
     
-    all_tx_data = mon_data + jerry_data + rbsd_data
+    db.update_last_processed_block(end_block)
     
-    if not all_tx_data:
-        print("No new transactions found.")
-        db.update_last_processed_block(end_block)
+    return inserted_count
+
+def backfill_shard(db_path: str, from_block: int, to_block: int, use_arrow: bool = False,
+                   insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE, min_window: int = DEFAULT_MIN_WINDOW,
+                   max_window: int = DEFAULT_MAX_WINDOW) -> int:
+    """Worker process entry point: ingest [from_block, to_block) into its own shard database."""
+    # Shards only hold raw rows and blocks, the derived columns are filled once after the merge
+    db = ComprehensiveClaimingDatabase(db_path, insert_batch_size=insert_batch_size, raw=True)
+    client = HypersyncClient(ClientConfig(
+        url=MONAD_HYPERSYNC_URL,
+        bearer_token=HYPERSYNC_BEARER_TOKEN
+    ))
+    # A shard left over from an interrupted backfill resumes from its own checkpoint
+    start_block = max(from_block, db.get_last_processed_block())
+    return asyncio.run(process_all_claiming_transactions(db, client, start_block, to_block, use_arrow=use_arrow,
+                                                         min_window=min_window, max_window=max_window))
+
+def process_sharded_backfill(db: ComprehensiveClaimingDatabase, start_block: int, end_block: int, shards: int,
+                             processes: Optional[int] = None, use_arrow: bool = False,
+                             min_window: int = DEFAULT_MIN_WINDOW, max_window: int = DEFAULT_MAX_WINDOW) -> int:
+    """
+    Rebuild [start_block, end_block) with one worker process per block shard, then
+    merge the shard databases into db and advance its checkpoint to the plan's end.
+    Every shard pages with the given adaptive window bounds.
+    """
+    if start_block >= end_block:
+        print(f"No new blocks to process (last processed: {start_block}, current: {end_block})")
         return 0
     
-    # Store transactions in database
-    inserted_count = db.insert_transactions(all_tx_data)
-    
-    # Update checkpoint
-    db.update_last_processed_block(end_block)
+    if db.metrics:
+        db.metrics.set_height(end_block)
+    
+    plan = run_shards(backfill_shard, db.db_path, start_block, end_block, shards, processes,
+                      use_arrow=use_arrow, insert_batch_size=db.writer.batch_size,
+                      min_window=min_window, max_window=max_window)
+    
+    print(f"Merging {len(plan['paths'])} shards into {db.db_path}...")
+    inserted_count = merge_shards(db.db_path, plan['paths'], "claiming_transactions", CLAIMING_COLUMNS,
+                                  converters=db.converters, wallet_column='from_address')
+    merge_shards(db.db_path, plan['paths'], "blocks", BLOCK_COLUMNS)
+    with db.get_connection() as conn:
+        db.update_derived(conn)
+        conn.commit()
+    if db.metrics:
+        # Worker processes do not report metrics, only the merged result is recorded
+        db.metrics.observe_write(inserted_count, inserted_count)
+    db.update_last_processed_block(plan['end_block'])
+    remove_shards(db.db_path)
     
     return inserted_count
 
@@ -585,10 +683,21 @@ async def main():
     parser.add_argument("--start-block", type=int, help="Start from specific block")
     parser.add_argument("--end-block", type=int, help="End at specific block (defaults to current height)")
     parser.add_argument("--stats", action="store_true", help="Show database statistics")
+    parser.add_argument("--arrow", action="store_true", help="Fetch Arrow responses and decode them column-wise")
+    parser.add_argument("--insert-batch-size", type=int, default=DEFAULT_INSERT_BATCH_SIZE, help="Rows per executemany batch")
+    parser.add_argument("--min-window", type=int, default=DEFAULT_MIN_WINDOW, help="Smallest adaptive paging window in blocks")
+    parser.add_argument("--max-window", type=int, default=DEFAULT_MAX_WINDOW, help="Largest adaptive paging window in blocks")
+    parser.add_argument("--shards", type=int, help="Split a full rebuild into N block shards fetched by separate worker processes")
+    parser.add_argument("--processes", type=int, help="Worker processes for --shards (defaults to the CPU count)")
+    parser.add_argument("--follow", action="store_true", help="Keep running and ingest new blocks as the chain head moves")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between chain height polls (--follow only)")
+    parser.add_argument("--reorg-depth", type=int, default=DEFAULT_REORG_DEPTH, help="Recent block hashes checked for reorgs (--follow only, 0 disables)")
+    parser.add_argument("--metrics-file", type=str, help="Write Prometheus text-format ingestion metrics to this file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus ingestion metrics on this port at /metrics")
     args = parser.parse_args()
     
     # Initialize database
-    db = ComprehensiveClaimingDatabase(db_path="data/comprehensive_claiming_transactions_fixed.db")
+    db = ComprehensiveClaimingDatabase(db_path="data/comprehensive_claiming_transactions_fixed.db", insert_batch_size=args.insert_batch_size)
     
     # Initialize Hypersync client
     config = ClientConfig(
@@ -597,6 +706,10 @@ async def main():
     )
     client = HypersyncClient(config)
     
+    if args.metrics_file or args.metrics_port is not None:
+        db.metrics = IngestMetrics("claiming", args.metrics_file, args.metrics_port)
+        db.metrics.set_checkpoint(db.get_last_processed_block())
+    
     try:
         if args.stats:
             # Show database statistics
@@ -612,6 +725,26 @@ async def main():
                 print(f"  {token}: {count:,} txs, {total_volume:,.2f} volume, {avg_amount:.4f} avg")
             return
         
+        if args.follow:
+            # Tail the head from the stored checkpoint with one long-lived client
+            guard = ReorgGuard(client, db, args.reorg_depth) if args.reorg_depth > 0 else None
+            
+            async def ingest_head(end_block: int) -> int:
+                # Roll back orphaned rows before ingesting up to the new head
+                if guard:
+                    await guard.protect(end_block)
+                return await process_all_claiming_transactions(
+                    db, client, db.get_last_processed_block(), end_block, use_arrow=args.arrow,
+                    min_window=args.min_window, max_window=args.max_window)
+            
+            try:
+                await follow_chain(client, {"claiming": ingest_head}, args.poll_interval)
+            except ReorgTooDeepError as e:
+                # Not retried: following on could keep orphaned rows, exit non-zero for the operator
+                print(f"❌ {e}")
+                raise SystemExit(1)
+            return
+        
         if args.start_block is not None:
             start_block = args.start_block
         elif args.incremental:
@@ -621,8 +754,17 @@ async def main():
         
         print(f"Starting data processing from block {start_block}")
         
-        # Process and store data
-        inserted_count = await process_all_claiming_transactions(db, client, start_block, args.end_block)
+        if args.shards:
+            # Full rebuild split across worker processes, merged back into this database
+            end_block = args.end_block if args.end_block is not None else await client.get_height()
+            print(f"Using end block: {end_block}")
+            inserted_count = process_sharded_backfill(db, start_block, end_block, args.shards,
+                                                      args.processes, use_arrow=args.arrow,
+                                                      min_window=args.min_window, max_window=args.max_window)
+        else:
+            # Process and store data
+            inserted_count = await process_all_claiming_transactions(db, client, start_block, args.end_block, use_arrow=args.arrow,
+                                                                     min_window=args.min_window, max_window=args.max_window)
         
         if inserted_count > 0:
             print(f"\nProcessing complete! Inserted {inserted_count} new transactions.")
@@ -642,6 +784,9 @@ async def main():
         print(f"Error: {e}")
         import traceback
         traceback.print_exc()
+    finally:
+        if db.metrics:
+            db.metrics.close()
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
@@ -21,6 +21,8 @@ sqlite3.register_converter("datetime", convert_datetime)
 import os
 from dotenv import load_dotenv
 
+from modules.compact_storage import blob_to_hex
+
 # Load environment variables
 load_dotenv('.env.local')  # Load local environment first
 load_dotenv()  # Load any other .env files
@@ -65,7 +67,7 @@ class ClaimingAnalytics:
         query = """
         SELECT
             COUNT(DISTINCT tx_hash) as total_claims,
-            COUNT(DISTINCT from_address) as total_unique_claimers,
+            COUNT(DISTINCT wallet_id) as total_unique_claimers,
             SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon_volume,
             SUM(CASE WHEN token = 'JERRY' THEN amount ELSE 0 END) as total_jerry_volume,
             SUM(CASE WHEN token = 'RBSD' THEN amount ELSE 0 END) as total_rbsd_volume
@@ -163,18 +165,18 @@ class ClaimingAnalytics:
         {config['period_generator']},
         first_time_claimers AS (
             SELECT 
-                from_address,
+                wallet_id,
                 MIN(timestamp) as first_claim_date
             FROM claiming_transactions
-            GROUP BY from_address
+            GROUP BY wallet_id
         )
         SELECT 
             p.period_start,
             p.period_end,
             p.period_number,
             COUNT(t.tx_hash) as claims,
-            COUNT(DISTINCT t.from_address) as active_claimers,
-            COUNT(DISTINCT CASE WHEN DATE(ftc.first_claim_date) >= p.period_start AND DATE(ftc.first_claim_date) <= p.period_end THEN t.from_address END) as new_claimers,
+            COUNT(DISTINCT t.wallet_id) as active_claimers,
+            COUNT(DISTINCT CASE WHEN DATE(ftc.first_claim_date) >= p.period_start AND DATE(ftc.first_claim_date) <= p.period_end THEN t.wallet_id END) as new_claimers,
             SUM(CASE WHEN t.token = 'MON' THEN t.amount ELSE 0 END) as mon_volume,
             SUM(CASE WHEN t.token = 'JERRY' THEN t.amount ELSE 0 END) as jerry_volume,
             SUM(CASE WHEN t.token = 'RBSD' THEN t.amount ELSE 0 END) as rbsd_volume,
@@ -185,9 +187,9 @@ class ClaimingAnalytics:
             SUM(CASE WHEN t.token = 'RBSD' THEN 1 ELSE 0 END) as rbsd_transactions
         FROM periods p
         LEFT JOIN claiming_transactions t ON 
-            DATE(t.timestamp, 'utc') >= p.period_start AND DATE(t.timestamp, 'utc') <= p.period_end
+            t.day_id >= CAST(strftime('%s', p.period_start) AS INTEGER) / 86400 AND t.day_id < CAST(strftime('%s', p.period_end) AS INTEGER) / 86400 + 1
             {timestamp_filter}
-        LEFT JOIN first_time_claimers ftc ON t.from_address = ftc.from_address
+        LEFT JOIN first_time_claimers ftc ON t.wallet_id = ftc.wallet_id
         GROUP BY p.period_start, p.period_end, p.period_number
         HAVING COUNT(t.tx_hash) > 0
         ORDER BY p.period_start
@@ -256,16 +258,16 @@ class ClaimingAnalytics:
             tf.start_date,
             tf.end_date,
             COUNT(DISTINCT t.tx_hash) as total_claims,
-            COUNT(DISTINCT t.from_address) as unique_claimers,
+            COUNT(DISTINCT t.wallet_id) as unique_claimers,
             SUM(CASE WHEN t.token = 'MON' THEN t.amount ELSE 0 END) as mon_volume,
             SUM(CASE WHEN t.token = 'JERRY' THEN t.amount ELSE 0 END) as jerry_volume,
             SUM(CASE WHEN t.token = 'RBSD' THEN t.amount ELSE 0 END) as rbsd_volume,
             SUM(t.amount) as total_volume,
             ROUND(AVG(t.amount), 2) as avg_claim_amount,
-            ROUND(CAST(COUNT(DISTINCT t.from_address) AS FLOAT) / COUNT(DISTINCT t.tx_hash), 2) as avg_claims_per_claimer
+            ROUND(CAST(COUNT(DISTINCT t.wallet_id) AS FLOAT) / COUNT(DISTINCT t.tx_hash), 2) as avg_claims_per_claimer
         FROM timeframes tf
         LEFT JOIN claiming_transactions t ON 
-            DATE(t.timestamp, 'utc') >= tf.start_date AND DATE(t.timestamp, 'utc') <= tf.end_date
+            t.day_id >= CAST(strftime('%s', tf.start_date) AS INTEGER) / 86400 AND t.day_id < CAST(strftime('%s', tf.end_date) AS INTEGER) / 86400 + 1
         GROUP BY tf.period_name, tf.start_date, tf.end_date
         ORDER BY 
             CASE tf.period_name
@@ -301,16 +303,22 @@ class ClaimingAnalytics:
         """Get top claimers table with their statistics."""
         query = """
         SELECT 
-            from_address as user_address,
-            SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon,
-            SUM(CASE WHEN token = 'JERRY' THEN amount ELSE 0 END) as total_jerry,
-            SUM(CASE WHEN token = 'RBSD' THEN amount ELSE 0 END) as total_rbsd,
-            SUM(amount) as total_claimed,
-            COUNT(DISTINCT tx_hash) as total_claims,
-            COUNT(DISTINCT DATE(timestamp)) as active_days
-        FROM claiming_transactions
-        GROUP BY from_address
-        ORDER BY total_claimed DESC
+            w.address as user_address,
+            s.total_mon, s.total_jerry, s.total_rbsd, s.total_claimed, s.total_claims, s.active_days
+        FROM (
+            SELECT 
+                wallet_id,
+                SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon,
+                SUM(CASE WHEN token = 'JERRY' THEN amount ELSE 0 END) as total_jerry,
+                SUM(CASE WHEN token = 'RBSD' THEN amount ELSE 0 END) as total_rbsd,
+                SUM(amount) as total_claimed,
+                COUNT(DISTINCT tx_hash) as total_claims,
+                COUNT(DISTINCT DATE(timestamp)) as active_days
+            FROM claiming_transactions
+            GROUP BY wallet_id
+        ) s
+        JOIN wallets w ON w.id = s.wallet_id
+        ORDER BY s.total_claimed DESC, w.address
         LIMIT ?
         """
         self.cursor.execute(query, (limit,))
@@ -320,7 +328,7 @@ class ClaimingAnalytics:
             user_address, total_mon, total_jerry, total_rbsd, total_claimed, total_claims, active_days = row
             top_claimers.append({
                 'rank': i + 1,
-                'user_address': user_address,
+                'user_address': blob_to_hex(user_address),
                 'total_mon': total_mon or 0.0,
                 'total_jerry': total_jerry or 0.0,
                 'total_rbsd': total_rbsd or 0.0,
@@ -349,11 +357,11 @@ def get_average_metrics(analytics):
     """Calculate average metrics for claiming data."""
     query = """
     SELECT 
-        COUNT(DISTINCT from_address) as users,
+        COUNT(DISTINCT wallet_id) as users,
         COUNT(DISTINCT tx_hash) as claim_tx,
         ROUND(AVG(amount), 2) as avg_claim_amount,
         SUM(amount) as tot_claimed,
-        COUNT(DISTINCT DATE(timestamp, 'utc')) as total_days
+        COUNT(DISTINCT day_id) as total_days
     FROM claiming_transactions
     """
     
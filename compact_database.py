@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Compact Storage Migration
+=========================
+
+Rewrites a betting or claiming database into the compact storage format:
+tx_hash, to_address and wallets.address become 32/20-byte BLOBs
+instead of hex TEXT (see modules/compact_storage.py). The original file is
+left untouched; the compact copy is written next to it and can be swapped in
+while ingestion is stopped. Ingestion and the analytics scripts detect the
+format from the schema and work with either file.
+
+The tool reports database and per-index sizes and the timing of a set of
+representative queries on both files.
+
+Usage:
+    python compact_database.py --db-path /app/data/betting_transactions.db
+    python compact_database.py --db-path data/comprehensive_claiming_transactions_fixed.db --output /tmp/claiming.db
+"""
+
+import argparse
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from modules.compact_storage import HEX_COLUMNS, hex_to_blob, blob_to_hex, is_compact
+from modules.wallets import ensure_wallet_view
+
+FACT_TABLES = ['betting_transactions', 'claiming_transactions']
+# Index made redundant by the UNIQUE constraint on tx_hash (its autoindex serves lookups)
+REDUNDANT_INDEXES = ['idx_tx_hash']
+
+SAMPLE_SIZE = 1000
+BENCHMARK_REPEATS = 3
+
+
+def find_fact_table(conn: sqlite3.Connection) -> Optional[str]:
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return next((table for table in FACT_TABLES if table in tables), None)
+
+
+def object_sizes(conn: sqlite3.Connection) -> Dict[str, int]:
+    """Bytes used by each table and index (empty if SQLite was built without dbstat)."""
+    try:
+        return dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    except sqlite3.OperationalError:
+        return {}
+
+
+def sample_keys(conn: sqlite3.Connection, table: str, sample_size: int = SAMPLE_SIZE) -> Tuple[List[str], List[str]]:
+    """Random tx hashes and wallet addresses (as hex) to use in the lookup benchmarks."""
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 0
+    rowids = random.sample(range(1, max_rowid + 1), min(sample_size, max_rowid))
+    hashes = [blob_to_hex(row[0]) for rowid in rowids
+              for row in conn.execute(f"SELECT tx_hash FROM {table} WHERE rowid = ?", (rowid,))]
+    addresses = [blob_to_hex(row[0]) for row in
+                 conn.execute("SELECT address FROM wallets ORDER BY RANDOM() LIMIT ?", (sample_size,))]
+    return hashes, addresses
+
+
+def benchmark_queries(db_path: str, table: str, hashes: List[str], addresses: List[str]) -> Dict[str, float]:
+    """Best-of-N seconds for representative queries (lookup keys are converted to the file's format)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        if is_compact(conn, table):
+            hashes = [hex_to_blob(h) for h in hashes]
+            addresses = [hex_to_blob(a) for a in addresses]
+
+        def lookups(sql, keys):
+            return lambda: [conn.execute(sql, (key,)).fetchone() for key in keys]
+
+        queries = {
+            f"tx_hash lookups ({len(hashes)})": lookups(
+                f"SELECT block_number FROM {table} WHERE tx_hash = ?", hashes),
+            f"address lookups ({len(addresses)})": lookups(
+                f"SELECT COUNT(*) FROM {table} WHERE wallet_id = (SELECT id FROM wallets WHERE address = ?)", addresses),
+            "COUNT(DISTINCT tx_hash)": lambda: conn.execute(
+                f"SELECT COUNT(DISTINCT tx_hash) FROM {table}").fetchone(),
+            "COUNT(DISTINCT from_address)": lambda: conn.execute(
+                f"SELECT COUNT(DISTINCT from_address) FROM {table}_v").fetchone(),
+            "top 100 wallets": lambda: conn.execute(f"""
+                SELECT w.address, s.n FROM (
+                    SELECT wallet_id, COUNT(*) as n FROM {table} GROUP BY wallet_id
+                ) s JOIN wallets w ON w.id = s.wallet_id
+                ORDER BY s.n DESC, w.address LIMIT 100
+            """).fetchall(),
+        }
+
+        timings = {}
+        for name, run in queries.items():
+            best = None
+            for _ in range(BENCHMARK_REPEATS):
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[name] = best
+        return timings
+    finally:
+        conn.close()
+
+
+def compact_table(conn: sqlite3.Connection, table: str, columns: List[str]) -> int:
+    """
+    Rebuild table with columns declared BLOB, converting their hex values.
+    Keeps rowids and every index except REDUNDANT_INDEXES. Returns rows copied.
+    """
+    create_sql = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone()[0]
+    index_sqls = [row[1] for row in conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL", (table,)
+    ) if row[0] not in REDUNDANT_INDEXES]
+
+    compact_name = f"{table}_compact"
+    compact_sql = re.sub(rf"CREATE TABLE (IF NOT EXISTS )?{table}\b", f"CREATE TABLE {compact_name}", create_sql, count=1)
+    for column in columns:
+        compact_sql = re.sub(rf"\b{column}\s+TEXT\b", f"{column} BLOB", compact_sql)
+
+    all_columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    column_list = ', '.join(all_columns)
+    select_list = ', '.join(f"hex_to_blob({c})" if c in columns else c for c in all_columns)
+
+    conn.execute(compact_sql)
+    cursor = conn.execute(
+        f"INSERT INTO {compact_name} (rowid, {column_list}) SELECT rowid, {select_list} FROM {table} ORDER BY rowid"
+    )
+    copied = cursor.rowcount
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {compact_name} RENAME TO {table}")
+    for index_sql in index_sqls:
+        conn.execute(index_sql)
+    return copied
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return "-"
+    return f"{size / 1024 / 1024:,.1f} MB"
+
+
+def print_report(before_file: int, after_file: int, before_sizes: Dict[str, int], after_sizes: Dict[str, int],
+                 before_times: Dict[str, float], after_times: Dict[str, float]):
+    print("\n📊 Storage")
+    print(f"{'Object':<45} {'Before':>12} {'After':>12} {'Change':>8}")
+    print("-" * 80)
+    print(f"{'(database file)':<45} {format_size(before_file):>12} {format_size(after_file):>12} "
+          f"{(after_file - before_file) / before_file * 100 if before_file else 0:>+7.1f}%")
+    for name in sorted(set(before_sizes) | set(after_sizes), key=lambda n: -before_sizes.get(n, 0)):
+        before, after = before_sizes.get(name), after_sizes.get(name)
+        change = f"{(after - before) / before * 100:+.1f}%" if before and after is not None else "-"
+        print(f"{name:<45} {format_size(before):>12} {format_size(after):>12} {change:>8}")
+    if not before_sizes:
+        print("(per-index sizes need SQLite with the dbstat table)")
+
+    print("\n⏱️  Query times (best of {})".format(BENCHMARK_REPEATS))
+    print(f"{'Query':<45} {'Before':>10} {'After':>10} {'Speedup':>8}")
+    print("-" * 76)
+    for name, before in before_times.items():
+        after = after_times[name]
+        print(f"{name:<45} {before * 1000:>8.1f}ms {after * 1000:>8.1f}ms {before / after if after else 0:>7.2f}x")
+
+
+def migrate(db_path: str, output_path: str, benchmark: bool = True) -> bool:
+    """Write a compact copy of db_path to output_path and report sizes and query times."""
+    conn = sqlite3.connect(db_path)
+    try:
+        table = find_fact_table(conn)
+        if table is None:
+            print(f"❌ No betting or claiming table in {db_path}")
+            return False
+        if is_compact(conn, table):
+            print(f"✅ {db_path} already uses the compact format")
+            return True
+        if 'from_address' in [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]:
+            print(f"❌ {table} still stores from_address, open it with the ingestion script once first")
+            return False
+
+        row_count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        print(f"🔍 {db_path}: {table}, {row_count:,} rows")
+        before_file = os.path.getsize(db_path)
+        before_sizes = object_sizes(conn)
+        hashes, addresses = sample_keys(conn, table) if benchmark else ([], [])
+    finally:
+        conn.close()
+
+    before_times = benchmark_queries(db_path, table, hashes, addresses) if benchmark else {}
+
+    print(f"📦 Copying to {output_path}...")
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("VACUUM INTO ?", (output_path,))
+    finally:
+        conn.close()
+
+    conn = sqlite3.connect(output_path)
+    try:
+        conn.create_function("hex_to_blob", 1, hex_to_blob, deterministic=True)
+        with conn:
+            # The view would not survive its tables being swapped, it is recreated on the compact ones
+            conn.execute(f"DROP VIEW IF EXISTS {table}_v")
+            copied = compact_table(conn, table, list(HEX_COLUMNS))
+            compact_table(conn, "wallets", ['address'])
+            ensure_wallet_view(conn, table)
+            if any(row[1] == 'first_tx_hash' for row in conn.execute("PRAGMA table_info(wallet_first_seen)")):
+                # Compared against tx_hash values on ties, so it takes their format
+                conn.execute("UPDATE wallet_first_seen SET first_tx_hash = hex_to_blob(first_tx_hash)")
+        if copied != row_count:
+            print(f"❌ Copied {copied:,} of {row_count:,} rows, keeping the original")
+            conn.close()
+            os.remove(output_path)
+            return False
+        print(f"🗜️  Converted {copied:,} rows in {time.time() - start:.1f}s, compacting file...")
+        conn.execute("VACUUM")
+        after_sizes = object_sizes(conn)
+    finally:
+        conn.close()
+
+    after_file = os.path.getsize(output_path)
+    after_times = benchmark_queries(output_path, table, hashes, addresses) if benchmark else {}
+    print_report(before_file, after_file, before_sizes, after_sizes, before_times, after_times)
+
+    print(f"\n✅ Compact database written to {output_path}")
+    print(f"   Stop ingestion, keep {db_path} as a backup and move the compact file into its place.")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a database to compact BLOB storage for hashes and addresses")
+    parser.add_argument("--db-path", type=str, required=True, help="Betting or claiming database to convert")
+    parser.add_argument("--output", type=str, help="Compact database path (default: <db-path stem>.compact.db)")
+    parser.add_argument("--force", action="store_true", help="Overwrite --output if it exists")
+    parser.add_argument("--no-benchmark", action="store_true", help="Only report sizes, skip the query timings")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db_path):
+        print(f"❌ Database not found: {args.db_path}")
+        sys.exit(1)
+
+    output_path = args.output or os.path.splitext(args.db_path)[0] + ".compact.db"
+    if os.path.exists(output_path):
+        if not args.force:
+            print(f"❌ {output_path} already exists (use --force to overwrite)")
+            sys.exit(1)
+        os.remove(output_path)
+
+    if not migrate(args.db_path, output_path, benchmark=not args.no_benchmark):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
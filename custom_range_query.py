@@ -13,6 +13,8 @@ import sys
 import os
 from dotenv import load_dotenv
 
+from modules.time_columns import day_id
+
 # Load environment variables
 load_dotenv('.env.local')  # Load local environment first
 load_dotenv()  # Load any other .env files
@@ -66,19 +68,19 @@ def get_custom_range_metrics(start_date: str, end_date: str) -> Dict[str, Any]:
         query = """
         SELECT
             COUNT(*) as total_submissions,
-            COUNT(DISTINCT from_address) as total_active_addresses,
+            COUNT(DISTINCT wallet_id) as total_active_addresses,
             SUM(CASE WHEN token = 'MON' THEN CAST(amount AS REAL) ELSE 0 END) as total_mon_volume,
             SUM(CASE WHEN token = 'Jerry' THEN CAST(amount AS REAL) ELSE 0 END) as total_jerry_volume,
             SUM(CASE WHEN token = 'RBSD' THEN CAST(amount AS REAL) ELSE 0 END) as total_rbsd_volume,
-            COUNT(DISTINCT CASE WHEN token = 'MON' THEN from_address END) as mon_users,
-            COUNT(DISTINCT CASE WHEN token = 'Jerry' THEN from_address END) as jerry_users,
-            COUNT(DISTINCT CASE WHEN token = 'RBSD' THEN from_address END) as rbsd_users,
+            COUNT(DISTINCT CASE WHEN token = 'MON' THEN wallet_id END) as mon_users,
+            COUNT(DISTINCT CASE WHEN token = 'Jerry' THEN wallet_id END) as jerry_users,
+            COUNT(DISTINCT CASE WHEN token = 'RBSD' THEN wallet_id END) as rbsd_users,
             AVG(CAST(n_cards AS REAL)) as avg_cards_per_slip
         FROM betting_transactions
-        WHERE DATE(timestamp, 'utc') >= ? AND DATE(timestamp, 'utc') <= ? AND n_cards >= 2
+        WHERE day_id >= ? AND day_id < ? AND n_cards >= 2
         """
         
-        cursor.execute(query, (start_date, end_date))
+        cursor.execute(query, (day_id(start_date), day_id(end_date) + 1))
         result = cursor.fetchone()
         
         if not result or result[0] == 0:
@@ -120,19 +122,19 @@ def get_daily_activity(start_date: str, end_date: str) -> list:
         
         query = """
         SELECT
-            DATE(timestamp, 'utc') as date,
+            DATE(day_id * 86400, 'unixepoch') as date,
             COUNT(*) as submissions,
-            COUNT(DISTINCT from_address) as active_addresses,
+            COUNT(DISTINCT wallet_id) as active_addresses,
             SUM(CASE WHEN token = 'MON' THEN CAST(amount AS REAL) ELSE 0 END) as mon_volume,
             SUM(CASE WHEN token = 'Jerry' THEN CAST(amount AS REAL) ELSE 0 END) as jerry_volume,
             AVG(CAST(n_cards AS REAL)) as avg_cards_per_slip
         FROM betting_transactions
-        WHERE DATE(timestamp, 'utc') >= ? AND DATE(timestamp, 'utc') <= ? AND n_cards >= 2
-        GROUP BY DATE(timestamp, 'utc')
+        WHERE day_id >= ? AND day_id < ? AND n_cards >= 2
+        GROUP BY day_id
         ORDER BY date
         """
         
-        cursor.execute(query, (start_date, end_date))
+        cursor.execute(query, (day_id(start_date), day_id(end_date) + 1))
         results = cursor.fetchall()
         
         daily_data = []
@@ -12,7 +12,10 @@ Key optimizations:
 5. Memory efficient processing
 """
 
+import argparse
 import asyncio
+import contextlib
+import io
 import os
 import time
 import logging
@@ -20,11 +23,14 @@ import datetime
 import sqlite3
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from hypersync import HypersyncClient, ClientConfig, Query, LogSelection, FieldSelection, LogField, StreamConfig
 from tqdm import tqdm
 
+from modules.compact_storage import is_compact, hex_to_blob
+from modules.ingest_metrics import IngestMetrics
+
 # Load environment variables
 load_dotenv('.env.local')
 load_dotenv()
@@ -77,44 +83,244 @@ def get_database_block_range(db_path: str = None) -> tuple[int, int]:
     finally:
         conn.close()
 
-def update_bet_ids_batch(bet_id_map: Dict[str, int], db_path: str = None, batch_size: int = 1000):
-    """Update bet IDs in the database using batch processing."""
+def ensure_bet_id_checkpoint_table(conn: sqlite3.Connection):
+    """
+    Create the bet_id enrichment watermark table (separate from the ingestion checkpoint).
+    last_update holds the time the scan that set the watermark started.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS bet_id_checkpoint (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_scanned_block INTEGER NOT NULL,
+            last_update DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+def get_bet_id_watermark(db_path: str = None) -> int:
+    """Get the block up to which (exclusive) bet IDs have already been scanned, 0 if never."""
+    if db_path is None:
+        db_path = DB_PATH
+    
+    conn = sqlite3.connect(db_path)
+    
+    try:
+        ensure_bet_id_checkpoint_table(conn)
+        result = conn.execute("SELECT last_scanned_block FROM bet_id_checkpoint WHERE id = 1").fetchone()
+        return result[0] if result else 0
+    finally:
+        conn.close()
+
+def set_bet_id_watermark(block_number: int, db_path: str = None, scan_started: str = None):
+    """
+    Record that bet IDs have been scanned up to block_number (exclusive).
+    scan_started is the UTC time the scan began (CURRENT_TIMESTAMP format), now if not given.
+    """
     if db_path is None:
         db_path = DB_PATH
     
     conn = sqlite3.connect(db_path)
+    
+    try:
+        with conn:
+            ensure_bet_id_checkpoint_table(conn)
+            conn.execute("""
+                INSERT INTO bet_id_checkpoint (id, last_scanned_block, last_update)
+                VALUES (1, ?, COALESCE(?, CURRENT_TIMESTAMP))
+                ON CONFLICT(id) DO UPDATE SET
+                    last_scanned_block = excluded.last_scanned_block,
+                    last_update = excluded.last_update
+            """, (block_number, scan_started))
+        print(f"📌 Bet ID watermark set to block {block_number:,}")
+    finally:
+        conn.close()
+
+def get_missing_bet_id_block_range(db_path: str = None) -> tuple[int, int]:
+    """Get the min and max block numbers of rows that still have bet_id = 0."""
+    if db_path is None:
+        db_path = DB_PATH
+    
+    conn = sqlite3.connect(db_path)
+    
+    try:
+        return conn.execute("""
+            SELECT MIN(block_number), MAX(block_number)
+            FROM betting_transactions
+            WHERE bet_id = 0
+        """).fetchone()
+    finally:
+        conn.close()
+
+def get_unscanned_bet_id_start(db_path: str = None) -> Optional[int]:
+    """
+    Get the lowest block of bet_id = 0 rows written below the watermark after the last scan started.
+    
+    Rollbacks, --start-block reprocessing and shard merges can store rows below the
+    watermark; no scan has covered them yet, so the next scan has to start there.
+    Returns None if there are no such rows (or no scan has run yet).
+    """
+    if db_path is None:
+        db_path = DB_PATH
+    
+    conn = sqlite3.connect(db_path)
+    
+    try:
+        ensure_bet_id_checkpoint_table(conn)
+        return conn.execute("""
+            SELECT MIN(t.block_number)
+            FROM betting_transactions t, bet_id_checkpoint c
+            WHERE c.id = 1
+              AND t.bet_id = 0
+              AND t.block_number < c.last_scanned_block
+              AND t.created_at >= c.last_update
+        """).fetchone()[0]
+    finally:
+        conn.close()
+
+# UPDATE ... FROM needs SQLite 3.33+, older libraries fall back to a correlated subquery
+UPDATE_FROM_SUPPORTED = sqlite3.sqlite_version_info >= (3, 33, 0)
+
+def apply_bet_id_updates(conn: sqlite3.Connection, items: List[tuple], batch_size: int = 50000) -> Dict[str, float]:
+    """
+    Apply (tx_hash, bet_id) pairs with a set-based join instead of one UPDATE per row.
+    
+    Each batch is bulk-loaded into a temporary table with executemany and applied
+    with a single UPDATE ... FROM join, only filling rows where bet_id = 0.
+    Returns the update count and the time spent loading and applying.
+    """
     cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS bet_id_updates (
+            tx_hash TEXT PRIMARY KEY,
+            bet_id INTEGER NOT NULL
+        )
+    """)
+    
+    if UPDATE_FROM_SUPPORTED:
+        apply_sql = """
+            UPDATE betting_transactions
+            SET bet_id = u.bet_id
+            FROM bet_id_updates AS u
+            WHERE betting_transactions.tx_hash = u.tx_hash
+              AND betting_transactions.bet_id = 0
+        """
+    else:
+        apply_sql = """
+            UPDATE betting_transactions
+            SET bet_id = (SELECT u.bet_id FROM bet_id_updates AS u WHERE u.tx_hash = betting_transactions.tx_hash)
+            WHERE bet_id = 0
+              AND tx_hash IN (SELECT tx_hash FROM bet_id_updates)
+        """
+    
+    report = {'updated': 0, 'load_seconds': 0.0, 'apply_seconds': 0.0}
+    total_items = len(items)
+    
+    for i in range(0, total_items, batch_size):
+        batch = items[i:i + batch_size]
+        
+        with conn:  # One transaction per batch
+            load_start = time.perf_counter()
+            cursor.execute("DELETE FROM bet_id_updates")
+            cursor.executemany("INSERT OR REPLACE INTO bet_id_updates (tx_hash, bet_id) VALUES (?, ?)", batch)
+            apply_start = time.perf_counter()
+            cursor.execute(apply_sql)
+            report['updated'] += cursor.rowcount
+            report['load_seconds'] += apply_start - load_start
+            report['apply_seconds'] += time.perf_counter() - apply_start
+        
+        # Progress update
+        if (i + batch_size) % (batch_size * 10) == 0 or i + batch_size >= total_items:
+            print(f"  ✅ Applied {min(i + batch_size, total_items):,}/{total_items:,} bet IDs")
+    
+    cursor.execute("DROP TABLE IF EXISTS temp.bet_id_updates")
+    return report
+
+def update_bet_ids_batch(bet_id_map: Dict[str, int], db_path: str = None, batch_size: int = 50000):
+    """Update bet IDs in the database using set-based batch updates."""
+    if db_path is None:
+        db_path = DB_PATH
+    
+    conn = sqlite3.connect(db_path)
     
     try:
-        # Convert dict to list of tuples for batch processing
-        items = list(bet_id_map.items())
+        if is_compact(conn, "betting_transactions"):
+            # Hashes are stored as BLOBs, match them in that form
+            items = [(hex_to_blob(tx_hash), bet_id) for tx_hash, bet_id in bet_id_map.items()]
+        else:
+            items = list(bet_id_map.items())
         total_items = len(items)
-        updated_count = 0
         
-        print(f"🔄 Updating {total_items:,} bet IDs in batches of {batch_size}...")
+        print(f"🔄 Updating {total_items:,} bet IDs in batches of {batch_size:,} "
+              f"({'UPDATE ... FROM' if UPDATE_FROM_SUPPORTED else 'correlated subquery'})...")
         
-        for i in range(0, total_items, batch_size):
-            batch = items[i:i + batch_size]
-            
-            with conn:  # This creates a transaction
-                for tx_hash, bet_id in batch:
-                    cursor.execute("""
-                        UPDATE betting_transactions 
-                        SET bet_id = ? 
-                        WHERE tx_hash = ?
-                    """, (bet_id, tx_hash))
-                    updated_count += cursor.rowcount
-            
-            # Progress update
-            if (i + batch_size) % (batch_size * 10) == 0 or i + batch_size >= total_items:
-                print(f"  ✅ Updated {min(i + batch_size, total_items):,}/{total_items:,} bet IDs")
+        start_time = time.perf_counter()
+        report = apply_bet_id_updates(conn, items, batch_size)
+        elapsed = time.perf_counter() - start_time
         
-        print(f"✅ Database update complete! Updated {updated_count:,} bet IDs")
-        return updated_count
+        print(f"✅ Database update complete! Updated {report['updated']:,} bet IDs")
+        print(f"⏱️  Update timing: load {report['load_seconds']:.2f}s, apply {report['apply_seconds']:.2f}s, "
+              f"total {elapsed:.2f}s ({total_items / elapsed if elapsed else 0:,.0f} rows/s)")
+        return report['updated']
         
     finally:
         conn.close()
 
+def update_bet_ids_row_by_row(conn: sqlite3.Connection, items: List[tuple], batch_size: int = 1000) -> int:
+    """Previous per-row UPDATE strategy, kept as the baseline for --benchmark-updates."""
+    cursor = conn.cursor()
+    updated_count = 0
+    
+    for i in range(0, len(items), batch_size):
+        with conn:
+            for tx_hash, bet_id in items[i:i + batch_size]:
+                cursor.execute("""
+                    UPDATE betting_transactions 
+                    SET bet_id = ? 
+                    WHERE tx_hash = ? AND bet_id = 0
+                """, (bet_id, tx_hash))
+                updated_count += cursor.rowcount
+    
+    return updated_count
+
+def benchmark_bet_id_updates(num_rows: int):
+    """Time per-row updates against the temp table join on a synthetic betting table."""
+    import tempfile
+    import random
+    
+    print(f"⏱️  BET ID UPDATE BENCHMARK ({num_rows:,} rows)")
+    print("=" * 60)
+    
+    rows = [(f"0x{i:064x}", 0, i // 10) for i in range(num_rows)]
+    items = [(tx_hash, i + 1) for i, (tx_hash, _, _) in enumerate(rows)]
+    random.Random(0).shuffle(items)
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, run in (("per-row UPDATE", update_bet_ids_row_by_row),
+                           ("temp table join", lambda conn, items: apply_bet_id_updates(conn, items)['updated'])):
+            conn = sqlite3.connect(os.path.join(tmp, f"{len(results)}.db"))
+            with conn:
+                conn.execute("""
+                    CREATE TABLE betting_transactions (
+                        tx_hash TEXT PRIMARY KEY,
+                        bet_id INTEGER DEFAULT 0,
+                        block_number INTEGER
+                    )
+                """)
+                conn.execute("CREATE INDEX idx_bet_id ON betting_transactions(bet_id)")
+                conn.executemany("INSERT INTO betting_transactions VALUES (?, ?, ?)", rows)
+            
+            start_time = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                updated = run(conn, items)
+            elapsed = time.perf_counter() - start_time
+            conn.close()
+            
+            results[label] = elapsed
+            print(f"  {label:<16} {updated:>10,} rows  {elapsed:>8.3f}s  {num_rows / elapsed:>12,.0f} rows/s")
+    
+    print("=" * 60)
+    print(f"Speedup: {results['per-row UPDATE'] / results['temp table join']:.1f}x")
+
 def get_database_stats(db_path: str = None) -> Dict[str, int]:
     """Get database statistics."""
     if db_path is None:
@@ -149,7 +355,8 @@ def get_database_stats(db_path: str = None) -> Dict[str, int]:
     finally:
         conn.close()
 
-async def stream_bet_ids_ultra_fast(client: HypersyncClient, start_block: int, end_block: int) -> List[Dict[str, Any]]:
+async def stream_bet_ids_ultra_fast(client: HypersyncClient, start_block: int, end_block: int,
+                                    metrics: IngestMetrics = None) -> List[Dict[str, Any]]:
     """
     Ultra-fast bet ID retrieval using Hypersync stream function.
     
@@ -159,6 +366,7 @@ async def stream_bet_ids_ultra_fast(client: HypersyncClient, start_block: int, e
     3. Minimal field selection - only topic0, topic2, and transaction_hash
     4. Specific contract addresses and topic filtering
     5. Progress tracking with tqdm
+    Responses are recorded in metrics when given.
     """
     print(f"🚀 Starting ultra-fast bet ID stream from {start_block:,} to {end_block:,}...")
     
@@ -196,17 +404,24 @@ async def stream_bet_ids_ultra_fast(client: HypersyncClient, start_block: int, e
     bet_ids = []
     total_logs_processed = 0
     start_time = time.time()
+    current_block = start_block
     
     print(f"📡 Stream started with {config.concurrency} concurrent queries...")
     
     try:
         with tqdm(desc="Processing bet IDs", unit="logs") as pbar:
             while True:
+                recv_start = time.perf_counter()
                 res = await receiver.recv()
                 # Exit if the stream finished
                 if res is None:
                     break
                 
+                if metrics:
+                    metrics.observe_response("bet_ids", current_block, res.next_block, res,
+                                             time.perf_counter() - recv_start)
+                    current_block = max(current_block, res.next_block or current_block)
+                
                 logs_in_batch = len(res.data.logs) if res.data and res.data.logs else 0
                 total_logs_processed += logs_in_batch
                 
@@ -246,50 +461,61 @@ async def stream_bet_ids_ultra_fast(client: HypersyncClient, start_block: int, e
     
     return bet_ids
 
-async def main():
-    """Main execution function - optimized for bet ID retrieval and database update."""
-    # Initialize Hypersync client
-    config = ClientConfig(
-        url=MONAD_HYPERSYNC_URL,
-        bearer_token=HYPERSYNC_BEARER_TOKEN
-    )
-    client = HypersyncClient(config)
-    
+async def enrich_bet_ids(client: HypersyncClient, db_path: str, full: bool = False, metrics: IngestMetrics = None):
+    """
+    Scan blocks past the watermark for bet IDs and write them to the database.
+    Rows without a bet_id that were written below the watermark since the last
+    scan (see get_unscanned_bet_id_start) move the scan start back to them.
+    """
     print("=== BET ID RETRIEVAL & DATABASE UPDATE ===")
     print("=" * 50)
     
     # Get database statistics before update
     print("📊 DATABASE STATISTICS (BEFORE UPDATE):")
-    stats_before = get_database_stats()
+    stats_before = get_database_stats(db_path)
     print(f"  Total transactions: {stats_before['total_transactions']:,}")
     print(f"  MON transactions: {stats_before['mon_transactions']:,}")
     print(f"  Transactions with bet_id: {stats_before['with_bet_id']:,}")
     print(f"  MON transactions with bet_id: {stats_before['mon_with_bet_id']:,}")
     print()
     
-    # Get block range from database
-    min_block, max_block = get_database_block_range()
-    print(f"🎯 DATABASE BLOCK RANGE:")
-    print(f"  Min block: {min_block:,}")
-    print(f"  Max block: {max_block:,}")
-    print(f"  Total blocks: {max_block - min_block:,}")
-    print()
+    # Only blocks that still contain rows without a bet_id matter
+    min_block, max_block = get_missing_bet_id_block_range(db_path)
+    if min_block is None:
+        print("✅ Every transaction already has a bet_id, nothing to scan.")
+        return
+    
+    # Rows written from here on are caught by the next run's get_unscanned_bet_id_start
+    scan_started = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+    watermark = 0 if full else get_bet_id_watermark(db_path)
+    print(f"🎯 BET ID SCAN RANGE:")
+    print(f"  Rows without bet_id span blocks {min_block:,} to {max_block:,}")
+    print(f"  Watermark: {watermark:,}{' (ignored, --full)' if full else ''}")
+    if metrics:
+        metrics.set_checkpoint(watermark)
+        metrics.set_height(await client.get_height())
+    
+    # Scan only blocks newer than the watermark (to_block is exclusive)
+    start_block = max(min_block, watermark)
+    end_block = max_block + 1
     
-    # Get current chain height
-    height = await client.get_height()
-    print(f"📊 Current chain height: {height:,}")
+    # ...and any rows stored below it since the last scan
+    unscanned_start = None if full else get_unscanned_bet_id_start(db_path)
+    if unscanned_start is not None and unscanned_start < start_block:
+        print(f"  Rows without bet_id were written below the watermark since the last scan, "
+              f"rescanning from block {unscanned_start:,}")
+        start_block = unscanned_start
     
-    # Use entire database block range for full run
-    start_block = min_block
-    end_block = max_block
+    if start_block >= end_block:
+        print("✅ No new blocks since the last bet ID scan.")
+        return
     
-    print(f"🚀 PRODUCTION RUN: Starting bet ID retrieval from {start_block:,} to {end_block:,}")
+    print(f"🚀 Starting bet ID retrieval from {start_block:,} to {end_block:,}")
     print(f"   This will process {(end_block - start_block):,} blocks")
-    print(f"   Estimated time: {(end_block - start_block) / 10000:.1f} minutes (based on 10k blocks/min)")
     print()
     
     # Get bet IDs using ultra-fast method
-    bet_ids = await stream_bet_ids_ultra_fast(client, start_block, end_block)
+    bet_ids = await stream_bet_ids_ultra_fast(client, start_block, end_block, metrics)
     
     # Create bet ID mapping for database update
     bet_id_map = {item['tx_hash']: item['bet_id'] for item in bet_ids}
@@ -310,11 +536,13 @@ async def main():
         
         # Update database with bet IDs
         print("🔄 UPDATING DATABASE...")
-        updated_count = update_bet_ids_batch(bet_id_map)
+        updated_count = update_bet_ids_batch(bet_id_map, db_path)
+        if metrics:
+            metrics.observe_write(len(bet_id_map), updated_count)
         
         # Get database statistics after update
         print("\n📊 DATABASE STATISTICS (AFTER UPDATE):")
-        stats_after = get_database_stats()
+        stats_after = get_database_stats(db_path)
         print(f"  Total transactions: {stats_after['total_transactions']:,}")
         print(f"  MON transactions: {stats_after['mon_transactions']:,}")
         print(f"  Transactions with bet_id: {stats_after['with_bet_id']:,}")
@@ -329,7 +557,44 @@ async def main():
     else:
         print("No bet IDs found in the specified block range.")
     
+    # Everything below end_block has been scanned; the next run starts there
+    # (a rescan of older rows does not move the watermark back)
+    end_block = max(end_block, watermark)
+    set_bet_id_watermark(end_block, db_path, scan_started)
+    if metrics:
+        metrics.set_checkpoint(end_block)
+    
     print(f"\n✅ Process complete!")
 
+async def main():
+    """Main execution function - optimized for bet ID retrieval and database update."""
+    parser = argparse.ArgumentParser(description="Incremental bet ID enrichment")
+    parser.add_argument("--db-path", type=str, default=DB_PATH, help="Path to betting database file")
+    parser.add_argument("--full", action="store_true", help="Ignore the watermark and rescan every block that still has bet_id = 0 rows")
+    parser.add_argument("--benchmark-updates", type=int, metavar="ROWS", help="Compare per-row and set-based bet_id updates on a synthetic table of ROWS rows and exit")
+    parser.add_argument("--metrics-file", type=str, help="Write Prometheus text-format metrics to this file")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port at /metrics")
+    args = parser.parse_args()
+    
+    if args.benchmark_updates:
+        benchmark_bet_id_updates(args.benchmark_updates)
+        return
+    
+    # Initialize Hypersync client
+    config = ClientConfig(
+        url=MONAD_HYPERSYNC_URL,
+        bearer_token=HYPERSYNC_BEARER_TOKEN
+    )
+    client = HypersyncClient(config)
+    
+    metrics = None
+    if args.metrics_file or args.metrics_port is not None:
+        metrics = IngestMetrics("bet_ids", args.metrics_file, args.metrics_port)
+    try:
+        await enrich_bet_ids(client, args.db_path, args.full, metrics)
+    finally:
+        if metrics:
+            metrics.close()
+
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,4 +1,6 @@
 #!/usr/bin/env python3
+import argparse
+import copy
 import json
 import shutil
 import gzip
@@ -7,6 +9,7 @@ import os
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from contextlib import contextmanager
+from urllib.request import pathname2url
 
 # Fix for Python 3.12+ SQLite datetime deprecation warning
 def adapt_datetime(val):
@@ -21,6 +24,11 @@ sqlite3.register_converter("datetime", convert_datetime)
 import os
 from dotenv import load_dotenv
 
+from modules.compact_storage import blob_to_hex
+from modules.daily_rollups import ensure_daily_rollups, token_stats_source, wallet_stats_source
+from modules.metric_graph import MetricGraph
+from modules.time_columns import day_id
+
 # Load environment variables
 load_dotenv('.env.local')  # Load local environment first
 load_dotenv()  # Load any other .env files
@@ -34,25 +42,75 @@ if IS_PRODUCTION:
     FRONTEND_PUBLIC = "/app/data/analytics_dump.json"
     FRONTEND_DEPLOYMENT_PUBLIC = "/app/frontend-deployment/public/analytics_dump.json"
     COMPRESSED_FILE = "/app/data/analytics_dump.json.gz"
+    CHECKPOINT_FILE = "/app/data/analytics_checkpoint.json"
 else:
     DB_PATH = os.getenv('DB_PATH', 'betting_transactions.db')
     OUTPUT_FILE = "analytics_dump.json"
     FRONTEND_PUBLIC = "new/public/analytics_dump.json"
     FRONTEND_DEPLOYMENT_PUBLIC = "frontend-deployment/public/analytics_dump.json"
     COMPRESSED_FILE = "new/public/analytics_dump.json.gz"
+    CHECKPOINT_FILE = "data/analytics_checkpoint.json"
+
+# Period start of a day_id ({day}) for each timeframe, matching generate_periods()
+PERIOD_BUCKETS = {
+    'day': "DATE({day} * 86400, 'unixepoch')",
+    'week': "DATE({day} * 86400, 'unixepoch', 'weekday 0', '-6 days')",
+    'month': "DATE({day} * 86400, 'unixepoch', 'start of month')",
+}
+
+def generate_periods(start_date: str, timeframe: str, today: str) -> List[tuple]:
+    """
+    (period_number, period_start, period_end) date strings of a timeframe, from
+    the period containing start_date until the first period starting after today.
+    Weeks run Monday to Sunday and months are calendar months.
+    """
+    start = datetime.strptime(start_date[:10], '%Y-%m-%d').date()
+    last = datetime.strptime(today, '%Y-%m-%d').date()
+    if timeframe == 'week':
+        start += timedelta(days=(6 - start.weekday()) % 7 - 6)
+    elif timeframe == 'month':
+        start = start.replace(day=1)
+
+    periods = []
+    while True:
+        if timeframe == 'day':
+            end, next_start = start, start + timedelta(days=1)
+        elif timeframe == 'week':
+            end, next_start = start + timedelta(days=6), start + timedelta(days=7)
+        else:
+            next_start = (start + timedelta(days=32)).replace(day=1)
+            end = next_start - timedelta(days=1)
+        periods.append((len(periods) + 1, start.isoformat(), end.isoformat()))
+        if start > last:
+            return periods
+        start = next_start
 
 class FlexibleAnalytics:
-    """Main analytics class for flexible timeframe analysis."""
+    """
+    Main analytics class for flexible timeframe analysis.
+    Reads the daily rollups maintained by ingestion (modules/daily_rollups.py)
+    instead of the raw betting rows wherever a metric allows it.
+    """
     
-    def __init__(self, db_path: str = "betting_transactions.db"):
+    def __init__(self, db_path: str = "betting_transactions.db", read_only: bool = False):
         self.db_path = db_path
+        self.read_only = read_only
         self.conn = None
         self.cursor = None
 
     def __enter__(self):
         """Enter context manager, connect to DB."""
+        if self.read_only:
+            # Metric worker connection: the rollups were caught up by a writable instance first
+            uri = f"file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self.cursor = self.conn.cursor()
+            return self
         self.conn = sqlite3.connect(self.db_path)
         self.cursor = self.conn.cursor()
+        # Catch up rows written by anything that did not update the rollups
+        ensure_daily_rollups(self.conn, "betting_transactions")
+        self.conn.commit()
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
@@ -66,12 +124,12 @@ class FlexibleAnalytics:
         """Get total metrics for all time."""
         query = """
         SELECT
-            COUNT(DISTINCT tx_hash) as total_submissions,
-            COUNT(DISTINCT from_address) as total_active_addresses,
+            SUM(submissions) as total_submissions,
+            (SELECT COUNT(DISTINCT wallet_id) FROM daily_wallet_stats) as total_active_addresses,
             SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon_volume,
             SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END) as total_jerry_volume,
-            SUM(n_cards) as total_cards
-        FROM betting_transactions
+            SUM(cards) as total_cards
+        FROM daily_token_stats
         """
         self.cursor.execute(query)
         result = self.cursor.fetchone()
@@ -88,10 +146,10 @@ class FlexibleAnalytics:
         query = """
         WITH user_submissions AS (
             SELECT 
-                from_address,
-                COUNT(DISTINCT tx_hash) as bet_tx_count
-            FROM betting_transactions
-            GROUP BY from_address
+                wallet_id,
+                SUM(submissions) as bet_tx_count
+            FROM daily_wallet_stats
+            GROUP BY wallet_id
         ),
         categorized_users AS (
             SELECT 
@@ -101,7 +159,7 @@ class FlexibleAnalytics:
                     WHEN bet_tx_count >= 10 AND bet_tx_count < 100 THEN '10~99 RareLinks'
                     WHEN bet_tx_count >= 100 THEN '100+ RareLinks'
                 END as submission_category,
-                COUNT(DISTINCT from_address) as player_count
+                COUNT(DISTINCT wallet_id) as player_count
             FROM user_submissions
             GROUP BY 
                 CASE
@@ -160,16 +218,22 @@ class FlexibleAnalytics:
         """Get top bettors table with their statistics."""
         query = """
         SELECT 
-            from_address as user_address,
-            SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon,
-            SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END) as total_jerry,
-            SUM(amount) as total_bet,
-            ROUND(AVG(n_cards), 2) as avg_cards_per_slip,
-            COUNT(DISTINCT tx_hash) as total_bets,
-            COUNT(DISTINCT DATE(timestamp)) as active_days
-        FROM betting_transactions
-        GROUP BY from_address
-        ORDER BY total_bets DESC
+            w.address as user_address,
+            s.total_mon, s.total_jerry, s.total_bet, s.avg_cards_per_slip, s.total_bets, s.active_days
+        FROM (
+            SELECT 
+                wallet_id,
+                SUM(mon_amount) as total_mon,
+                SUM(jerry_amount) as total_jerry,
+                SUM(amount) as total_bet,
+                ROUND(CAST(SUM(cards) AS FLOAT) / SUM(submissions), 2) as avg_cards_per_slip,
+                SUM(submissions) as total_bets,
+                COUNT(DISTINCT local_day) as active_days
+            FROM daily_wallet_stats
+            GROUP BY wallet_id
+        ) s
+        JOIN wallets w ON w.id = s.wallet_id
+        ORDER BY s.total_bets DESC
         LIMIT ?
         """
         self.cursor.execute(query, (limit,))
@@ -179,7 +243,7 @@ class FlexibleAnalytics:
             user_address, total_mon, total_jerry, total_bet, avg_cards, total_bets, active_days = row
             top_bettors.append({
                 'rank': i + 1,
-                'user_address': user_address,
+                'user_address': blob_to_hex(user_address),
                 'total_mon': total_mon or 0.0,
                 'total_jerry': total_jerry or 0.0,
                 'total_bet': total_bet or 0.0,
@@ -189,123 +253,97 @@ class FlexibleAnalytics:
             })
         return top_bettors
 
-    def get_activity_over_time(self, start_date: str, timeframe: str, since_timestamp: Optional[str] = None) -> List[Dict]:
-        """Get activity over time data for the specified timeframe and start date."""
-        timeframe_map = {
-            'day': {
-                'period_generator': f"""
-                    WITH RECURSIVE periods AS (
-                        SELECT 
-                            DATE('{start_date}') as period_start,
-                            DATE('{start_date}') as period_end,
-                            1 as period_number
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            DATE(period_start, '+1 day') as period_start,
-                            DATE(period_start, '+1 day') as period_end,
-                            period_number + 1 as period_number
-                        FROM periods
-                        WHERE period_start <= DATE('now')
-                    )
-                """,
-                'period_columns': 'period_start, period_end, period_number',
-                'date_format': '%Y-%m-%d'
-            },
-            'week': {
-                'period_generator': f"""
-                    WITH RECURSIVE periods AS (
-                        SELECT 
-                            DATE('{start_date}', 'weekday 0', '-6 days') as period_start,
-                            DATE('{start_date}', 'weekday 0', '+0 days') as period_end,
-                            1 as period_number
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            DATE(period_start, '+7 days') as period_start,
-                            DATE(period_end, '+7 days') as period_end,
-                            period_number + 1 as period_number
-                        FROM periods
-                        WHERE period_start <= DATE('now')
-                    )
-                """,
-                'period_columns': 'period_start, period_end, period_number',
-                'date_format': '%Y-%m-%d'
-            },
-            'month': {
-                'period_generator': f"""
-                    WITH RECURSIVE periods AS (
-                        SELECT 
-                            DATE('{start_date}', 'start of month') as period_start,
-                            DATE('{start_date}', 'start of month', '+1 month', '-1 day') as period_end,
-                            1 as period_number
-                        
-                        UNION ALL
-                        
-                        SELECT 
-                            DATE(period_start, '+1 month') as period_start,
-                            DATE(period_start, '+2 months', '-1 day') as period_end,
-                            period_number + 1 as period_number
-                        FROM periods
-                        WHERE period_start <= DATE('now')
-                    )
-                """,
-                'period_columns': 'period_start, period_end, period_number',
-                'date_format': '%Y-%m'
-            }
-        }
+    def get_activity_over_time(self, start_date: str, timeframe: str, since_timestamp: Optional[str] = None,
+                               from_date: Optional[str] = None) -> List[Dict]:
+        """
+        Get activity over time data for the specified timeframe and start date.
 
-        if timeframe not in timeframe_map:
+        Every rollup row is tagged with the start of its period and aggregated in
+        one GROUP BY; the periods themselves (numbering, and the empty ones in
+        between) come from generate_periods(). Only rows after since_timestamp
+        count when it is provided; a new bettor is a wallet active in the period
+        whose first bet (at any time, from wallet_first_seen) is dated in it. With from_date,
+        only the periods ending on or after it are computed (numbered as usual).
+        """
+        if timeframe not in PERIOD_BUCKETS:
             raise ValueError(f"Invalid timeframe: {timeframe}")
 
-        config = timeframe_map[timeframe]
-        
-        # Add timestamp filter if since_timestamp is provided
-        timestamp_filter = ""
-        if since_timestamp:
-            timestamp_filter = f"AND t.timestamp > '{since_timestamp}'"
-        
-        query = f"""
-        {config['period_generator']},
-        first_time_users AS (
-            SELECT 
-                from_address,
-                MIN(timestamp) as first_bet_date
-            FROM betting_transactions
-            GROUP BY from_address
-        )
+        self.cursor.execute("SELECT DATE('now')")
+        periods = generate_periods(start_date, timeframe, self.cursor.fetchone()[0])
+        if from_date:
+            periods = [period for period in periods if period[2] >= from_date[:10]]
+            if not periods:
+                return []
+        bucket = PERIOD_BUCKETS[timeframe]
+        day_range = (day_id(periods[0][1]), day_id(periods[-1][2]) + 1)
+
+        self.cursor.execute(f"""
         SELECT 
-            p.period_start,
-            p.period_end,
-            p.period_number,
-            COUNT(t.tx_hash) as submissions,
-            COUNT(DISTINCT t.from_address) as active_addresses,
-            COUNT(DISTINCT CASE WHEN DATE(ftu.first_bet_date) >= p.period_start AND DATE(ftu.first_bet_date) <= p.period_end THEN t.from_address END) as new_bettors,
-            SUM(CASE WHEN t.token = 'MON' THEN t.amount ELSE 0 END) as mon_volume,
-            SUM(CASE WHEN t.token = 'Jerry' THEN t.amount ELSE 0 END) as jerry_volume,
-            SUM(t.n_cards) as total_cards,
-            ROUND(AVG(t.n_cards), 2) as avg_cards_per_submission,
-            AVG(t.amount) as avg_bet_amount,
-            SUM(CASE WHEN t.token = 'MON' THEN 1 ELSE 0 END) as mon_transactions,
-            SUM(CASE WHEN t.token = 'Jerry' THEN 1 ELSE 0 END) as jerry_transactions
-        FROM periods p
-        LEFT JOIN betting_transactions t ON 
-            DATE(t.timestamp, 'utc') >= p.period_start AND DATE(t.timestamp, 'utc') <= p.period_end
-            {timestamp_filter}
-        LEFT JOIN first_time_users ftu ON t.from_address = ftu.from_address
-        GROUP BY p.period_start, p.period_end, p.period_number
-        HAVING COUNT(t.tx_hash) > 0
-        ORDER BY p.period_start
-        """
+            {bucket.format(day='day_id')} as period_start,
+            SUM(submissions) as submissions,
+            SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as mon_volume,
+            SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END) as jerry_volume,
+            SUM(cards) as total_cards,
+            ROUND(CAST(SUM(cards) AS FLOAT) / SUM(submissions), 2) as avg_cards_per_submission,
+            SUM(amount) / SUM(submissions) as avg_bet_amount,
+            SUM(CASE WHEN token = 'MON' THEN submissions ELSE 0 END) as mon_transactions,
+            SUM(CASE WHEN token = 'Jerry' THEN submissions ELSE 0 END) as jerry_transactions
+        FROM {token_stats_source(since_timestamp)}
+        WHERE day_id >= ? AND day_id < ?
+        GROUP BY period_start
+        """, day_range)
+        token_totals = {row[0]: row[1:] for row in self.cursor.fetchall()}
 
-        self.cursor.execute(query)
-        results = self.cursor.fetchall()
+        self.cursor.execute(f"""
+        SELECT 
+            {bucket.format(day='day_id')} as period_start,
+            COUNT(DISTINCT wallet_id) as active_addresses
+        FROM {wallet_stats_source(since_timestamp)}
+        WHERE day_id >= ? AND day_id < ?
+        GROUP BY period_start
+        """, day_range)
+        active_totals = dict(self.cursor.fetchall())
+
+        # A new bettor of a period is active in it and placed its first bet on one of
+        # its dates (first_day is the calendar date of the stored timestamp, while
+        # activity is bucketed by UTC day_id, as the raw-row query always did)
+        if since_timestamp:
+            self.cursor.execute(f"""
+            SELECT 
+                {bucket.format(day='w.day_id')} as period_start,
+                COUNT(DISTINCT w.wallet_id) as new_bettors
+            FROM {wallet_stats_source(since_timestamp)} w
+            JOIN wallet_first_seen f ON f.wallet = w.wallet_id
+            WHERE w.day_id >= ? AND w.day_id < ?
+              AND {bucket.format(day='f.first_day')} = {bucket.format(day='w.day_id')}
+            GROUP BY period_start
+            """, day_range)
+        else:
+            # Range scan on the first_day index, activity checked on idx_daily_wallet_stats_wallet
+            self.cursor.execute(f"""
+            SELECT 
+                {bucket.format(day='f.first_day')} as period_start,
+                COUNT(*) as new_bettors
+            FROM wallet_first_seen f
+            WHERE f.first_day >= ? AND f.first_day < ?
+              AND EXISTS (
+                  SELECT 1 FROM daily_wallet_stats w
+                  WHERE w.wallet_id = f.wallet AND w.day_id > f.first_day - 31 AND w.day_id < f.first_day + 31
+                    AND {bucket.format(day='w.day_id')} = {bucket.format(day='f.first_day')}
+              )
+            GROUP BY period_start
+            """, day_range)
+        new_bettor_totals = dict(self.cursor.fetchall())
 
         activity_data = []
-        for row in results:
-            period_start, period_end, period_num, submissions, active_addresses, new_bettors, mon_vol, jerry_vol, cards, avg_cards, avg_bet, mon_txs, jerry_txs = row
+        for period_num, period_start, period_end in periods:
+            totals = token_totals.get(period_start)
+            # Periods without submissions are left out
+            if not totals or not totals[0]:
+                continue
+            submissions, mon_vol, jerry_vol, cards, avg_cards, avg_bet, mon_txs, jerry_txs = totals
+            active_addresses = active_totals.get(period_start, 0)
+            new_bettors = new_bettor_totals.get(period_start, 0)
             
             activity_data.append({
                 'period': period_num,
@@ -357,24 +395,51 @@ class FlexibleAnalytics:
             SELECT 'Last Day' as period_name,
                    DATE('now', '-1 day') as start_date,
                    DATE('now', '-1 day') as end_date
+        ),
+        ranges AS (
+            SELECT 
+                period_name,
+                start_date,
+                end_date,
+                CAST(strftime('%s', start_date) AS INTEGER) / 86400 as first_day,
+                CAST(strftime('%s', end_date) AS INTEGER) / 86400 + 1 as end_day
+            FROM timeframes
+        ),
+        token_totals AS (
+            SELECT 
+                r.period_name,
+                SUM(s.submissions) as submissions,
+                SUM(s.cards) as total_cards,
+                SUM(CASE WHEN s.token = 'MON' THEN s.amount ELSE 0 END) as mon_volume,
+                SUM(CASE WHEN s.token = 'Jerry' THEN s.amount ELSE 0 END) as jerry_volume
+            FROM ranges r
+            JOIN daily_token_stats s ON s.day_id >= r.first_day AND s.day_id < r.end_day
+            GROUP BY r.period_name
+        ),
+        wallet_totals AS (
+            SELECT 
+                r.period_name,
+                COUNT(DISTINCT w.wallet_id) as players
+            FROM ranges r
+            JOIN daily_wallet_stats w ON w.day_id >= r.first_day AND w.day_id < r.end_day
+            GROUP BY r.period_name
         )
         SELECT 
-            tf.period_name,
-            tf.start_date,
-            tf.end_date,
-            COUNT(DISTINCT t.tx_hash) as total_submissions,
-            COUNT(DISTINCT t.from_address) as unique_players,
-            SUM(t.n_cards) as total_cards,
-            ROUND(AVG(t.n_cards), 2) as avg_cards_per_slip,
-            SUM(CASE WHEN t.token = 'MON' THEN t.amount ELSE 0 END) as mon_volume,
-            SUM(CASE WHEN t.token = 'Jerry' THEN t.amount ELSE 0 END) as jerry_volume,
-            ROUND(CAST(COUNT(DISTINCT t.from_address) AS FLOAT) / COUNT(DISTINCT t.tx_hash), 2) as avg_submissions_per_player
-        FROM timeframes tf
-        LEFT JOIN betting_transactions t ON 
-            DATE(t.timestamp, 'utc') >= tf.start_date AND DATE(t.timestamp, 'utc') <= tf.end_date
-        GROUP BY tf.period_name, tf.start_date, tf.end_date
+            r.period_name,
+            r.start_date,
+            r.end_date,
+            COALESCE(tt.submissions, 0) as total_submissions,
+            COALESCE(wt.players, 0) as unique_players,
+            tt.total_cards,
+            ROUND(CAST(tt.total_cards AS FLOAT) / tt.submissions, 2) as avg_cards_per_slip,
+            tt.mon_volume,
+            tt.jerry_volume,
+            ROUND(CAST(wt.players AS FLOAT) / tt.submissions, 2) as avg_submissions_per_player
+        FROM ranges r
+        LEFT JOIN token_totals tt ON tt.period_name = r.period_name
+        LEFT JOIN wallet_totals wt ON wt.period_name = r.period_name
         ORDER BY 
-            CASE tf.period_name
+            CASE r.period_name
                 WHEN 'All Time' THEN 1
                 WHEN 'Last 90 Days' THEN 2
                 WHEN 'Last 30 Days' THEN 3
@@ -401,16 +466,39 @@ class FlexibleAnalytics:
         
         return stats_data
 
-    def get_cohort_retention_data(self) -> List[Dict]:
-        """Get weekly cohort retention data for RBS users."""
-        query = """
+    def get_cohort_retention_data(self, since_week: Optional[str] = None,
+                                  cohort_sizes: Optional[Dict[str, int]] = None) -> List[Dict]:
+        """
+        Get weekly cohort retention data for RBS users.
+
+        With since_week (a week start), only the weeks from since_week on are
+        computed, from the wallets active in them: cohorts starting at or after
+        since_week in full, earlier cohorts only their retention in those weeks.
+        Earlier cohorts keep their sizes from cohort_sizes (earliest_date -> users).
+        """
+        touched_users, new_cohorts, earlier_cohorts, touched_weeks, touched_cohorts = '', '', '', '', ''
+        if since_week:
+            # Only wallets active from since_week on can change those weeks
+            touched_users = "AND wallet_id IN (SELECT wallet_id FROM betting_transactions WHERE timestamp >= :since_week)"
+            new_cohorts = "WHERE earliest_date >= :since_week"
+            earlier_cohorts = """
+            UNION ALL
+            
+            SELECT
+                json_each.key as earliest_date,
+                json_each.value as new_users
+            FROM json_each(:cohort_sizes)
+            WHERE json_each.key < :since_week"""
+            touched_weeks = "AND date >= :since_week"
+            touched_cohorts = "WHERE cnu.earliest_date >= :since_week OR cru.difference IS NOT NULL"
+        query = f"""
         WITH users_all AS (
             SELECT 
                 tx_hash,
-                from_address as user_address,
+                wallet_id as user_address,
                 timestamp
             FROM betting_transactions 
-            WHERE DATE(timestamp) >= '2025-02-04'
+            WHERE timestamp >= '2025-02-04' {touched_users}
         ),
         
         base_table AS (
@@ -435,7 +523,8 @@ class FlexibleAnalytics:
                 earliest_date,
                 COUNT(DISTINCT user) as new_users 
             FROM base_table_with_diff
-            GROUP BY earliest_date
+            {new_cohorts}
+            GROUP BY earliest_date{earlier_cohorts}
         ),
         
         count_returning_users AS (
@@ -444,7 +533,7 @@ class FlexibleAnalytics:
                 difference,
                 COUNT(DISTINCT user) as existing_users 
             FROM base_table_with_diff
-            WHERE difference != 0
+            WHERE difference != 0 {touched_weeks}
             GROUP BY earliest_date, difference
         )
         
@@ -459,10 +548,12 @@ class FlexibleAnalytics:
             END as retention_pct
         FROM count_new_users cnu
         LEFT JOIN count_returning_users cru ON cnu.earliest_date = cru.earliest_date
+        {touched_cohorts}
         ORDER BY cnu.earliest_date, COALESCE(cru.difference, 0)
         """
         
-        self.cursor.execute(query)
+        self.cursor.execute(query, {'since_week': since_week, 'cohort_sizes': json.dumps(cohort_sizes or {})}
+                            if since_week else {})
         results = self.cursor.fetchall()
         
         # Process results into cohort retention format
@@ -499,25 +590,31 @@ class FlexibleAnalytics:
 
     def analyze_timeframe(self, start_date: str, timeframe: str, since_timestamp: Optional[str] = None) -> Dict:
         """Analyze data for a specific timeframe and start date."""
-        total_metrics = self.get_total_metrics()
-        activity_over_time = self.get_activity_over_time(start_date, timeframe, since_timestamp)
-        player_activity = self.get_player_activity_analysis()
-        rbs_stats_by_periods = self.get_rbs_stats_by_periods()
-        
-        return {
-            'timeframe': timeframe,
-            'start_date': start_date,
-            'total_periods': len(activity_over_time),
-            'total_metrics': total_metrics,
-            'activity_over_time': activity_over_time,
-            'player_activity': player_activity,
-            'rbs_stats_by_periods': rbs_stats_by_periods
-        }
+        return timeframe_analysis(
+            start_date, timeframe,
+            total_metrics=self.get_total_metrics(),
+            activity_over_time=self.get_activity_over_time(start_date, timeframe, since_timestamp),
+            player_activity=self.get_player_activity_analysis(),
+            rbs_stats_by_periods=self.get_rbs_stats_by_periods()
+        )
+
+def timeframe_analysis(start_date: str, timeframe: str, total_metrics: Dict, activity_over_time: List[Dict],
+                       player_activity: Dict, rbs_stats_by_periods: List[Dict]) -> Dict:
+    """The analyze_timeframe() result, from metrics computed elsewhere."""
+    return {
+        'timeframe': timeframe,
+        'start_date': start_date,
+        'total_periods': len(activity_over_time),
+        'total_metrics': total_metrics,
+        'activity_over_time': activity_over_time,
+        'player_activity': player_activity,
+        'rbs_stats_by_periods': rbs_stats_by_periods
+    }
 
 def get_overall_slips_by_card_count(analytics, min_cards=2, max_cards=7):
     query = f"""
-        SELECT n_cards, COUNT(DISTINCT tx_hash) as bet_count
-        FROM betting_transactions
+        SELECT n_cards, SUM(submissions) as bet_count
+        FROM daily_token_stats
         WHERE n_cards BETWEEN ? AND ?
         GROUP BY n_cards
         ORDER BY n_cards
@@ -557,16 +654,16 @@ def get_weekly_slips_by_card_count(analytics, min_cards=2, max_cards=7):
         w.week_number,
         w.week_start,
         w.week_end,
-        t.n_cards,
-        COUNT(DISTINCT t.tx_hash) as bets
+        s.n_cards,
+        SUM(s.submissions) as bets
     FROM weeks w
-    LEFT JOIN betting_transactions t ON 
-        DATE(t.timestamp, 'utc') >= w.week_start AND 
-        DATE(t.timestamp, 'utc') <= w.week_end AND
-        t.n_cards BETWEEN ? AND ?
-    GROUP BY w.week_number, w.week_start, w.week_end, t.n_cards
-    HAVING COUNT(DISTINCT t.tx_hash) > 0
-    ORDER BY w.week_number, t.n_cards
+    JOIN daily_token_stats s ON 
+        s.day_id >= CAST(strftime('%s', w.week_start) AS INTEGER) / 86400 AND 
+        s.day_id < CAST(strftime('%s', w.week_end) AS INTEGER) / 86400 + 1 AND
+        s.n_cards BETWEEN ? AND ?
+    GROUP BY w.week_number, w.week_start, w.week_end, s.n_cards
+    HAVING SUM(s.submissions) > 0
+    ORDER BY w.week_number, s.n_cards
     """
     
     analytics.cursor.execute(query, (min_cards, max_cards))
@@ -593,8 +690,12 @@ def get_weekly_slips_by_card_count(analytics, min_cards=2, max_cards=7):
     
     return weekly_array
 
-def get_timeframe_slips_by_card_count(analytics, timeframe, start_date='2025-02-03', min_cards=2, max_cards=7, since_timestamp: Optional[str] = None):
-    """Get card count data for different timeframes (daily, weekly, monthly)."""
+def get_timeframe_slips_by_card_count(analytics, timeframe, start_date='2025-02-03', min_cards=2, max_cards=7, since_timestamp: Optional[str] = None,
+                                      from_date: Optional[str] = None):
+    """
+    Get card count data for different timeframes (daily, weekly, monthly).
+    With from_date, only the periods ending on or after it are computed.
+    """
     if timeframe == 'day':
         period_generator = f"""
             WITH RECURSIVE periods AS (
@@ -652,31 +753,27 @@ def get_timeframe_slips_by_card_count(analytics, timeframe, start_date='2025-02-
     else:
         return []
     
-    # Add timestamp filter if since_timestamp is provided
-    timestamp_filter = ""
-    if since_timestamp:
-        timestamp_filter = f"AND t.timestamp > '{since_timestamp}'"
-    
+    # Only rows after since_timestamp count when it is provided
     query = f"""
     {period_generator}
     SELECT 
         p.period_number,
         p.period_start,
         p.period_end,
-        t.n_cards,
-        COUNT(DISTINCT t.tx_hash) as bets
+        s.n_cards,
+        SUM(s.submissions) as bets
     FROM periods p
-    LEFT JOIN betting_transactions t ON 
-        DATE(t.timestamp, 'utc') >= p.period_start AND 
-        DATE(t.timestamp, 'utc') <= p.period_end AND
-        t.n_cards BETWEEN ? AND ?
-        {timestamp_filter}
-    GROUP BY p.period_number, p.period_start, p.period_end, t.n_cards
-    HAVING COUNT(DISTINCT t.tx_hash) > 0
-    ORDER BY p.period_number, t.n_cards
+    JOIN {token_stats_source(since_timestamp)} s ON 
+        s.day_id >= CAST(strftime('%s', p.period_start) AS INTEGER) / 86400 AND 
+        s.day_id < CAST(strftime('%s', p.period_end) AS INTEGER) / 86400 + 1 AND
+        s.n_cards BETWEEN ? AND ?
+    WHERE p.period_end >= ?
+    GROUP BY p.period_number, p.period_start, p.period_end, s.n_cards
+    HAVING SUM(s.submissions) > 0
+    ORDER BY p.period_number, s.n_cards
     """
     
-    analytics.cursor.execute(query, (min_cards, max_cards))
+    analytics.cursor.execute(query, (min_cards, max_cards, from_date[:10] if from_date else ''))
     results = analytics.cursor.fetchall()
     
     # Group by period and card count
@@ -704,12 +801,12 @@ def get_average_metrics(analytics):
     """Calculate average metrics using the user's SQL logic."""
     query = """
     SELECT 
-        COUNT(DISTINCT from_address) as users,
-        COUNT(DISTINCT tx_hash) as bet_tx,
-        ROUND(AVG(n_cards)) as avg_cards,
-        SUM(n_cards) as tot_cards,
-        COUNT(DISTINCT DATE(timestamp, 'utc')) as total_days
-    FROM betting_transactions
+        (SELECT COUNT(DISTINCT wallet_id) FROM daily_wallet_stats) as users,
+        COALESCE(SUM(submissions), 0) as bet_tx,
+        ROUND(CAST(SUM(cards) AS FLOAT) / SUM(submissions)) as avg_cards,
+        SUM(cards) as tot_cards,
+        COUNT(DISTINCT day_id) as total_days
+    FROM daily_token_stats
     """
     
     analytics.cursor.execute(query)
@@ -752,96 +849,312 @@ def load_existing_analytics() -> Optional[Dict]:
         print(f"Warning: Could not load existing analytics: {e}")
         return None
 
-def merge_analytics_data(existing_data: Dict, new_data: Dict, since_timestamp: str) -> Dict:
-    """Merge new analytics data with existing data."""
+def generation_watermark(analytics) -> Dict:
+    """The last betting row (rowid and tx_hash) as a generation starts."""
+    analytics.cursor.execute("SELECT rowid, tx_hash FROM betting_transactions ORDER BY rowid DESC LIMIT 1")
+    last = analytics.cursor.fetchone() or (0, None)
+    return {'last_rowid': last[0], 'last_tx_hash': blob_to_hex(last[1])}
+
+def load_analytics_checkpoint() -> Optional[Dict]:
+    """Load the checkpoint of the last generation if available."""
+    try:
+        if os.path.exists(CHECKPOINT_FILE):
+            with open(CHECKPOINT_FILE, 'r') as f:
+                return json.load(f)
+        return None
+    except Exception as e:
+        print(f"Warning: Could not load analytics checkpoint: {e}")
+        return None
+
+def save_analytics_checkpoint(watermark: Dict, generated_at: str, start_date: str):
+    """Record which rows the analytics dump written at generated_at covers."""
+    directory = os.path.dirname(CHECKPOINT_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    checkpoint = dict(watermark, generated_at=generated_at, start_date=start_date)
+    tmp_path = f"{CHECKPOINT_FILE}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, CHECKPOINT_FILE)
+
+def changes_since(analytics, checkpoint: Dict) -> Optional[Dict]:
+    """
+    Where the rows added since the checkpointed generation start:
+    {'from_date': earliest UTC date, 'cohort_week': earliest cohort week}, both
+    None if nothing was added. None if the checkpoint cannot be trusted (its
+    last row was deleted or renumbered, e.g. by a reorg rollback or VACUUM).
+    """
+    if checkpoint['last_rowid']:
+        analytics.cursor.execute("SELECT tx_hash FROM betting_transactions WHERE rowid = ?", (checkpoint['last_rowid'],))
+        marker = analytics.cursor.fetchone()
+        if marker is None or blob_to_hex(marker[0]) != checkpoint['last_tx_hash']:
+            return None
+    analytics.cursor.execute("""
+        SELECT COUNT(*), DATE(MIN(day_id) * 86400, 'unixepoch'), DATE(MIN(timestamp), 'weekday 0', '-6 days')
+        FROM betting_transactions
+        WHERE rowid > ?
+    """, (checkpoint['last_rowid'],))
+    added, from_date, cohort_week = analytics.cursor.fetchone()
+    if added and from_date is None:
+        return None  # rows without day_id are not in the rollups yet
+    return {'from_date': from_date, 'cohort_week': cohort_week}
+
+def splice_cohort_retention(existing: List[Dict], recomputed: List[Dict], since_week: str) -> List[Dict]:
+    """
+    Replace the weeks from since_week on in the cohort retention list with the
+    output of get_cohort_retention_data(since_week, ...).
+    """
+    first_week = datetime.strptime(since_week, '%Y-%m-%d')
+    cohorts = {}
+    for cohort in existing:
+        if cohort['earliest_date'] >= since_week:
+            continue
+        cohort_start = datetime.strptime(cohort['earliest_date'], '%Y-%m-%d')
+        cohorts[cohort['earliest_date']] = dict(cohort, retention_weeks={
+            key: value for key, value in cohort['retention_weeks'].items()
+            if cohort_start + timedelta(weeks=int(key.split('_')[0])) < first_week
+        })
+    for cohort in recomputed:
+        if cohort['earliest_date'] in cohorts:
+            cohorts[cohort['earliest_date']]['retention_weeks'].update(cohort['retention_weeks'])
+        else:
+            cohorts[cohort['earliest_date']] = cohort
+    for cohort in cohorts.values():
+        cohort['retention_weeks'] = dict(sorted(cohort['retention_weeks'].items(), key=lambda item: int(item[0].split('_')[0])))
+    return [cohorts[earliest_date] for earliest_date in sorted(cohorts)]
+
+def merge_analytics_data(existing_data: Dict, new_data: Dict, since_timestamp: str,
+                         from_date: Optional[str] = None, cohort_week: Optional[str] = None) -> Dict:
+    """
+    Merge an incremental run into the existing analytics dump.
+
+    new_data holds the metrics recomputed by build_metric_graph(start_date,
+    from_date, cohort_week, ...), keyed by metric name. Period arrays keep
+    their entries ending before from_date and take the recomputed ones after
+    that; cohort retention is spliced from cohort_week on; every other metric
+    in new_data replaces its value.
+    """
     if not existing_data:
-        return new_data
+        raise ValueError("An incremental merge needs an existing analytics dump")
     
-    # For incremental updates, we need to be careful about merging
-    # For now, we'll regenerate everything to ensure consistency
-    # In a more sophisticated implementation, we could merge specific timeframes
     print(f"🔄 Merging analytics data since {since_timestamp}...")
+    merged = copy.deepcopy(existing_data)
+    for key in ('total_metrics', 'average_metrics', 'player_activity', 'rbs_stats_by_periods',
+                'top_bettors', 'overall_slips_by_card_count'):
+        if key in new_data:
+            merged[key] = new_data[key]
+    
+    if from_date:
+        for timeframe, section_name in TIMEFRAME_SECTIONS.items():
+            section = merged['timeframes'][section_name]
+            section['activity_over_time'] = [
+                period for period in section['activity_over_time'] if period['end_date'] < from_date
+            ] + new_data[f'activity_{timeframe}']
+            section['slips_by_card_count'] = [
+                period for period in section['slips_by_card_count'] if period['period_end'] < from_date
+            ] + new_data[f'slips_{timeframe}']
+        # Legacy copies of the weekly arrays
+        merged['activity_over_time'] = merged['timeframes']['weekly']['activity_over_time']
+        merged['weekly_slips_by_card_count'] = merged['timeframes']['weekly']['slips_by_card_count']
+    
+    if cohort_week:
+        merged['cohort_retention'] = splice_cohort_retention(merged['cohort_retention'], new_data['cohort_retention'], cohort_week)
     
     # Update metadata
-    new_data['metadata']['generated_at'] = datetime.now().isoformat() + "Z"
-    new_data['metadata']['last_incremental_update'] = since_timestamp
+    merged['metadata']['generated_at'] = datetime.now().isoformat() + "Z"
+    merged['metadata']['last_incremental_update'] = since_timestamp
+    merged['metadata']['full_generation'] = False
     
-    return new_data
+    return merged
+
+def analytics_differences(expected: Any, actual: Any, path: str = '', limit: int = 20) -> List[str]:
+    """Paths where two analytics dumps differ (metadata ignored), at most limit of them."""
+    differences = []
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        for key in sorted(set(expected) | set(actual), key=str):
+            if not path and key == 'metadata':
+                continue
+            if key not in expected or key not in actual:
+                differences.append(f"{path}/{key}: only in {'the full rebuild' if key in expected else 'the merge'}")
+            else:
+                differences += analytics_differences(expected[key], actual[key], f"{path}/{key}", limit - len(differences))
+            if len(differences) >= limit:
+                break
+    elif isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        for i, (left, right) in enumerate(zip(expected, actual)):
+            differences += analytics_differences(left, right, f"{path}[{i}]", limit - len(differences))
+            if len(differences) >= limit:
+                break
+    elif expected != actual:
+        if isinstance(expected, list) and isinstance(actual, list):
+            differences.append(f"{path}: {len(actual)} entries instead of {len(expected)}")
+        else:
+            differences.append(f"{path}: {actual!r} instead of {expected!r}")
+    return differences[:limit]
+
+ANALYTICS_START_DATE = '2025-02-03'
+TIMEFRAMES = ['day', 'week', 'month']
+TIMEFRAME_SECTIONS = {'day': 'daily', 'week': 'weekly', 'month': 'monthly'}
+
+# What an incremental run recomputes: rolling windows always, the rest only when rows were added
+ROLLING_METRICS = ['rbs_stats_by_periods']
+CHANGED_DATA_METRICS = (['total_metrics', 'average_metrics', 'player_activity', 'top_bettors',
+                         'overall_slips_by_card_count', 'cohort_retention']
+                        + [f'{metric}_{timeframe}' for timeframe in TIMEFRAMES for metric in ('activity', 'slips')])
+
+def build_metric_graph(start_date: str = ANALYTICS_START_DATE, from_date: Optional[str] = None,
+                       cohort_week: Optional[str] = None, cohort_sizes: Optional[Dict[str, int]] = None) -> MetricGraph:
+    """
+    Every metric of the analytics dump, computed once per run: the all-time
+    metrics are shared by the three timeframe analyses instead of being
+    queried again for each of them. For an incremental run, from_date limits
+    the period arrays to the periods ending on or after it and cohort_week
+    (with the existing cohort_sizes) the cohort retention to the weeks from it.
+    """
+    graph = MetricGraph()
+    graph.add('total_metrics', lambda analytics: analytics.get_total_metrics())
+    graph.add('player_activity', lambda analytics: analytics.get_player_activity_analysis())
+    graph.add('rbs_stats_by_periods', lambda analytics: analytics.get_rbs_stats_by_periods())
+    graph.add('average_metrics', get_average_metrics)
+    graph.add('cohort_retention', lambda analytics: analytics.get_cohort_retention_data(cohort_week, cohort_sizes))
+    graph.add('top_bettors', lambda analytics: analytics.get_top_bettors(20))
+    graph.add('overall_slips_by_card_count', lambda analytics: get_overall_slips_by_card_count(analytics, 2, 7))
+
+    for timeframe in TIMEFRAMES:
+        graph.add(f'activity_{timeframe}',
+                  lambda analytics, timeframe=timeframe: analytics.get_activity_over_time(start_date, timeframe, from_date=from_date))
+        graph.add(f'slips_{timeframe}',
+                  lambda analytics, timeframe=timeframe: get_timeframe_slips_by_card_count(
+                      analytics, timeframe, start_date, 2, 7, from_date=from_date))
+        graph.add(f'analysis_{timeframe}',
+                  lambda analytics, timeframe=timeframe, **metrics: timeframe_analysis(
+                      start_date, timeframe,
+                      total_metrics=metrics['total_metrics'],
+                      activity_over_time=metrics[f'activity_{timeframe}'],
+                      player_activity=metrics['player_activity'],
+                      rbs_stats_by_periods=metrics['rbs_stats_by_periods']),
+                  inputs=['total_metrics', f'activity_{timeframe}', 'player_activity', 'rbs_stats_by_periods'])
+    return graph
+
+def build_analytics_data(results: Dict[str, Any], generated_at: str) -> Dict:
+    """The analytics dump structure from the results of build_metric_graph()."""
+    # Use weekly data as the main data (for backward compatibility)
+    main_data = results['analysis_week']
+    
+    return {
+        "success": True,
+        "metadata": {
+            "generated_at": generated_at + "Z",
+            "timeframes_available": ["daily", "weekly", "monthly"],
+            "default_timeframe": "weekly",
+            "full_generation": True
+        },
+        # Main metrics (all time)
+        "total_metrics": main_data['total_metrics'],
+        "average_metrics": results['average_metrics'],
+        "player_activity": main_data['player_activity'],
+        "rbs_stats_by_periods": main_data['rbs_stats_by_periods'],
+        "cohort_retention": results['cohort_retention'],
+        
+        # Timeframe-specific data
+        "timeframes": {
+            "daily": {
+                "activity_over_time": results['analysis_day']['activity_over_time'],
+                "slips_by_card_count": results['slips_day']
+            },
+            "weekly": {
+                "activity_over_time": results['analysis_week']['activity_over_time'],
+                "slips_by_card_count": results['slips_week']
+            },
+            "monthly": {
+                "activity_over_time": results['analysis_month']['activity_over_time'],
+                "slips_by_card_count": results['slips_month']
+            }
+        },
+        
+        # Legacy data (for backward compatibility)
+        "activity_over_time": main_data['activity_over_time'],
+        "overall_slips_by_card_count": results['overall_slips_by_card_count'],
+        # The weekly timeframe data, as before (get_weekly_slips_by_card_count() output was overwritten by it)
+        "weekly_slips_by_card_count": results['slips_week'],
+        "top_bettors": results['top_bettors']
+    }
+
+def run_full_generation(workers: int, generated_at: str) -> Dict:
+    graph = build_metric_graph(ANALYTICS_START_DATE)
+    results = graph.run(lambda: FlexibleAnalytics(DB_PATH, read_only=True), workers=workers)
+    graph.print_timings()
+    return build_analytics_data(results, generated_at)
+
+def run_incremental_generation(analytics, workers: int) -> Optional[Dict]:
+    """
+    Recompute what changed since the checkpointed generation and merge it into
+    the existing dump. None if there is no usable checkpoint or dump.
+    """
+    checkpoint = load_analytics_checkpoint()
+    existing_data = load_existing_analytics()
+    if not checkpoint or not existing_data:
+        print("⚠️  No analytics checkpoint or existing dump, running a full generation")
+        return None
+    if (existing_data.get('metadata', {}).get('generated_at') != checkpoint['generated_at']
+            or checkpoint.get('start_date') != ANALYTICS_START_DATE):
+        print("⚠️  The existing dump does not match the analytics checkpoint, running a full generation")
+        return None
+    changes = changes_since(analytics, checkpoint)
+    if changes is None:
+        print("⚠️  Rows covered by the analytics checkpoint were deleted or renumbered, running a full generation")
+        return None
+    
+    if changes['from_date']:
+        print(f"🔄 Running incremental analytics generation: periods from {changes['from_date']}, "
+              f"cohort weeks from {changes['cohort_week']}...")
+        targets = ROLLING_METRICS + CHANGED_DATA_METRICS
+    else:
+        print("🔄 No new rows since the last generation, refreshing rolling windows only...")
+        targets = ROLLING_METRICS
+    cohort_sizes = {cohort['earliest_date']: cohort['users'] for cohort in existing_data.get('cohort_retention', [])}
+    graph = build_metric_graph(ANALYTICS_START_DATE, changes['from_date'], changes['cohort_week'], cohort_sizes)
+    results = graph.run(lambda: FlexibleAnalytics(DB_PATH, read_only=True), workers=workers, targets=targets)
+    graph.print_timings()
+    return merge_analytics_data(existing_data, results, checkpoint['generated_at'], **changes)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the analytics dump from the betting database")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="Metrics computed concurrently, each on its own read-only connection")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"Recompute only the periods touched since the generation recorded in {CHECKPOINT_FILE} "
+                             "and merge them into the existing dump (falls back to a full generation)")
+    parser.add_argument("--verify", action="store_true",
+                        help="With --incremental, also run a full generation and diff it against the merge")
+    args = parser.parse_args()
+
+    # Catches up the rollups before the read-only workers start
     with FlexibleAnalytics(DB_PATH) as analytics:
         print("🔄 Starting analytics generation...")
         current_timestamp = datetime.now().isoformat()
+        watermark = generation_watermark(analytics)
         
-        print("🔄 Running full analytics generation...")
-        
-        # Generate analytics for multiple timeframes
-        timeframes = ['day', 'week', 'month']
-        all_analytics = {}
-        
-        for timeframe in timeframes:
-            print(f"📊 Processing {timeframe} data...")
-            analysis = analytics.analyze_timeframe('2025-02-03', timeframe)
-            all_analytics[timeframe] = analysis
-        
-        # Get additional data
-        print("📈 Getting additional metrics...")
-        top_bettors = analytics.get_top_bettors(20)
-        overall_slips_by_card_count = get_overall_slips_by_card_count(analytics, 2, 7)
-        weekly_slips_by_card_count = get_weekly_slips_by_card_count(analytics, 2, 7)
-        average_metrics = get_average_metrics(analytics)
-        
-        # Get cohort retention data
-        print("📊 Getting cohort retention data...")
-        cohort_retention = analytics.get_cohort_retention_data()
-        
-        # Get timeframe-specific card count data
-        print("🎯 Getting card count data for all timeframes...")
-        daily_slips_by_card_count = get_timeframe_slips_by_card_count(analytics, 'day', '2025-02-03', 2, 7)
-        weekly_slips_by_card_count = get_timeframe_slips_by_card_count(analytics, 'week', '2025-02-03', 2, 7)
-        monthly_slips_by_card_count = get_timeframe_slips_by_card_count(analytics, 'month', '2025-02-03', 2, 7)
-        
-        # Use weekly data as the main data (for backward compatibility)
-        main_data = all_analytics['week']
-        
-        # Create optimized structure
-        data = {
-            "success": True,
-            "metadata": {
-                "generated_at": current_timestamp + "Z",
-                "timeframes_available": ["daily", "weekly", "monthly"],
-                "default_timeframe": "weekly",
-                "full_generation": True
-            },
-            # Main metrics (all time)
-            "total_metrics": main_data['total_metrics'],
-            "average_metrics": average_metrics,
-            "player_activity": main_data['player_activity'],
-            "rbs_stats_by_periods": main_data['rbs_stats_by_periods'],
-            "cohort_retention": cohort_retention,
-            
-            # Timeframe-specific data
-            "timeframes": {
-                "daily": {
-                    "activity_over_time": all_analytics['day']['activity_over_time'],
-                    "slips_by_card_count": daily_slips_by_card_count
-                },
-                "weekly": {
-                    "activity_over_time": all_analytics['week']['activity_over_time'],
-                    "slips_by_card_count": weekly_slips_by_card_count
-                },
-                "monthly": {
-                    "activity_over_time": all_analytics['month']['activity_over_time'],
-                    "slips_by_card_count": monthly_slips_by_card_count
-                }
-            },
-            
-            # Legacy data (for backward compatibility)
-            "activity_over_time": main_data['activity_over_time'],
-            "overall_slips_by_card_count": overall_slips_by_card_count,
-            "weekly_slips_by_card_count": weekly_slips_by_card_count,
-            "top_bettors": top_bettors
-        }
+        data = run_incremental_generation(analytics, args.workers) if args.incremental else None
+        verified = True
+        if data is not None:
+            current_timestamp = data['metadata']['generated_at'][:-1]
+            if args.verify:
+                print("🔍 Verifying the merge against a full generation...")
+                full_data = run_full_generation(args.workers, current_timestamp)
+                differences = analytics_differences(full_data, data)
+                if differences:
+                    verified = False
+                    print("❌ The incremental merge differs from the full generation:")
+                    for difference in differences:
+                        print(f"   {difference}")
+                    print("   Writing the full generation instead")
+                    data = full_data
+                else:
+                    print("✅ The incremental merge matches the full generation")
+        else:
+            print(f"🔄 Running full analytics generation ({args.workers} workers)...")
+            data = run_full_generation(args.workers, current_timestamp)
         
         # Save uncompressed JSON
         with open(OUTPUT_FILE, "w") as f:
@@ -874,4 +1187,8 @@ if __name__ == "__main__":
         print(f"📊 File sizes:")
         print(f"   Uncompressed: {uncompressed_size / 1024:.1f} KB")
         print(f"   Compressed: {compressed_size / 1024:.1f} KB")
-        print(f"   Compression: {compression_ratio:.1f}%") 
\ No newline at end of file
+        print(f"   Compression: {compression_ratio:.1f}%")
+        
+        save_analytics_checkpoint(watermark, data['metadata']['generated_at'], ANALYTICS_START_DATE)
+        if not verified:
+            raise SystemExit(1) 
\ No newline at end of file
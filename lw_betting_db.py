@@ -17,6 +17,7 @@ from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
 import argparse
 import sys
+import time
 
 # Fix for Python 3.12+ SQLite datetime deprecation warning
 def adapt_datetime(val):
@@ -31,6 +32,18 @@ sqlite3.register_converter("datetime", convert_datetime)
 from hypersync import HypersyncClient, ClientConfig, TransactionSelection, LogSelection, FieldSelection, Query
 from hypersync import LogField, TransactionField, BlockField, JoinMode
 
+from modules.response_index import build_response_index
+from modules.contracts import (
+    CONTRACT_ADDRESSES_1, SIG_HASH_1, CONTRACT_ADDRESS_2_TX_TO, CONTRACT_ADDRESS_2_LOG_A,
+    CONTRACT_ADDRESS_2_LOG_B, SIG_HASH_2, TOPIC_0_LOG_A, CARDS_LOG_TOPIC_0, BETTING_COLUMNS
+)
+from modules.bulk_writer import BulkWriter, DEFAULT_INSERT_BATCH_SIZE
+from modules.adaptive_pager import AdaptivePager
+from modules.wallets import ensure_wallet_ids, wallet_converters, WALLET_RENAMES
+from modules.time_columns import ensure_time_columns, assign_time_columns
+from modules.daily_rollups import ensure_daily_rollups, update_daily_rollups
+from modules.compact_storage import compact_converters, blob_to_hex, HEX_COLUMNS
+
 # =============================================================================
 # CONFIGURATION
 # =============================================================================
@@ -45,26 +58,16 @@ IS_PRODUCTION = os.getenv('IS_PRODUCTION', 'false').lower() == 'true'
 MONAD_HYPERSYNC_URL = os.getenv("MONAD_HYPERSYNC_URL", "https://monad-testnet.hypersync.xyz")
 HYPERSYNC_BEARER_TOKEN = os.getenv("HYPERSYNC_BEARER_TOKEN")
 
-# Contract addresses and signatures - matching original query exactly
-CONTRACT_ADDRESSES_1 = ['0x3ad50059d6008b711209a509fe58e68f0b672a42', '0x740990cb01e893a371a050736c62ae0b779109e7']
-SIG_HASH_1 = '0x5029defb'
-
-CONTRACT_ADDRESS_2_TX_TO = '0x740990cb01e893a371a050736c62ae0b779109e7'
-CONTRACT_ADDRESS_2_LOG_A = '0xda054a96254776346386060c480b42a10c870cd2'
-CONTRACT_ADDRESS_2_LOG_B = '0x740990cb01e893a371a050736c62ae0b779109e7'
-SIG_HASH_2 = '0xb65c106f'
-TOPIC_0_LOG_A = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
-CARDS_LOG_TOPIC_0 = '0xefc52bf7792453af1461fa9a7097486359b41a048898b6d542c0f03389487187'
-
 # =============================================================================
 # DATABASE MANAGEMENT
 # =============================================================================
 
 class BettingDatabase:
-    """SQLite database manager for betting transactions."""
+    """SQLite database manager for betting transactions (addresses stored as wallet ids, see betting_transactions_v)."""
     
-    def __init__(self, db_path: str = "lw_betting_transactions.db"):
+    def __init__(self, db_path: str = "lw_betting_transactions.db", insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE):
         self.db_path = db_path
+        self.writer = BulkWriter("betting_transactions", BETTING_COLUMNS, insert_batch_size, renames=WALLET_RENAMES)
         self.init_database()
     
     def init_database(self):
@@ -77,7 +80,7 @@ class BettingDatabase:
                 CREATE TABLE IF NOT EXISTS betting_transactions (
                     timestamp DATETIME NOT NULL,
                     tx_hash TEXT PRIMARY KEY,
-                    from_address TEXT NOT NULL,
+                    wallet_id INTEGER NOT NULL REFERENCES wallets(id),
                     to_address TEXT NOT NULL,
                     token TEXT NOT NULL,
                     amount REAL NOT NULL,
@@ -90,7 +93,6 @@ class BettingDatabase:
             
             # Create indexes for faster queries
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_timestamp ON betting_transactions(timestamp)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_from_address ON betting_transactions(from_address)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_token ON betting_transactions(token)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_block_number ON betting_transactions(block_number)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_bet_id ON betting_transactions(bet_id)")
@@ -104,6 +106,18 @@ class BettingDatabase:
                 )
             """)
             
+            # Integer wallet ids in place of from_address, the view joins the address back in
+            ensure_wallet_ids(conn, "betting_transactions")
+            # Integer ts_epoch / day_id for index range filters on dates
+            ensure_time_columns(conn, "betting_transactions")
+            # Per-day rollups read by json_query.py, maintained with every insert
+            ensure_daily_rollups(conn, "betting_transactions")
+            
+            # Databases migrated by compact_database.py store hashes and addresses as BLOBs
+            self.converters = compact_converters(conn, "betting_transactions")
+            # Addresses are resolved to their wallet id before the insert
+            self.writer.set_converters(wallet_converters(self.converters))
+            
             # Insert initial checkpoint if none exists
             cursor.execute("SELECT COUNT(*) FROM checkpoints")
             if cursor.fetchone()[0] == 0:
@@ -147,42 +161,25 @@ class BettingDatabase:
             return 0
         
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            inserted_count = 0
-            
-            for tx in transactions:
-                try:
-                    cursor.execute("""
-                        INSERT INTO betting_transactions 
-                        (timestamp, tx_hash, from_address, to_address, token, amount, n_cards, bet_id, block_number)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        tx['timestamp'],
-                        tx['tx_hash'],
-                        tx['from_address'],
-                        tx['to_address'],
-                        tx['token'],
-                        tx['amount'],
-                        tx['n_cards'],
-                        tx['bet_id'],
-                        tx['block_number']
-                    ))
-                    inserted_count += 1
-                except sqlite3.IntegrityError:
-                    continue  # Skip duplicates
-            
+            inserted_count, skipped_count = self.writer.write_dicts(conn, transactions)
+            assign_time_columns(conn, "betting_transactions")
+            update_daily_rollups(conn, "betting_transactions")
             conn.commit()
-            print(f"Inserted {inserted_count} new transactions (skipped {len(transactions) - inserted_count} duplicates)")
+            print(f"Inserted {inserted_count} new transactions (skipped {skipped_count} duplicates)")
             return inserted_count
     
     def get_all_transactions(self) -> pd.DataFrame:
         """Get all transactions as a pandas DataFrame."""
         with self.get_connection() as conn:
-            return pd.read_sql_query("""
+            df = pd.read_sql_query("""
                 SELECT timestamp, tx_hash, from_address, to_address, token, amount, n_cards, bet_id, block_number
-                FROM betting_transactions 
+                FROM betting_transactions_v 
                 ORDER BY timestamp
             """, conn)
+        if self.converters:
+            for column in HEX_COLUMNS:
+                df[column] = df[column].map(blob_to_hex)
+        return df
     
     def get_database_stats(self) -> Dict[str, Any]:
         """Get database statistics."""
@@ -201,8 +198,8 @@ class BettingDatabase:
             """)
             token_stats = cursor.fetchall()
             
-            # Unique users
-            cursor.execute("SELECT COUNT(DISTINCT from_address) FROM betting_transactions")
+            # Unique users (wallets only holds addresses that have rows)
+            cursor.execute("SELECT COUNT(*) FROM wallets")
             unique_users = cursor.fetchone()[0]
             
             # Date range
@@ -283,19 +280,83 @@ def calculate_cards_in_slip_sql_style(data: str) -> int:
 # DATA FETCHING FUNCTIONS
 # =============================================================================
 
+async def fetch_bet_ids(client: HypersyncClient, tx_blocks: Dict[str, int]) -> Dict[str, int]:
+    """
+    Look up bet IDs for a page of transactions with one range log query.
+
+    tx_blocks maps tx hash -> block number. The cards logs of every block in
+    the page's range are fetched together (following next_block if the
+    response is truncated) and joined locally by tx hash, instead of one
+    query per transaction. Returns tx hash -> bet_id for the hashes found.
+    """
+    if not tx_blocks:
+        return {}
+
+    bet_ids = {}
+    current_block = min(tx_blocks.values())
+    end_block = max(tx_blocks.values()) + 1
+
+    while current_block < end_block:
+        log_query = Query(
+            from_block=current_block,
+            to_block=end_block,
+            logs=[
+                LogSelection(
+                    address=CONTRACT_ADDRESSES_1,
+                    topics=[[CARDS_LOG_TOPIC_0]]
+                )
+            ],
+            field_selection=FieldSelection(
+                log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
+                     LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
+            )
+        )
+        log_response = await client.get(log_query)
+
+        if log_response.data and log_response.data.logs:
+            for log in log_response.data.logs:
+                if log.transaction_hash in tx_blocks and len(log.topics) >= 3:
+                    # Look for the card event log (topic 0 = CARDS_LOG_TOPIC_0), first one wins
+                    if log.topics[0] and log.topics[0].lower() == CARDS_LOG_TOPIC_0:
+                        bet_ids.setdefault(log.transaction_hash, hex_to_int(log.topics[2]))
+
+        if log_response.next_block and log_response.next_block > current_block:
+            current_block = log_response.next_block
+        else:
+            break
+
+    return bet_ids
+
+async def fill_bet_ids(client: HypersyncClient, page_tx_data: List[Dict[str, Any]], label: str):
+    """Set bet_id on a page of transaction rows from a single batched log lookup."""
+    if not page_tx_data:
+        return
+
+    try:
+        bet_ids = await fetch_bet_ids(client, {tx["tx_hash"]: tx["block_number"] for tx in page_tx_data})
+    except Exception as e:
+        print(f"        Error querying logs for {label}: {e}")
+        return
+
+    for tx in page_tx_data:
+        tx["bet_id"] = bet_ids.get(tx["tx_hash"], 0)
+    print(f"        Found {len(bet_ids)}/{len(page_tx_data)} {label} bet IDs in one log query")
+
 async def fetch_mon_transactions(client: HypersyncClient, start_block: int, end_block: int) -> List[Dict[str, Any]]:
     """Fetch MON betting transactions - matching original query logic exactly."""
     print(f"Fetching MON transactions from {start_block} to {end_block}...")
     
     all_tx_data = []
     current_block = start_block
+    pager = AdaptivePager("MON", 10000)
 
     while current_block < end_block:
-        print(f"  Processing blocks {current_block} to {min(current_block + 10000, end_block)}...")
+        to_block = pager.request_range(current_block, end_block)
+        print(f"  Processing blocks {current_block} to {to_block}...")
         
         query = Query(
             from_block=current_block,
-            to_block=min(current_block + 10000, end_block),
+            to_block=to_block,
             transactions=[TransactionSelection(
                 to=CONTRACT_ADDRESSES_1,
                 sighash=[SIG_HASH_1]
@@ -309,13 +370,17 @@ async def fetch_mon_transactions(client: HypersyncClient, start_block: int, end_
             ),
         )
 
+        request_start = time.time()
         response = await client.get(query)
+        request_seconds = time.time() - request_start
 
         if response.data:
             block_timestamp_map = {
                 b.number: hex_to_int(b.timestamp)
                 for b in response.data.blocks if b.number and b.timestamp
             }
+            index = build_response_index(response)
+            page_tx_data = []
 
             for tx in response.data.transactions:
                 if tx.status != 1:  # Only successful transactions
@@ -326,56 +391,22 @@ async def fetch_mon_transactions(client: HypersyncClient, start_block: int, end_
                     continue
 
                 # Debug: Check transaction input signature
+                tx_logs = index.logs_for(tx.hash)
                 print(f"      ORIGINAL MON transaction: {tx.hash}")
                 print(f"        Input signature: {tx.input[:10]} (expected: {SIG_HASH_1})")
                 print(f"        Has MON signature: {tx.input[:10] == SIG_HASH_1}")
-                print(f"        Number of logs: {len([log for log in response.data.logs if log.transaction_hash == tx.hash])}")
+                print(f"        Number of logs: {len(tx_logs)}")
                 print(f"        All logs for this transaction:")
-                for log in response.data.logs:
-                    if log.transaction_hash == tx.hash:
-                        print(f"          - address: {log.address}, topics: {log.topics}")
+                for log in tx_logs:
+                    print(f"          - address: {log.address}, topics: {log.topics}")
 
                 # Calculate cards in slip from transaction input
                 cards_in_slip = calculate_cards_in_slip_from_tx(tx.input)
 
-                # Get bet_id_decoded from logs using separate query
-                bet_id_decoded = 0
-                try:
-                    # Query logs for this specific transaction
-                    log_query = Query(
-                        from_block=tx.block_number,
-                        to_block=tx.block_number + 1,
-                        logs=[
-                            LogSelection(
-                                address=CONTRACT_ADDRESSES_1,
-                                topics=[[CARDS_LOG_TOPIC_0]]
-                            )
-                        ],
-                        field_selection=FieldSelection(
-                            log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
-                                 LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
-                        )
-                    )
-                    log_response = await client.get(log_query)
-                    
-                    if log_response.data and log_response.data.logs:
-                        print(f"        Checking logs for bet_id...")
-                        for log in log_response.data.logs:
-                            if log.transaction_hash == tx.hash and len(log.topics) >= 3:
-                                print(f"          Log: address={log.address}, topics={log.topics}")
-                                # Look for the card event log (topic 0 = CARDS_LOG_TOPIC_0)
-                                if (log.topics and log.topics[0] and 
-                                    log.topics[0].lower() == '0xefc52bf7792453af1461fa9a7097486359b41a048898b6d542c0f03389487187'):
-                                    bet_id_decoded = hex_to_int(log.topics[2])
-                                    print(f"          Found bet_id: {bet_id_decoded}")
-                                    break
-                except Exception as e:
-                    print(f"        Error querying logs: {e}")
-                
                 # Calculate bet amount (MON units)
                 bet_amt = hex_to_int(tx.value) / 1e18
                 
-                all_tx_data.append({
+                page_tx_data.append({
                     "timestamp": datetime.fromtimestamp(timestamp),
                     "tx_hash": tx.hash,
                     "from_address": tx.from_,
@@ -383,15 +414,17 @@ async def fetch_mon_transactions(client: HypersyncClient, start_block: int, end_
                     "token": "MON",
                     "amount": bet_amt,
                     "n_cards": cards_in_slip,
-                    "bet_id": bet_id_decoded,
+                    "bet_id": 0,
                     "block_number": tx.block_number,
                 })
+
+            # Fill bet IDs for this page with one range log query
+            await fill_bet_ids(client, page_tx_data, "MON")
+            all_tx_data.extend(page_tx_data)
         
-        if response.next_block and response.next_block > current_block:
-            current_block = response.next_block
-        else:
-            current_block += 10000
+        current_block = pager.observe(current_block, to_block, response, request_seconds)
 
+    print(f"  {pager.summary()}")
     print(f"Found {len(all_tx_data)} MON transactions")
     return all_tx_data
 
@@ -401,14 +434,16 @@ async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, en
     
     all_tx_data = []
     current_block = start_block
+    pager = AdaptivePager("Jerry", 10000)
     
     while current_block < end_block:
-        print(f"  Processing blocks {current_block} to {min(current_block + 10000, end_block)}...")
+        to_block = pager.request_range(current_block, end_block)
+        print(f"  Processing blocks {current_block} to {to_block}...")
         
         # Query for Jerry transactions with both function signature and logs
         query = Query(
             from_block=current_block,
-            to_block=min(current_block + 10000, end_block),
+            to_block=to_block,
             transactions=[TransactionSelection(
                 to=[CONTRACT_ADDRESS_2_TX_TO],
                 sighash=[SIG_HASH_2]
@@ -425,7 +460,9 @@ async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, en
             )
         )
 
+        request_start = time.time()
         response = await client.get(query)
+        request_seconds = time.time() - request_start
 
         if response.data:
             block_timestamp_map = {
@@ -433,27 +470,15 @@ async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, en
                 for b in response.data.blocks if b.number and b.timestamp
             }
 
-            # Group logs by transaction hash
-            logs_by_tx_hash = {}
-            for log in response.data.logs:
-                if log.transaction_hash not in logs_by_tx_hash:
-                    logs_by_tx_hash[log.transaction_hash] = []
-                logs_by_tx_hash[log.transaction_hash].append(log)
+            index = build_response_index(response)
+            page_tx_data = []
 
             # Process transactions that have both required logs
-            for tx_hash, tx_logs in logs_by_tx_hash.items():
-                has_jerry_log = any(
-                    log.address.lower() == CONTRACT_ADDRESS_2_LOG_A.lower() 
-                    and log.topics and log.topics[0] and log.topics[0].lower() == TOPIC_0_LOG_A.lower()
-                    for log in tx_logs
-                )
-                has_rarebet_log = any(
-                    log.address.lower() == CONTRACT_ADDRESS_2_LOG_B.lower()
-                    for log in tx_logs
-                )
+            for tx_hash in index.tx_hashes_with(CONTRACT_ADDRESS_2_LOG_A, TOPIC_0_LOG_A):
+                has_rarebet_log = index.has_log(tx_hash, address=CONTRACT_ADDRESS_2_LOG_B)
                 
-                if has_jerry_log and has_rarebet_log:
-                    tx = next((t for t in response.data.transactions if t.hash == tx_hash), None)
+                if has_rarebet_log:
+                    tx = index.get_transaction(tx_hash)
                     if not tx or tx.status != 1:
                         continue
 
@@ -467,22 +492,13 @@ async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, en
                         continue
                     
                     # Get Jerry log for bet amount
-                    jerry_log = next((
-                        log for log in tx_logs 
-                        if log.address.lower() == CONTRACT_ADDRESS_2_LOG_A.lower()
-                        and log.topics and log.topics[0] and log.topics[0].lower() == TOPIC_0_LOG_A.lower()
-                    ), None)
+                    jerry_log = index.first_log(tx_hash, CONTRACT_ADDRESS_2_LOG_A, TOPIC_0_LOG_A)
                     
                     # Get card event log for cards in slip
-                    card_event_log = next((
-                        log for log in tx_logs
-                        if log.address.lower() == CONTRACT_ADDRESS_2_LOG_B.lower()
-                        and log.topics and log.topics[0] and log.topics[0].lower() == CARDS_LOG_TOPIC_0.lower()
-                    ), None)
+                    card_event_log = index.first_log(tx_hash, CONTRACT_ADDRESS_2_LOG_B, CARDS_LOG_TOPIC_0)
 
                     # Calculate cards in slip
                     cards_in_slip = 0
-                    bet_id_decoded = 0
                     
                     if card_event_log and card_event_log.data:
                         data_hex = card_event_log.data[2:] if card_event_log.data.startswith('0x') else card_event_log.data
@@ -493,40 +509,12 @@ async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, en
                             card_count_hex = data_hex[start_index:end_index]
                             cards_in_slip = hex_to_int(card_count_hex)
                     
-                    # Get bet_id using separate query (same approach as MON)
-                    try:
-                        log_query = Query(
-                            from_block=tx.block_number,
-                            to_block=tx.block_number + 1,
-                            logs=[
-                                LogSelection(
-                                    address=CONTRACT_ADDRESSES_1,
-                                    topics=[[CARDS_LOG_TOPIC_0]]
-                                )
-                            ],
-                            field_selection=FieldSelection(
-                                log=[LogField.ADDRESS, LogField.TOPIC0, LogField.TOPIC1, 
-                                     LogField.TOPIC2, LogField.TOPIC3, LogField.DATA, LogField.TRANSACTION_HASH]
-                            )
-                        )
-                        log_response = await client.get(log_query)
-                        
-                        if log_response.data and log_response.data.logs:
-                            for log in log_response.data.logs:
-                                if log.transaction_hash == tx.hash and len(log.topics) >= 3:
-                                    if (log.topics and log.topics[0] and 
-                                        log.topics[0].lower() == '0xefc52bf7792453af1461fa9a7097486359b41a048898b6d542c0f03389487187'):
-                                        bet_id_decoded = hex_to_int(log.topics[2])
-                                        break
-                    except Exception as e:
-                        print(f"        Error querying logs for JERRY: {e}")
-
                     # Calculate bet amount from Jerry log
                     bet_amt = 0
                     if jerry_log and jerry_log.data:
                         bet_amt = hex_to_int(jerry_log.data) / 1e18
 
-                    all_tx_data.append({
+                    page_tx_data.append({
                         "timestamp": datetime.fromtimestamp(timestamp),
                         "tx_hash": tx.hash,
                         "from_address": tx.from_,
@@ -534,15 +522,17 @@ async def fetch_jerry_transactions(client: HypersyncClient, start_block: int, en
                         "token": "Jerry",
                         "amount": bet_amt,
                         "n_cards": cards_in_slip,
-                        "bet_id": bet_id_decoded,
+                        "bet_id": 0,
                         "block_number": tx.block_number,
                     })
+
+            # Fill bet IDs for this page with one range log query (same approach as MON)
+            await fill_bet_ids(client, page_tx_data, "JERRY")
+            all_tx_data.extend(page_tx_data)
         
-        if response.next_block and response.next_block > current_block:
-            current_block = response.next_block
-        else:
-            current_block += 10000
+        current_block = pager.observe(current_block, to_block, response, request_seconds)
 
+    print(f"  {pager.summary()}")
     print(f"Found {len(all_tx_data)} Jerry transactions")
     return all_tx_data
 
@@ -595,6 +585,7 @@ async def main():
     parser.add_argument("--start-block", type=int, help="Start from specific block")
     parser.add_argument("--end-block", type=int, help="End at specific block")
     parser.add_argument("--stats", action="store_true", help="Show database statistics")
+    parser.add_argument("--insert-batch-size", type=int, default=DEFAULT_INSERT_BATCH_SIZE, help="Rows per executemany batch")
     # Set default database path based on environment
     if IS_PRODUCTION:
         default_db_path = "/app/data/betting_transactions.db"
@@ -605,7 +596,7 @@ async def main():
     args = parser.parse_args()
     
     # Initialize database
-    db = BettingDatabase(db_path=args.db_path)
+    db = BettingDatabase(db_path=args.db_path, insert_batch_size=args.insert_batch_size)
     
     # Initialize Hypersync client
     config = ClientConfig(
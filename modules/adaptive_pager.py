@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Adaptive block-window sizing for paged Hypersync queries.
+The window grows while responses are small and fast and shrinks when they
+get large, slow or truncated by the server (next_block short of to_block),
+so quiet history is covered in few requests and busy ranges stay bounded.
+"""
+
+from typing import Dict
+
+DEFAULT_MIN_WINDOW = 1_000
+DEFAULT_MAX_WINDOW = 5_000_000
+DEFAULT_TARGET_ROWS = 20_000
+DEFAULT_TARGET_SECONDS = 2.0
+
+# Largest single step in either direction, and the band in which the window is left alone
+MAX_GROWTH = 2.0
+MAX_SHRINK = 0.5
+DEADBAND = (0.8, 1.25)
+# Clean responses needed before growing past the window of the last truncation again
+RECOVERY_REQUESTS = 8
+
+
+def _table_rows(table) -> int:
+    if table is None:
+        return 0
+    if hasattr(table, "num_rows"):
+        return table.num_rows
+    return len(table)
+
+
+def _table_bytes(table) -> int:
+    return table.nbytes if table is not None and hasattr(table, "nbytes") else 0
+
+
+def response_size(response) -> Dict[str, int]:
+    """Rows (blocks + transactions + logs) and, for Arrow responses, bytes in a response."""
+    data = getattr(response, "data", None)
+    if data is None:
+        return {"rows": 0, "bytes": 0}
+    tables = [getattr(data, name, None) for name in ("blocks", "transactions", "logs")]
+    return {"rows": sum(_table_rows(t) for t in tables), "bytes": sum(_table_bytes(t) for t in tables)}
+
+
+class AdaptivePager:
+    """
+    Chooses the to_block of each paged request and resizes the window from
+    what the previous response looked like.
+
+    Usage:
+        to_block = pager.request_range(current_block, end_block)
+        response = await client.get(build_query(current_block, to_block))
+        current_block = pager.observe(current_block, to_block, response, seconds)
+    """
+
+    def __init__(self, label: str, initial_window: int, min_window: int = DEFAULT_MIN_WINDOW,
+                 max_window: int = DEFAULT_MAX_WINDOW, target_rows: int = DEFAULT_TARGET_ROWS,
+                 target_seconds: float = DEFAULT_TARGET_SECONDS):
+        self.label = label
+        self.min_window = min_window
+        self.max_window = max(max_window, min_window)
+        self.target_rows = target_rows
+        self.target_seconds = target_seconds
+        self.window = self._clamp(initial_window)
+        self.ceiling = None
+        self.clean_requests = 0
+        self.stats = {"requests": 0, "truncated": 0, "blocks": 0, "rows": 0, "bytes": 0, "seconds": 0.0,
+                      "min_window": self.window, "max_window": self.window}
+
+    def _clamp(self, window: float) -> int:
+        return int(min(self.max_window, max(self.min_window, window)))
+
+    def request_range(self, current_block: int, end_block: int) -> int:
+        """to_block (exclusive) for the next request starting at current_block."""
+        return min(current_block + self.window, end_block)
+
+    def observe(self, from_block: int, to_block: int, response, seconds: float) -> int:
+        """
+        Record a response for [from_block, to_block) and resize the window.
+        Returns the block the next request should start from.
+        """
+        size = response_size(response)
+        next_block = getattr(response, "next_block", None)
+        if not next_block or next_block <= from_block:
+            next_block = to_block
+
+        stats = self.stats
+        stats["requests"] += 1
+        stats["blocks"] += min(next_block, to_block) - from_block
+        stats["rows"] += size["rows"]
+        stats["bytes"] += size["bytes"]
+        stats["seconds"] += seconds
+
+        requested = to_block - from_block
+        new_window = self.window
+        reason = None
+
+        if next_block < to_block:
+            # The server stopped early: its limits cover about this many blocks
+            stats["truncated"] += 1
+            new_window = next_block - from_block
+            self.ceiling = new_window
+            self.clean_requests = 0
+            reason = f"truncated at {next_block:,} after {new_window:,} of {requested:,} blocks"
+        else:
+            self.clean_requests += 1
+            if self.ceiling is not None and self.clean_requests >= RECOVERY_REQUESTS:
+                self.ceiling = None
+            ratio = min(self.target_rows / max(size["rows"], 1),
+                        self.target_seconds / max(seconds, 1e-3))
+            if ratio < DEADBAND[0]:
+                new_window = self.window * max(ratio, MAX_SHRINK)
+                reason = f"{size['rows']:,} rows in {seconds:.2f}s over target"
+            elif ratio > DEADBAND[1] and requested >= self.window:
+                # Only grow on full windows, the last page before end_block says little
+                new_window = self.window * min(ratio, MAX_GROWTH)
+                if self.ceiling is not None:
+                    # Stay at the size the server last truncated to until it has been clean for a while
+                    new_window = min(new_window, max(self.ceiling, self.window))
+                reason = f"{size['rows']:,} rows in {seconds:.2f}s under target"
+
+        new_window = self._clamp(new_window)
+        if new_window != self.window:
+            print(f"  {self.label}: window {self.window:,} -> {new_window:,} blocks ({reason})")
+            self.window = new_window
+            stats["min_window"] = min(stats["min_window"], new_window)
+            stats["max_window"] = max(stats["max_window"], new_window)
+
+        return next_block
+
+    def summary(self) -> str:
+        stats = self.stats
+        rate = stats["blocks"] / stats["seconds"] if stats["seconds"] else 0
+        text = (f"{self.label}: {stats['requests']:,} requests, {stats['truncated']:,} truncated, "
+                f"window {stats['min_window']:,}-{stats['max_window']:,} blocks, "
+                f"{stats['rows']:,} rows, {rate:,.0f} blocks/s")
+        if stats["bytes"]:
+            text += f", {stats['bytes'] / 1e6:,.1f} MB"
+        return text
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Columnar decoding of Hypersync Arrow responses.
+Extracts betting and claiming rows from ArrowResponse blocks/transactions/logs
+tables with numpy/pyarrow array operations instead of per-row Python objects.
+
+The tables are expected in Hypersync's default binary layout (no hex_output):
+hashes, addresses, topics, data, input and quantities are binary columns.
+"""
+
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+
+from modules.contracts import (
+    CONTRACT_ADDRESSES_1, SIG_HASH_1, CONTRACT_ADDRESS_2_TX_TO, CONTRACT_ADDRESS_2_LOG_A,
+    CONTRACT_ADDRESS_2_LOG_B, TOPIC_0_LOG_A, CARDS_LOG_TOPIC_0, CLAIM_EVENT_TOPIC,
+    TRANSFER_EVENT_TOPIC, RBS_CONTRACT_ADDRESSES, JERRY_CONTRACT_ADDRESS, RBSD_CONTRACT_ADDRESS
+)
+
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+# =============================================================================
+# BINARY COLUMN HELPERS
+# =============================================================================
+
+def _as_array(column) -> pa.Array:
+    if isinstance(column, pa.ChunkedArray):
+        return column.combine_chunks() if column.num_chunks != 1 else column.chunk(0)
+    return column
+
+
+def _binary_parts(column) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (offsets, data, valid) numpy views of a binary column."""
+    arr = _as_array(column)
+    if pa.types.is_fixed_size_binary(arr.type):
+        arr = arr.cast(pa.binary())
+    offset_dtype = np.int64 if pa.types.is_large_binary(arr.type) else np.int32
+    buffers = arr.buffers()
+    offsets = np.frombuffer(buffers[1], dtype=offset_dtype)[arr.offset:arr.offset + len(arr) + 1].astype(np.int64)
+    data = np.frombuffer(buffers[2], dtype=np.uint8) if buffers[2] is not None else np.empty(0, dtype=np.uint8)
+    valid = arr.is_valid().to_numpy(zero_copy_only=False)
+    return offsets, data, valid
+
+
+def _word_matrix(column, start: int, width: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Bytes [start, start + width) of every value as an (n, width) uint8 matrix.
+    Rows that are null or too short are zero and flagged False in the mask.
+    """
+    offsets, data, valid = _binary_parts(column)
+    lengths = np.diff(offsets)
+    if start == 0 and valid.all() and (lengths == width).all():
+        # Fixed-width values (hashes, addresses, topics): the data buffer already is the matrix
+        return data[offsets[0]:offsets[-1]].reshape(len(lengths), width), valid
+    present = valid & (lengths >= start + width)
+    out = np.zeros((len(lengths), width), dtype=np.uint8)
+    rows = np.nonzero(present)[0]
+    if len(rows):
+        out[rows] = data[offsets[rows, None] + start + np.arange(width)]
+    return out, present
+
+
+def _quantity_matrix(column, width: int = 32) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Big-endian quantities of up to `width` bytes, right-aligned into an (n, width) matrix.
+    Mask is False for null or empty values.
+    """
+    offsets, data, valid = _binary_parts(column)
+    lengths = np.where(valid, np.diff(offsets), 0)
+    take = np.minimum(lengths, width)
+    out = np.zeros((len(lengths), width), dtype=np.uint8)
+    total = int(take.sum())
+    if total:
+        row_idx = np.repeat(np.arange(len(take)), take)
+        within = np.arange(total) - np.repeat(np.cumsum(take) - take, take)
+        out[row_idx, width - take[row_idx] + within] = data[offsets[1:][row_idx] - take[row_idx] + within]
+    return out, take > 0
+
+
+def _be_uint64(matrix: np.ndarray) -> np.ndarray:
+    """Interpret the last 8 columns of a uint8 matrix as big-endian uint64."""
+    return np.ascontiguousarray(matrix[:, -8:]).view('>u8').ravel().astype(np.uint64)
+
+
+def _be_float(matrix: np.ndarray) -> np.ndarray:
+    """
+    Interpret a 32-byte big-endian matrix as float64, rounded exactly like float(int).
+
+    Values below 2**128 are converted with integer ops: the top 64 significant bits
+    plus a sticky bit are rounded once by the uint64 -> float64 cast, then rescaled.
+    Anything wider falls back to Python ints (never seen for token amounts).
+    """
+    hi = _be_uint64(matrix[:, 16:24])
+    lo = _be_uint64(matrix[:, 24:32])
+    result = lo.astype(np.float64)
+
+    wide = hi != 0
+    if wide.any():
+        h, l = hi[wide], lo[wide]
+        # Bit length of the high word (the float estimate can overshoot by one)
+        n = np.minimum(np.frexp(h.astype(np.float64))[1], 64).astype(np.uint64)
+        n = np.where((h >> (n - np.uint64(1))) == 0, n - np.uint64(1), n)
+        full = n == 64
+        shift = np.minimum(n, np.uint64(63))
+        top = (h << ((np.uint64(64) - n) % np.uint64(64))) | np.where(full, np.uint64(0), l >> shift)
+        dropped = np.where(full, l, l & ((np.uint64(1) << shift) - np.uint64(1)))
+        top |= (dropped != 0).astype(np.uint64)
+        result[wide] = np.ldexp(top.astype(np.float64), n.astype(np.int64))
+
+    overflow = np.nonzero(matrix[:, :16].any(axis=1))[0]
+    for row in overflow:
+        result[row] = float(int.from_bytes(matrix[row].tobytes(), 'big'))
+    return result
+
+
+def _uint_column(column) -> np.ndarray:
+    """Integer or binary quantity column as uint64."""
+    arr = _as_array(column)
+    if pa.types.is_integer(arr.type):
+        return arr.fill_null(0).to_numpy(zero_copy_only=False).astype(np.uint64)
+    matrix, _ = _quantity_matrix(arr, 8)
+    return _be_uint64(matrix)
+
+
+def _key_column(column, width: int = 32) -> np.ndarray:
+    """Binary hash/address column as a fixed-width bytes array usable for sorting and lookups."""
+    matrix, _ = _word_matrix(column, 0, width)
+    return np.ascontiguousarray(matrix).view(f'S{width}').ravel()
+
+
+def _hex_strings(matrix: np.ndarray, present: np.ndarray) -> pa.Array:
+    """Encode an (n, width) uint8 matrix as '0x'-prefixed lowercase hex strings."""
+    n, width = matrix.shape
+    chars = np.empty((n, 2 * width + 2), dtype=np.uint8)
+    chars[:, 0] = ord('0')
+    chars[:, 1] = ord('x')
+    chars[:, 2::2] = _HEX_DIGITS[matrix >> 4]
+    chars[:, 3::2] = _HEX_DIGITS[matrix & 0x0F]
+    offsets = np.arange(n + 1, dtype=np.int32) * (2 * width + 2)
+    validity = None if present.all() else pa.array(present).buffers()[1]
+    return pa.StringArray.from_buffers(n, pa.py_buffer(offsets), pa.py_buffer(chars), validity)
+
+
+def _hex_column(column, width: int) -> pa.Array:
+    matrix, present = _word_matrix(column, 0, width)
+    return _hex_strings(matrix, present)
+
+
+def _index_of(needles: np.ndarray, haystack: np.ndarray) -> np.ndarray:
+    """Position of the first occurrence of each needle in haystack, -1 if missing."""
+    if len(haystack) == 0 or len(needles) == 0:
+        return np.full(len(needles), -1, dtype=np.int64)
+    order = np.argsort(haystack, kind='stable')
+    sorted_haystack = haystack[order]
+    pos = np.minimum(np.searchsorted(sorted_haystack, needles), len(sorted_haystack) - 1)
+    return np.where(sorted_haystack[pos] == needles, order[pos], -1)
+
+
+def _last_index_of(needles: np.ndarray, haystack: np.ndarray) -> np.ndarray:
+    """Position of the last occurrence of each needle in haystack, -1 if missing."""
+    reversed_idx = _index_of(needles, haystack[::-1])
+    return np.where(reversed_idx >= 0, len(haystack) - 1 - reversed_idx, -1)
+
+
+def _address_bytes(address: str) -> bytes:
+    return bytes.fromhex(address[2:].lower()).rjust(32, b'\x00')[-20:].ljust(20, b'\x00')
+
+
+def _topic_bytes(topic: str) -> bytes:
+    return bytes.fromhex(topic[2:])
+
+# =============================================================================
+# TIMESTAMPS
+# =============================================================================
+
+def _block_timestamps(blocks: pa.Table, block_numbers: np.ndarray) -> np.ndarray:
+    """Unix timestamp of each block number (0 when the block is missing)."""
+    if blocks is None or blocks.num_rows == 0:
+        return np.zeros(len(block_numbers), dtype=np.uint64)
+    numbers = _uint_column(blocks.column('number'))
+    timestamps = _uint_column(blocks.column('timestamp'))
+    # Same filter as the row decoders' block_timestamp_map
+    keep = (numbers != 0) & (timestamps != 0)
+    idx = _index_of(block_numbers, numbers[keep])
+    return np.where(idx >= 0, timestamps[keep][np.maximum(idx, 0)], 0).astype(np.uint64)
+
+
+def _local_iso_timestamps(epochs: np.ndarray) -> pa.Array:
+    """
+    Format unix timestamps like datetime.fromtimestamp(ts).isoformat().
+
+    Each distinct timestamp (i.e. block) is formatted once, and the local UTC
+    offset is resolved once per distinct hour.
+    """
+    if len(epochs) == 0:
+        return pa.array([], type=pa.string())
+    distinct, rows = np.unique(epochs.astype(np.int64), return_inverse=True)
+    hours, hour_of = np.unique(distinct // 3600, return_inverse=True)
+    offsets = np.array([time.localtime(int(hour) * 3600).tm_gmtoff for hour in hours], dtype=np.int64)
+    local = distinct + offsets[hour_of.ravel()]
+    formatted = pa.array(np.datetime_as_string(local.astype('datetime64[s]'), unit='s'))
+    return formatted.take(pa.array(rows.ravel()))
+
+# =============================================================================
+# LOG SELECTION HELPERS
+# =============================================================================
+
+class _Logs:
+    """Numpy views over a logs table shared by the decoders."""
+
+    def __init__(self, logs: Optional[pa.Table]):
+        self.table = logs
+        n = logs.num_rows if logs is not None else 0
+        if n:
+            self.tx_hash = _key_column(logs.column('transaction_hash'))
+            self.address = _key_column(logs.column('address'), 20)
+            self.topic0 = _key_column(logs.column('topic0'))
+        else:
+            self.tx_hash = np.empty(0, dtype='S32')
+            self.address = np.empty(0, dtype='S20')
+            self.topic0 = np.empty(0, dtype='S32')
+
+    def mask(self, addresses=None, topic0: Optional[str] = None) -> np.ndarray:
+        result = np.ones(len(self.tx_hash), dtype=bool)
+        if addresses is not None:
+            result &= np.isin(self.address, np.array([_address_bytes(a) for a in addresses], dtype='S20'))
+        if topic0 is not None:
+            result &= self.topic0 == np.bytes_(_topic_bytes(topic0))
+        return result
+
+    def column(self, name: str):
+        return self.table.column(name)
+
+# =============================================================================
+# BETTING DECODERS
+# =============================================================================
+
+def _betting_table(timestamps, tx_hash, from_address, to_address, token, amount, n_cards, bet_id, block_number) -> pa.Table:
+    n = len(amount)
+    return pa.table({
+        'timestamp': _local_iso_timestamps(timestamps),
+        'tx_hash': tx_hash,
+        'from_address': from_address,
+        'to_address': to_address,
+        'token': pa.array(np.full(n, token)),
+        'amount': pa.array(amount, type=pa.float64()),
+        'n_cards': pa.array(n_cards.astype(np.int64)),
+        'bet_id': pa.array(bet_id.astype(np.int64)),
+        'block_number': pa.array(block_number.astype(np.int64)),
+    })
+
+
+def empty_betting_table() -> pa.Table:
+    return pa.table({
+        'timestamp': pa.array([], pa.string()), 'tx_hash': pa.array([], pa.string()),
+        'from_address': pa.array([], pa.string()), 'to_address': pa.array([], pa.string()),
+        'token': pa.array([], pa.string()), 'amount': pa.array([], pa.float64()),
+        'n_cards': pa.array([], pa.int64()), 'bet_id': pa.array([], pa.int64()),
+        'block_number': pa.array([], pa.int64()),
+    })
+
+
+def decode_mon_arrow(data) -> pa.Table:
+    """Columnar equivalent of betting_database.decode_mon_response."""
+    txs = data.transactions
+    if txs is None or txs.num_rows == 0:
+        return empty_betting_table()
+
+    status = _uint_column(txs.column('status'))
+    block_numbers = _uint_column(txs.column('block_number'))
+    timestamps = _block_timestamps(data.blocks, block_numbers)
+    # Combined responses also carry Jerry bets and log-joined transactions
+    to_address = _key_column(txs.column('to'), 20)
+    selector, _ = _word_matrix(txs.column('input'), 0, 4)
+    is_mon_bet = (np.isin(to_address, np.array([_address_bytes(a) for a in CONTRACT_ADDRESSES_1], dtype='S20'))
+                  & (np.ascontiguousarray(selector).view('S4').ravel() == np.bytes_(bytes.fromhex(SIG_HASH_1[2:]))))
+    keep = (status == 1) & (timestamps != 0) & is_mon_bet
+    txs = txs.filter(pa.array(keep))
+    block_numbers = block_numbers[keep]
+    timestamps = timestamps[keep]
+
+    # Cards in slip: second calldata word (bytes 36..68), same sanity cap as the row decoder
+    card_word, has_cards = _word_matrix(txs.column('input'), 36)
+    n_cards = _be_uint64(card_word)
+    n_cards = np.where(has_cards & ~card_word[:, :24].any(axis=1) & (n_cards <= 1_000_000), n_cards, 0)
+
+    value, _ = _quantity_matrix(txs.column('value'))
+    amount = _be_float(value) / 1e18
+
+    # bet_id: topic2 of the first card event log of each transaction
+    bet_id = np.zeros(txs.num_rows, dtype=np.uint64)
+    logs = _Logs(data.logs)
+    if len(logs.tx_hash):
+        card_logs = logs.mask(topic0=CARDS_LOG_TOPIC_0)
+        topic2, has_topic2 = _word_matrix(logs.column('topic2'), 0)
+        card_logs &= has_topic2
+        idx = _index_of(_key_column(txs.column('hash')), logs.tx_hash[card_logs])
+        card_bet_ids = _be_uint64(topic2[card_logs])
+        bet_id = np.where(idx >= 0, card_bet_ids[np.maximum(idx, 0)] if len(card_bet_ids) else 0, 0)
+
+    return _betting_table(
+        timestamps,
+        _hex_column(txs.column('hash'), 32),
+        _hex_column(txs.column('from'), 20),
+        _hex_column(txs.column('to'), 20),
+        'MON', amount, n_cards, bet_id, block_numbers
+    )
+
+
+def decode_jerry_arrow(data) -> pa.Table:
+    """Columnar equivalent of betting_database.decode_jerry_response."""
+    txs = data.transactions
+    logs = _Logs(data.logs)
+    if txs is None or txs.num_rows == 0 or len(logs.tx_hash) == 0:
+        return empty_betting_table()
+
+    jerry_logs = logs.mask([CONTRACT_ADDRESS_2_LOG_A], TOPIC_0_LOG_A)
+    rarebet_logs = logs.mask([CONTRACT_ADDRESS_2_LOG_B])
+    card_logs = logs.mask([CONTRACT_ADDRESS_2_LOG_B], CARDS_LOG_TOPIC_0)
+
+    # Candidate transactions: emitted a Jerry transfer log and any RareBet log
+    tx_keys = _key_column(txs.column('hash'))
+    has_jerry = _index_of(tx_keys, logs.tx_hash[jerry_logs]) >= 0
+    has_rarebet = _index_of(tx_keys, logs.tx_hash[rarebet_logs]) >= 0
+    status = _uint_column(txs.column('status'))
+    block_numbers = _uint_column(txs.column('block_number'))
+    timestamps = _block_timestamps(data.blocks, block_numbers)
+    keep = has_jerry & has_rarebet & (status == 1) & (timestamps != 0)
+    # A transaction hash can only produce one row, as in the row decoder
+    _, first = np.unique(tx_keys, return_index=True)
+    unique_rows = np.zeros(len(tx_keys), dtype=bool)
+    unique_rows[first] = True
+    keep &= unique_rows
+
+    txs = txs.filter(pa.array(keep))
+    tx_keys = tx_keys[keep]
+    block_numbers = block_numbers[keep]
+    timestamps = timestamps[keep]
+
+    # Bet amount from the first Jerry transfer log
+    jerry_data, _ = _quantity_matrix(logs.column('data'))
+    jerry_idx = np.nonzero(jerry_logs)[0][_index_of(tx_keys, logs.tx_hash[jerry_logs])]
+    amount = _be_float(jerry_data[jerry_idx]) / 1e18
+
+    # Cards in slip and bet_id from the first card event log (if it has data)
+    n_cards = np.zeros(len(tx_keys), dtype=np.uint64)
+    bet_id = np.zeros(len(tx_keys), dtype=np.uint64)
+    card_pos = _index_of(tx_keys, logs.tx_hash[card_logs])
+    if card_logs.any():
+        card_rows = np.nonzero(card_logs)[0]
+        card_idx = np.where(card_pos >= 0, card_rows[np.maximum(card_pos, 0)], 0)
+        offsets, _, valid = _binary_parts(logs.column('data'))
+        has_data = (card_pos >= 0) & valid[card_idx] & (np.diff(offsets)[card_idx] > 0)
+        card_word, has_card_word = _word_matrix(logs.column('data'), 96)
+        topic2, has_topic2 = _word_matrix(logs.column('topic2'), 0)
+        n_cards = np.where(has_data & has_card_word[card_idx], _be_uint64(card_word[card_idx]), 0)
+        bet_id = np.where(has_data & has_topic2[card_idx], _be_uint64(topic2[card_idx]), 0)
+
+    to_address = pa.array(np.full(len(tx_keys), CONTRACT_ADDRESS_2_TX_TO))
+    return _betting_table(
+        timestamps,
+        _hex_column(txs.column('hash'), 32),
+        _hex_column(txs.column('from'), 20),
+        to_address,
+        'Jerry', amount, n_cards, bet_id, block_numbers
+    )
+
+def decode_bets_arrow(data) -> pa.Table:
+    """Columnar equivalent of betting_database.decode_bets_response (combined MON + Jerry query)."""
+    return pa.concat_tables([decode_mon_arrow(data), decode_jerry_arrow(data)])
+
+# =============================================================================
+# CLAIMING DECODER
+# =============================================================================
+
+def empty_claiming_table() -> pa.Table:
+    return empty_betting_table().drop(['n_cards'])
+
+
+def decode_claiming_arrow(data) -> pa.Table:
+    """Columnar equivalent of claiming_database.decode_claiming_response."""
+    txs = data.transactions
+    logs = _Logs(data.logs)
+    if txs is None or txs.num_rows == 0 or len(logs.tx_hash) == 0:
+        return empty_claiming_table()
+
+    claim_logs = logs.mask(RBS_CONTRACT_ADDRESSES, CLAIM_EVENT_TOPIC)
+    jerry_logs = logs.mask([JERRY_CONTRACT_ADDRESS], TRANSFER_EVENT_TOPIC)
+    rbsd_logs = logs.mask([RBSD_CONTRACT_ADDRESS], TRANSFER_EVENT_TOPIC)
+
+    status = _uint_column(txs.column('status'))
+    block_numbers = _uint_column(txs.column('block_number'))
+    timestamps = _block_timestamps(data.blocks, block_numbers)
+    tx_keys = _key_column(txs.column('hash'))
+    keep = (status == 1) & (timestamps != 0) & (_index_of(tx_keys, logs.tx_hash[claim_logs]) >= 0)
+
+    txs = txs.filter(pa.array(keep))
+    tx_keys = tx_keys[keep]
+    block_numbers = block_numbers[keep]
+    timestamps = timestamps[keep]
+
+    # First 32 bytes of log data and topic2 for every log
+    data_word, has_data_word = _word_matrix(logs.column('data'), 0)
+    data_amount = _be_float(data_word) / 1e18
+    topic2, has_topic2 = _word_matrix(logs.column('topic2'), 0)
+    topic2_ids = _be_uint64(topic2)
+
+    def _pick(mask: np.ndarray, last: bool) -> np.ndarray:
+        rows = np.nonzero(mask)[0]
+        lookup = _last_index_of if last else _index_of
+        pos = lookup(tx_keys, logs.tx_hash[mask])
+        return np.where(pos >= 0, rows[np.maximum(pos, 0)] if len(rows) else 0, -1)
+
+    # JERRY / RBSD: last transfer log with a full data word, last claim log with a topic2
+    jerry_idx = _pick(jerry_logs & has_data_word, last=True)
+    rbsd_idx = _pick(rbsd_logs & has_data_word, last=True)
+    claim_bet_idx = _pick(claim_logs & has_topic2, last=True)
+    # MON: the first claim log carries both the bet_id and the amount
+    first_claim_idx = _pick(claim_logs, last=False)
+
+    is_jerry = _index_of(tx_keys, logs.tx_hash[jerry_logs]) >= 0
+    is_rbsd = ~is_jerry & (_index_of(tx_keys, logs.tx_hash[rbsd_logs]) >= 0)
+    is_mon = ~is_jerry & ~is_rbsd
+
+    def _take(values: np.ndarray, idx: np.ndarray, default=0):
+        return np.where(idx >= 0, values[np.maximum(idx, 0)], default)
+
+    amount = np.where(is_jerry, _take(data_amount, jerry_idx, 0.0),
+             np.where(is_rbsd, _take(data_amount, rbsd_idx, 0.0),
+                      np.where(_take(has_data_word, first_claim_idx, False), _take(data_amount, first_claim_idx, 0.0), 0.0)))
+    bet_id = np.where(is_mon,
+                      np.where(_take(has_topic2, first_claim_idx, False), _take(topic2_ids, first_claim_idx), 0),
+                      _take(topic2_ids, claim_bet_idx))
+    token = np.where(is_jerry, 'JERRY', np.where(is_rbsd, 'RBSD', 'MON'))
+
+    # Only claims with a positive amount are recorded
+    valid = amount > 0
+    txs = txs.filter(pa.array(valid))
+    return pa.table({
+        'timestamp': _local_iso_timestamps(timestamps[valid]),
+        'tx_hash': _hex_column(txs.column('hash'), 32),
+        'from_address': _hex_column(txs.column('from'), 20),
+        'to_address': _hex_column(txs.column('to'), 20),
+        'token': pa.array(token[valid]),
+        'amount': pa.array(amount[valid], type=pa.float64()),
+        'bet_id': pa.array(bet_id[valid].astype(np.int64)),
+        'block_number': pa.array(block_numbers[valid].astype(np.int64)),
+    })
+
+# =============================================================================
+# SQLITE ROWS
+# =============================================================================
+
+def arrow_block_rows(data) -> List[tuple]:
+    """(block_number, unix timestamp) for the blocks of an Arrow response (see modules/block_cache.py)."""
+    blocks = data.blocks
+    if blocks is None or blocks.num_rows == 0:
+        return []
+    numbers = _uint_column(blocks.column('number'))
+    timestamps = _uint_column(blocks.column('timestamp'))
+    keep = (numbers != 0) & (timestamps != 0)
+    return list(zip(numbers[keep].tolist(), timestamps[keep].tolist()))
+
+
+def arrow_rows(batch: pa.Table, columns: Optional[List[str]] = None) -> Iterator[tuple]:
+    """Row tuples of a decoded batch, zipped from its column lists (no per-row dicts)."""
+    columns = columns or batch.column_names
+    return zip(*(batch.column(name).to_pylist() for name in columns))
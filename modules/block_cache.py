@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Persistent block timestamp cache.
+Every ingestion response already carries (number, timestamp) for the blocks it
+touches; they are stored in a `blocks` table in the betting and claiming
+databases as a side effect of ingestion. Later passes can look timestamps up
+locally instead of requesting block fields, and analytics can turn a time
+range into a block range.
+"""
+
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+BLOCK_COLUMNS = ['block_number', 'timestamp']
+
+
+def ensure_blocks_table(conn: sqlite3.Connection):
+    """Create the blocks table (timestamp is unix seconds, UTC)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS blocks (
+            block_number INTEGER PRIMARY KEY,
+            timestamp INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_blocks_timestamp ON blocks(timestamp)")
+
+
+def block_rows(response) -> List[Tuple[int, int]]:
+    """(block_number, unix timestamp) for the blocks of a Python object response."""
+    if not response.data:
+        return []
+    # Same filter as the decoders' block_timestamp_map
+    return [(b.number, int(b.timestamp, 16)) for b in response.data.blocks if b.number and b.timestamp]
+
+
+def write_blocks(conn: sqlite3.Connection, blocks: Iterable[Tuple[int, int]]) -> int:
+    """Store block timestamps on an open connection (the caller commits). Returns new blocks."""
+    cursor = conn.executemany("INSERT OR IGNORE INTO blocks (block_number, timestamp) VALUES (?, ?)", blocks)
+    return cursor.rowcount
+
+
+def get_block_timestamps(conn: sqlite3.Connection, from_block: int, to_block: int) -> Dict[int, int]:
+    """Cached timestamps of the blocks in [from_block, to_block)."""
+    return dict(conn.execute(
+        "SELECT block_number, timestamp FROM blocks WHERE block_number >= ? AND block_number < ?",
+        (from_block, to_block)
+    ).fetchall())
+
+
+def block_range_for_time(conn: sqlite3.Connection, start_ts: int, end_ts: int) -> Optional[Tuple[int, int]]:
+    """
+    Block range [from_block, to_block) of the cached blocks with start_ts <= timestamp < end_ts,
+    or None if no cached block falls in the time range.
+    """
+    from_block, last_block = conn.execute(
+        "SELECT MIN(block_number), MAX(block_number) FROM blocks WHERE timestamp >= ? AND timestamp < ?",
+        (start_ts, end_ts)
+    ).fetchone()
+    if from_block is None:
+        return None
+    return from_block, last_block + 1
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Batched SQLite writer shared by the ingestion databases.
+Rows are written with one prepared INSERT OR IGNORE statement through
+executemany, so duplicates are skipped by SQLite instead of raising one
+IntegrityError per row.
+"""
+
+import sqlite3
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_INSERT_BATCH_SIZE = 5000
+
+
+class BulkWriter:
+    """
+    INSERT OR IGNORE writer for one table.
+
+    Inserted counts come from the cursor rowcount, i.e. SQLite changes() summed
+    over the executemany call, so skipped = rows offered - rows inserted.
+    converters maps column names to functions applied to their values before
+    insert (used for the compact BLOB storage format and for wallet ids). A
+    converter with a bind(conn) method is bound to the connection of each write
+    first. renames maps a column name of the rows to the table column its
+    (converted) value is written to, e.g. from_address -> wallet_id.
+    """
+
+    def __init__(self, table: str, columns: List[str], batch_size: int = DEFAULT_INSERT_BATCH_SIZE,
+                 defaults: Optional[Dict[str, Any]] = None,
+                 converters: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                 renames: Optional[Dict[str, str]] = None):
+        self.table = table
+        self.columns = columns
+        self.batch_size = batch_size
+        self.defaults = defaults or {}
+        self.set_converters(converters)
+        renames = renames or {}
+        self.sql = (f"INSERT OR IGNORE INTO {table} ({', '.join(renames.get(c, c) for c in columns)}) "
+                    f"VALUES ({', '.join('?' for _ in columns)})")
+
+    def set_converters(self, converters: Optional[Dict[str, Callable[[Any], Any]]]):
+        """Replace the per-column converters (None or {} writes values unchanged)."""
+        self.converters = [(i, converters[c]) for i, c in enumerate(self.columns) if converters and c in converters]
+
+    def _convert(self, row: Sequence[Any]) -> Sequence[Any]:
+        row = list(row)
+        for i, convert in self.converters:
+            row[i] = convert(row[i])
+        return row
+
+    def write_rows(self, conn: sqlite3.Connection, rows: Iterable[Sequence[Any]]) -> Tuple[int, int]:
+        """
+        Write row tuples (in column order) in batches of batch_size.
+        Does not commit. Returns (inserted, skipped).
+        """
+        cursor = conn.cursor()
+        rows = iter(rows)
+        for _, convert in self.converters:
+            if hasattr(convert, 'bind'):
+                convert.bind(conn)
+        if self.converters:
+            rows = map(self._convert, rows)
+        inserted = 0
+        total = 0
+
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            cursor.executemany(self.sql, batch)
+            inserted += cursor.rowcount
+            total += len(batch)
+
+        return inserted, total - inserted
+
+    def write_dicts(self, conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]) -> Tuple[int, int]:
+        """Write dict records keyed by column name (missing keys fall back to defaults)."""
+        defaults = self.defaults
+        return self.write_rows(conn, (
+            tuple(record[c] if c in record else defaults[c] for c in self.columns)
+            for record in records
+        ))
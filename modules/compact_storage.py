@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Compact binary storage for hashes and addresses.
+In the optional compact format tx_hash, to_address and wallets.address (what
+from_address resolves to) are stored as 32/20-byte BLOBs instead of
+66/42-character hex TEXT, which roughly halves the rows and the indexes built
+on them.
+The format is recognised from the declared column type, so writers convert
+on insert and readers convert back to '0x' hex only where values leave the
+process (API responses, JSON dumps, console output).
+"""
+
+import sqlite3
+from typing import Any, Callable, Dict, Optional
+
+HEX_COLUMNS = ('tx_hash', 'from_address', 'to_address')
+
+
+def hex_to_blob(value: Any) -> Any:
+    """'0x' hex string -> bytes (other values pass through)."""
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return value
+
+
+def blob_to_hex(value: Any) -> Any:
+    """bytes -> lowercase '0x' hex string (other values, e.g. TEXT-format rows, pass through)."""
+    if isinstance(value, (bytes, memoryview)):
+        return '0x' + bytes(value).hex()
+    return value
+
+
+def is_compact(conn: sqlite3.Connection, table: str, column: str = 'tx_hash') -> bool:
+    """True if column is declared BLOB, i.e. the table uses the compact format."""
+    for row in conn.execute(f"PRAGMA table_info({table})"):
+        if row[1] == column:
+            return row[2].upper() == 'BLOB'
+    return False
+
+
+def compact_converters(conn: sqlite3.Connection, table: str) -> Optional[Dict[str, Callable[[Any], Any]]]:
+    """BulkWriter converters for table: hex -> bytes for the hash columns if it is compact, else None."""
+    if not is_compact(conn, table):
+        return None
+    return {column: hex_to_blob for column in HEX_COLUMNS}
+
+
+def address_param(conn: sqlite3.Connection, address: Any) -> Any:
+    """An address (hex or bytes, e.g. read from another database) in the format of this database's wallets."""
+    if is_compact(conn, 'wallets', 'address'):
+        return hex_to_blob(address)
+    return blob_to_hex(address)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Contract addresses, signatures and table columns shared by the ingestion scripts.
+The row decoders (betting_database.py, lw_betting_db.py, claiming_database.py)
+and the columnar ones (modules/arrow_decode.py) import them from here.
+"""
+
+# Betting: contract addresses and signatures - matching original query exactly
+CONTRACT_ADDRESSES_1 = ['0x3ad50059d6008b711209a509fe58e68f0b672a42', '0x740990cb01e893a371a050736c62ae0b779109e7']
+SIG_HASH_1 = '0x5029defb'
+
+CONTRACT_ADDRESS_2_TX_TO = '0x740990cb01e893a371a050736c62ae0b779109e7'
+CONTRACT_ADDRESS_2_LOG_A = '0xda054a96254776346386060c480b42a10c870cd2'
+CONTRACT_ADDRESS_2_LOG_B = '0x740990cb01e893a371a050736c62ae0b779109e7'
+SIG_HASH_2 = '0xb65c106f'
+TOPIC_0_LOG_A = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+CARDS_LOG_TOPIC_0 = '0xefc52bf7792453af1461fa9a7097486359b41a048898b6d542c0f03389487187'
+
+# Claiming: contract addresses and signatures
+CLAIM_FUNCTION_SIGNATURE = '0xa11fd1e3'
+CLAIM_EVENT_TOPIC = '0x9f930e45e5f186baa9054d3efb58f5f12c8894372119fb461d8abd2b9418cf2d'
+TRANSFER_EVENT_TOPIC = '0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef'
+
+# RBS Contract addresses
+RBS_CONTRACT_ADDRESSES = [
+    '0x3ad50059d6008b711209a509fe58e68f0b672a42',
+    '0x740990cb01e893a371a050736c62ae0b779109e7'
+]
+
+# Token contract addresses
+JERRY_CONTRACT_ADDRESS = '0xda054a96254776346386060c480b42a10c870cd2'
+RBSD_CONTRACT_ADDRESS = '0x8a86d48c867b76FF74A36d3AF4d2F1E707B143eD'
+
+# Columns written by the bulk writers, in insert order
+BETTING_COLUMNS = ['timestamp', 'tx_hash', 'from_address', 'to_address', 'token',
+                   'amount', 'n_cards', 'bet_id', 'block_number']
+CLAIMING_COLUMNS = ['timestamp', 'tx_hash', 'from_address', 'to_address', 'token',
+                    'amount', 'bet_id', 'block_number']
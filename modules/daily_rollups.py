@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Daily rollups of the betting table for the analytics scripts.
+Two tables are kept up to date by ingestion, in the same transaction as the rows:
+    daily_token_stats(day_id, token, n_cards)  submissions, amount, cards
+    daily_wallet_stats(day_id, wallet_id, local_day)
+                                               submissions, mon_amount, jerry_amount, amount, cards
+Totals, period activity and card counts are sums over daily_token_stats, and
+distinct-player counts come from daily_wallet_stats, so analytics cost grows
+with the number of days (and wallet-days) instead of the number of bets.
+local_day is the day number of DATE(timestamp), the local calendar date, so a
+UTC day splits into at most two rows per wallet; it is what active days count.
+
+A third table, maintained the same way, keeps the first bet of every wallet:
+    wallet_first_seen(wallet)                  first_ts, first_day, first_block, first_tx_hash, first_token
+wallet is the wallet_id and first_ts the ts_epoch of that bet, the earliest by
+(ts_epoch, block_number, tx_hash) so ties do not depend on row order. first_day is the
+day number of DATE(timestamp), the calendar date of the bet as stored (local
+time), which is what decides the period a new bettor is counted in; it is
+indexed, so the new bettors of a range of periods are a range scan on it.
+
+Rows are added to the rollups by rowid: rollup_state holds the last rolled-up
+rowid and its tx_hash. If that row changed (e.g. VACUUM renumbered rowids
+after deletions) the rollups are rebuilt from the raw rows. Rows deleted by
+anything other than BettingDatabase.rollback_to_block need a
+rebuild_daily_rollups() call.
+"""
+
+import sqlite3
+from typing import Optional
+
+
+def ensure_daily_rollups(conn: sqlite3.Connection, table: str = 'betting_transactions'):
+    """Create the rollup tables and add rows that are not rolled up yet (the caller commits)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_token_stats (
+            day_id INTEGER NOT NULL,
+            token TEXT NOT NULL,
+            n_cards INTEGER NOT NULL,
+            submissions INTEGER NOT NULL,
+            amount REAL NOT NULL,
+            cards INTEGER NOT NULL,
+            PRIMARY KEY (day_id, token, n_cards)
+        )
+    """)
+    wallet_stats_columns = [row[1] for row in conn.execute("PRAGMA table_info(daily_wallet_stats)")]
+    if wallet_stats_columns and 'local_day' not in wallet_stats_columns:
+        # Created before local_day existed: refilled below like a new table
+        conn.execute("DROP TABLE daily_wallet_stats")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS daily_wallet_stats (
+            day_id INTEGER NOT NULL,
+            wallet_id INTEGER NOT NULL,
+            local_day INTEGER NOT NULL,
+            submissions INTEGER NOT NULL,
+            mon_amount REAL NOT NULL,
+            jerry_amount REAL NOT NULL,
+            amount REAL NOT NULL,
+            cards INTEGER NOT NULL,
+            PRIMARY KEY (day_id, wallet_id, local_day)
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_daily_wallet_stats_wallet ON daily_wallet_stats(wallet_id, day_id)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            table_name TEXT PRIMARY KEY,
+            last_rowid INTEGER NOT NULL,
+            last_tx_hash BLOB
+        )
+    """)
+    first_seen_columns = [row[1] for row in conn.execute("PRAGMA table_info(wallet_first_seen)")]
+    if first_seen_columns and 'first_tx_hash' not in first_seen_columns:
+        # Created before first_day / first_tx_hash existed: refilled below like a new table
+        conn.execute("DROP TABLE wallet_first_seen")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS wallet_first_seen (
+            wallet INTEGER PRIMARY KEY,
+            first_ts INTEGER NOT NULL,
+            first_day INTEGER NOT NULL,
+            first_block INTEGER NOT NULL,
+            first_tx_hash BLOB NOT NULL,
+            first_token TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_wallet_first_seen_day ON wallet_first_seen(first_day)")
+    # Tables created since the rollups last ran: fill them from the rows rolled up so far
+    state = conn.execute("SELECT last_rowid FROM rollup_state WHERE table_name = ?", (table,)).fetchone()
+    if state and state[0]:
+        if 'local_day' not in wallet_stats_columns:
+            _add_wallet_stats(conn, table, "rowid <= ?", (state[0],))
+        if 'first_tx_hash' not in first_seen_columns:
+            _add_first_seen(conn, table, "rowid <= ?", (state[0],))
+    update_daily_rollups(conn, table)
+
+
+def _add_first_seen(conn: sqlite3.Connection, table: str, where: str, params: tuple):
+    """Upsert the earliest bet per wallet among the rows of table matching where."""
+    # Earliest by ts_epoch, then block_number and tx_hash, so ties resolve the same way
+    # whatever the row order; an existing entry is only replaced by an earlier bet
+    conn.execute(f"""
+        INSERT INTO wallet_first_seen (wallet, first_ts, first_day, first_block, first_tx_hash, first_token)
+        SELECT wallet_id, ts_epoch, CAST(strftime('%s', DATE(timestamp)) AS INTEGER) / 86400, block_number, tx_hash, token
+        FROM (
+            SELECT wallet_id, ts_epoch, timestamp, block_number, tx_hash, token,
+                   ROW_NUMBER() OVER (PARTITION BY wallet_id ORDER BY ts_epoch, block_number, tx_hash) as position
+            FROM {table}
+            WHERE {where} AND ts_epoch IS NOT NULL AND wallet_id IS NOT NULL
+        )
+        WHERE position = 1
+        ON CONFLICT (wallet) DO UPDATE SET
+            first_ts = excluded.first_ts,
+            first_day = excluded.first_day,
+            first_block = excluded.first_block,
+            first_tx_hash = excluded.first_tx_hash,
+            first_token = excluded.first_token
+        WHERE (excluded.first_ts, excluded.first_block, excluded.first_tx_hash)
+            < (wallet_first_seen.first_ts, wallet_first_seen.first_block, wallet_first_seen.first_tx_hash)
+    """, params)
+
+
+def _add_wallet_stats(conn: sqlite3.Connection, table: str, where: str, params: tuple):
+    """Add the rows of table matching where to daily_wallet_stats."""
+    conn.execute(f"""
+        INSERT INTO daily_wallet_stats (day_id, wallet_id, local_day, submissions, mon_amount, jerry_amount, amount, cards)
+        SELECT day_id, wallet_id, CAST(strftime('%s', DATE(timestamp)) AS INTEGER) / 86400, COUNT(*),
+               SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END),
+               SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END),
+               SUM(amount), SUM(n_cards)
+        FROM {table}
+        WHERE {where} AND day_id IS NOT NULL
+        GROUP BY day_id, wallet_id, DATE(timestamp)
+        ON CONFLICT (day_id, wallet_id, local_day) DO UPDATE SET
+            submissions = submissions + excluded.submissions,
+            mon_amount = mon_amount + excluded.mon_amount,
+            jerry_amount = jerry_amount + excluded.jerry_amount,
+            amount = amount + excluded.amount,
+            cards = cards + excluded.cards
+    """, params)
+
+
+def _add_rows(conn: sqlite3.Connection, table: str, where: str, params: tuple):
+    """Add the rows of table matching where to the rollups."""
+    conn.execute(f"""
+        INSERT INTO daily_token_stats (day_id, token, n_cards, submissions, amount, cards)
+        SELECT day_id, token, n_cards, COUNT(*), SUM(amount), SUM(n_cards)
+        FROM {table}
+        WHERE {where} AND day_id IS NOT NULL
+        GROUP BY day_id, token, n_cards
+        ON CONFLICT (day_id, token, n_cards) DO UPDATE SET
+            submissions = submissions + excluded.submissions,
+            amount = amount + excluded.amount,
+            cards = cards + excluded.cards
+    """, params)
+    _add_wallet_stats(conn, table, where, params)
+    _add_first_seen(conn, table, where, params)
+
+
+def _save_state(conn: sqlite3.Connection, table: str):
+    """Mark every current row of table as rolled up."""
+    last = conn.execute(f"SELECT rowid, tx_hash FROM {table} ORDER BY rowid DESC LIMIT 1").fetchone() or (0, None)
+    conn.execute("INSERT OR REPLACE INTO rollup_state (table_name, last_rowid, last_tx_hash) VALUES (?, ?, ?)",
+                 (table, last[0], last[1]))
+
+
+def update_daily_rollups(conn: sqlite3.Connection, table: str = 'betting_transactions') -> bool:
+    """
+    Add rows inserted since the last call to the rollups (the caller commits).
+    Call it after wallet_id and day_id are assigned. Only the days of the new
+    rows are touched. Returns False if nothing was new.
+    """
+    state = conn.execute("SELECT last_rowid, last_tx_hash FROM rollup_state WHERE table_name = ?", (table,)).fetchone()
+    if state and state[0]:
+        marker = conn.execute(f"SELECT tx_hash FROM {table} WHERE rowid = ?", (state[0],)).fetchone()
+        if marker is None or marker[0] != state[1]:
+            print(f"Rowids of {table} changed, rebuilding daily rollups...")
+            rebuild_daily_rollups(conn, table)
+            return True
+
+    last_rowid = state[0] if state else 0
+    max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0]
+    if max_rowid is None or max_rowid <= last_rowid:
+        return False
+    _add_rows(conn, table, "rowid > ? AND rowid <= ?", (last_rowid, max_rowid))
+    _save_state(conn, table)
+    return True
+
+
+def rebuild_daily_rollups(conn: sqlite3.Connection, table: str = 'betting_transactions', from_day: Optional[int] = None):
+    """
+    Recompute the rollups of days >= from_day (all days if None) from the raw
+    rows, e.g. after rows were deleted by a reorg rollback (the caller commits).
+    """
+    if from_day is None:
+        conn.execute("DELETE FROM daily_token_stats")
+        conn.execute("DELETE FROM daily_wallet_stats")
+        conn.execute("DELETE FROM wallet_first_seen")
+        _add_rows(conn, table, "1 = 1", ())
+    else:
+        # Roll up pending rows of earlier days first, the state below covers every row
+        state = conn.execute("SELECT last_rowid FROM rollup_state WHERE table_name = ?", (table,)).fetchone()
+        _add_rows(conn, table, "rowid > ? AND day_id < ?", (state[0] if state else 0, from_day))
+        conn.execute("DELETE FROM daily_token_stats WHERE day_id >= ?", (from_day,))
+        conn.execute("DELETE FROM daily_wallet_stats WHERE day_id >= ?", (from_day,))
+        # Wallets first seen on those days have no earlier rows, the re-added rows restore them
+        conn.execute("DELETE FROM wallet_first_seen WHERE first_ts >= ?", (from_day * 86400,))
+        _add_rows(conn, table, "day_id >= ?", (from_day,))
+    _save_state(conn, table)
+
+
+def token_stats_source(since_timestamp: Optional[str] = None, table: str = 'betting_transactions') -> str:
+    """
+    FROM-clause source with the daily_token_stats columns: the rollup itself,
+    or the same aggregation over raw rows newer than since_timestamp.
+    """
+    if not since_timestamp:
+        return "daily_token_stats"
+    return f"""(
+        SELECT day_id, token, n_cards, COUNT(*) as submissions, SUM(amount) as amount, SUM(n_cards) as cards
+        FROM {table}
+        WHERE timestamp > '{since_timestamp}' AND day_id IS NOT NULL
+        GROUP BY day_id, token, n_cards
+    )"""
+
+
+def wallet_stats_source(since_timestamp: Optional[str] = None, table: str = 'betting_transactions') -> str:
+    """Like token_stats_source, for daily_wallet_stats."""
+    if not since_timestamp:
+        return "daily_wallet_stats"
+    return f"""(
+        SELECT day_id, wallet_id, CAST(strftime('%s', DATE(timestamp)) AS INTEGER) / 86400 as local_day,
+               COUNT(*) as submissions,
+               SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as mon_amount,
+               SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END) as jerry_amount,
+               SUM(amount) as amount, SUM(n_cards) as cards
+        FROM {table}
+        WHERE timestamp > '{since_timestamp}' AND day_id IS NOT NULL
+        GROUP BY day_id, wallet_id, DATE(timestamp)
+    )"""
@@ -9,11 +9,12 @@ import os
 import pandas as pd
 from datetime import datetime
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from hypersync import HypersyncClient, ClientConfig, TransactionSelection, LogSelection, FieldSelection, Query
 from hypersync import LogField, TransactionField
 from database import get_db_instance
+from response_index import build_response_index
 
 # --- Configuration ---
 load_dotenv()
@@ -62,10 +63,14 @@ def calculate_cards_in_slip_from_tx(tx_input: str) -> int:
         return 0
 
 
-def calculate_user_engagement_metrics(all_tx_data: List[Dict[str, Any]]) -> pd.DataFrame:
+def calculate_user_engagement_metrics(all_tx_data: List[Dict[str, Any]], first_seen: Optional[pd.DataFrame] = None) -> pd.DataFrame:
     """
     Calculates user engagement metrics including new users and active users per hour.
     
+    Args:
+        first_seen: Optional first transaction time per address (origin_from_address,
+            first_tx_time), e.g. db.get_wallet_first_seen(); computed from all_tx_data if omitted
+    
     Returns:
         DataFrame with columns: time, new_users, active_users, cumulative_new_users
     """
@@ -79,7 +84,10 @@ def calculate_user_engagement_metrics(all_tx_data: List[Dict[str, Any]]) -> pd.D
     df['time'] = df['block_timestamp'].dt.floor('H')
     
     # Find first interaction date for each address
-    first_interaction = df.groupby('origin_from_address')['block_timestamp'].min().reset_index()
+    if first_seen is not None:
+        first_interaction = first_seen.rename(columns={'first_tx_time': 'block_timestamp'})
+    else:
+        first_interaction = df.groupby('origin_from_address')['block_timestamp'].min().reset_index()
     first_interaction['time'] = first_interaction['block_timestamp'].dt.floor('H')
     
     # Calculate active users per hour (distinct addresses)
@@ -138,6 +146,7 @@ async def fetch_data_part1(client: HypersyncClient, start_block: int, end_block:
                 b.number: hex_to_int(b.timestamp)
                 for b in response.data.blocks if b.number and b.timestamp
             }
+            index = build_response_index(response)
 
             for tx in response.data.transactions:
                 if tx.status != 1:
@@ -150,11 +159,9 @@ async def fetch_data_part1(client: HypersyncClient, start_block: int, end_block:
                 cards_in_slip = calculate_cards_in_slip_from_tx(tx.input)
 
                 bet_id_decoded = 0
-                if response.data.logs:
-                    for log in response.data.logs:
-                        if log.transaction_hash == tx.hash and len(log.topics) >= 3:
-                            bet_id_decoded = hex_to_int(log.topics[2])
-                            break
+                bet_log = next((log for log in index.logs_for(tx.hash) if len(log.topics) >= 3), None)
+                if bet_log:
+                    bet_id_decoded = hex_to_int(bet_log.topics[2])
                 
                 all_tx_data.append({
                     "bet_amt": hex_to_int(tx.value) / 1e18,
@@ -222,18 +229,14 @@ async def fetch_data_part2(client: HypersyncClient, start_block: int, end_block:
                 for b in response.data.blocks if b.number and b.timestamp
             }
 
-            logs_by_tx_hash = {}
-            for log in response.data.logs:
-                if log.transaction_hash not in logs_by_tx_hash:
-                    logs_by_tx_hash[log.transaction_hash] = []
-                logs_by_tx_hash[log.transaction_hash].append(log)
+            index = build_response_index(response)
 
-            for tx_hash, tx_logs in logs_by_tx_hash.items():
-                has_jerry_log = any(log.address.lower() == CONTRACT_ADDRESS_2_LOG_A.lower() for log in tx_logs)
-                has_rarebet_log = any(log.address.lower() == CONTRACT_ADDRESS_2_LOG_B.lower() for log in tx_logs)
+            for tx_hash in index.logs_by_tx:
+                has_jerry_log = index.has_log(tx_hash, address=CONTRACT_ADDRESS_2_LOG_A)
+                has_rarebet_log = index.has_log(tx_hash, address=CONTRACT_ADDRESS_2_LOG_B)
                 
                 if has_jerry_log and has_rarebet_log:
-                    tx = next((t for t in response.data.transactions if t.hash == tx_hash), None)
+                    tx = index.get_transaction(tx_hash)
                     if not tx or tx.status != 1:
                         continue
                     
@@ -244,13 +247,9 @@ async def fetch_data_part2(client: HypersyncClient, start_block: int, end_block:
                     if not timestamp:
                         continue
                     
-                    jerry_log = next((log for log in tx_logs if log.address.lower() == CONTRACT_ADDRESS_2_LOG_A.lower()), None)
+                    jerry_log = index.first_log(tx_hash, address=CONTRACT_ADDRESS_2_LOG_A)
                     
-                    card_event_log = next((
-                        log for log in tx_logs
-                        if log.address.lower() == CONTRACT_ADDRESS_2_LOG_B.lower()
-                        and log.topics and log.topics[0] and log.topics[0].lower() == CARDS_LOG_TOPIC_0.lower()
-                    ), None)
+                    card_event_log = index.first_log(tx_hash, CONTRACT_ADDRESS_2_LOG_B, CARDS_LOG_TOPIC_0)
 
                     cards_in_slip = 0
                     bet_id_decoded = 0
@@ -354,7 +353,7 @@ def calculate_and_store_hourly_metrics(db):
     df['jerry_volume'] = df['bet_amt'].where(df['betting_token'] == 'Jerry', 0)
     
     # Calculate user engagement metrics
-    user_metrics = calculate_user_engagement_metrics(df.to_dict('records'))
+    user_metrics = calculate_user_engagement_metrics(df.to_dict('records'), db.get_wallet_first_seen())
     
     # Basic hourly aggregation
     hourly_agg = df.groupby('time').agg(
@@ -5,6 +5,8 @@ from typing import List, Dict, Any, Optional
 from contextlib import contextmanager
 import os
 
+from bulk_writer import BulkWriter, DEFAULT_INSERT_BATCH_SIZE
+
 
 class BettingAnalyticsDB:
     """
@@ -12,8 +14,15 @@ class BettingAnalyticsDB:
     Handles transactions, user engagement metrics, and checkpoints.
     """
     
-    def __init__(self, db_path: str = "betting_analytics.db"):
+    def __init__(self, db_path: str = "betting_analytics.db", insert_batch_size: int = DEFAULT_INSERT_BATCH_SIZE):
         self.db_path = db_path
+        self.writer = BulkWriter(
+            "transactions",
+            ['tx_hash', 'origin_from_address', 'bet_amt', 'betting_token',
+             'cards_in_slip', 'bet_id_decoded', 'block_number', 'block_timestamp'],
+            insert_batch_size,
+            defaults={'block_number': 0}
+        )
         self.init_database()
     
     def init_database(self):
@@ -57,6 +66,31 @@ class BettingAnalyticsDB:
                 ON transactions(block_number)
             """)
             
+            # First transaction of every address, kept up to date by insert_transactions
+            first_seen_columns = [row[1] for row in cursor.execute("PRAGMA table_info(wallet_first_seen)")]
+            if first_seen_columns and 'first_tx_hash' not in first_seen_columns:
+                # Created before first_tx_hash existed: refilled below like a new table
+                cursor.execute("DROP TABLE wallet_first_seen")
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS wallet_first_seen (
+                    wallet TEXT PRIMARY KEY,
+                    first_ts INTEGER NOT NULL,
+                    first_block INTEGER NOT NULL,
+                    first_tx_hash TEXT NOT NULL,
+                    first_token TEXT NOT NULL
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_wallet_first_seen_ts 
+                ON wallet_first_seen(first_ts)
+            """)
+            
+            # Fill it once for databases created before the table existed
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM wallet_first_seen)")
+            if not cursor.fetchone()[0]:
+                self._update_wallet_first_seen(conn, 0)
+            
             # Create hourly metrics table for pre-computed aggregations
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS hourly_metrics (
@@ -135,35 +169,57 @@ class BettingAnalyticsDB:
             return 0
         
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            inserted_count = 0
-            
-            for tx in transactions:
-                try:
-                    cursor.execute("""
-                        INSERT INTO transactions 
-                        (tx_hash, origin_from_address, bet_amt, betting_token, 
-                         cards_in_slip, bet_id_decoded, block_number, block_timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        tx['tx_hash'],
-                        tx['origin_from_address'],
-                        tx['bet_amt'],
-                        tx['betting_token'],
-                        tx['cards_in_slip'],
-                        tx['bet_id_decoded'],
-                        tx.get('block_number', 0),
-                        tx['block_timestamp']
-                    ))
-                    inserted_count += 1
-                except sqlite3.IntegrityError:
-                    # Transaction already exists, skip it
-                    continue
-            
+            last_rowid = conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM transactions").fetchone()[0]
+            inserted_count, skipped_count = self.writer.write_dicts(conn, transactions)
+            self._update_wallet_first_seen(conn, last_rowid)
             conn.commit()
-            print(f"Inserted {inserted_count} new transactions (skipped {len(transactions) - inserted_count} duplicates)")
+            print(f"Inserted {inserted_count} new transactions (skipped {skipped_count} duplicates)")
             return inserted_count
     
+    def _update_wallet_first_seen(self, conn: sqlite3.Connection, after_rowid: int):
+        """Upsert the first transaction per address among rows after after_rowid (the caller commits)."""
+        # first_ts is block_timestamp read as UTC, so it converts back to the same naive datetime.
+        # Ties on the timestamp go to the lowest block_number, then tx_hash, whatever the row order.
+        conn.execute("""
+            INSERT INTO wallet_first_seen (wallet, first_ts, first_block, first_tx_hash, first_token)
+            SELECT origin_from_address, first_ts, block_number, tx_hash, betting_token
+            FROM (
+                SELECT origin_from_address, CAST(strftime('%s', block_timestamp) AS INTEGER) as first_ts,
+                       block_number, tx_hash, betting_token,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY origin_from_address
+                           ORDER BY CAST(strftime('%s', block_timestamp) AS INTEGER), block_number, tx_hash
+                       ) as position
+                FROM transactions
+                WHERE rowid > ? AND block_timestamp IS NOT NULL
+            )
+            WHERE position = 1
+            ON CONFLICT (wallet) DO UPDATE SET
+                first_ts = excluded.first_ts,
+                first_block = excluded.first_block,
+                first_tx_hash = excluded.first_tx_hash,
+                first_token = excluded.first_token
+            WHERE (excluded.first_ts, excluded.first_block, excluded.first_tx_hash)
+                < (wallet_first_seen.first_ts, wallet_first_seen.first_block, wallet_first_seen.first_tx_hash)
+        """, (after_rowid,))
+    
+    def get_wallet_first_seen(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        First transaction time of every address (origin_from_address, first_tx_time),
+        optionally only those between start_date and end_date (a range scan on first_ts).
+        """
+        query = "SELECT wallet AS origin_from_address, first_ts FROM wallet_first_seen"
+        params = []
+        if start_date and end_date:
+            query += """
+                WHERE first_ts BETWEEN CAST(strftime('%s', ?) AS INTEGER) AND CAST(strftime('%s', ?) AS INTEGER)
+            """
+            params = [str(start_date), str(end_date)]
+        with self.get_connection() as conn:
+            df = pd.read_sql_query(query, conn, params=params)
+        df['first_tx_time'] = pd.to_datetime(df.pop('first_ts'), unit='s')
+        return df
+    
     def get_transactions_since_block(self, block_number: int) -> List[Dict[str, Any]]:
         """Get all transactions since a specific block number."""
         with self.get_connection() as conn:
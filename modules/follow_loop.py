@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Long-running follow mode that tails the chain head.
+One HypersyncClient stays open; get_height() is polled every few seconds and
+each ingest step is run up to the new height, so new blocks land within
+seconds instead of on the next cron run.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+DEFAULT_POLL_INTERVAL = 2.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class StopFollowing(Exception):
+    """Raised by a step when retrying cannot help and follow mode has to end."""
+
+
+async def follow_chain(client, steps: Dict[str, Callable[[int], Awaitable[int]]],
+                       poll_interval: float = DEFAULT_POLL_INTERVAL, max_polls: Optional[int] = None) -> int:
+    """
+    Poll client.get_height() and call every step(height) when the head moves.
+
+    Each step ingests from its own checkpoint up to height (exclusive) and
+    returns the rows it inserted. Errors are logged and retried with
+    exponential backoff instead of ending the loop; since every batch commits
+    together with its checkpoint, a retry resumes where the failed step stopped.
+    StopFollowing is the exception: it ends the loop and propagates.
+    Runs until interrupted, or for max_polls polls. Returns the rows inserted.
+    """
+    print(f"Following chain head (polling every {poll_interval}s, Ctrl+C to stop)")
+    last_height = None
+    failures = 0
+    polls = 0
+    total_inserted = 0
+
+    while max_polls is None or polls < max_polls:
+        polls += 1
+        try:
+            height = await client.get_height()
+            if last_height is None or height > last_height:
+                for name, step in steps.items():
+                    start = time.time()
+                    inserted = await step(height)
+                    total_inserted += inserted
+                    if inserted:
+                        print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {name}: +{inserted} rows "
+                              f"up to block {height} ({time.time() - start:.2f}s)")
+                last_height = height
+            failures = 0
+            delay = poll_interval
+        except StopFollowing:
+            raise
+        except Exception as e:
+            failures += 1
+            delay = min(MAX_BACKOFF_SECONDS, poll_interval * 2 ** failures)
+            print(f"Follow error ({failures} in a row): {e}; retrying in {delay:.0f}s")
+
+        if max_polls is None or polls < max_polls:
+            await asyncio.sleep(delay)
+
+    return total_inserted
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Prometheus-format ingestion metrics.
+An IngestMetrics object collects, per ingestion job:
+    - blocks scanned, response rows and Arrow bytes received (per source)
+    - per-request latency histograms (per source)
+    - rows decoded and inserted
+    - the checkpoint, the chain height from get_height() and the lag between them
+plus blocks/s and rows/s over the last RATE_WINDOW_SECONDS. They are exported
+in the Prometheus text format to a file (for node_exporter's textfile
+collector, rewritten atomically) and/or served at http://<host>:<port>/metrics.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from modules.adaptive_pager import response_size
+
+METRIC_PREFIX = "rbs_ingest"
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_WINDOW_SECONDS = 60.0
+# The metrics file is rewritten at most this often (and always on close)
+MIN_EXPORT_INTERVAL = 1.0
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+
+class _Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+
+class IngestMetrics:
+    """
+    Metrics of one ingestion job (e.g. "betting").
+
+    Usage:
+        metrics = IngestMetrics("betting", metrics_file="data/metrics/betting.prom", port=9101)
+        metrics.observe_response("bets", from_block, next_block, response, seconds)
+        metrics.observe_write(decoded_rows, inserted_rows, checkpoint)
+        metrics.set_height(await client.get_height())
+        metrics.close()
+    """
+
+    def __init__(self, job: str, metrics_file: Optional[str] = None, port: Optional[int] = None):
+        self.job = job
+        self.metrics_file = metrics_file
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+        self.blocks_scanned: Dict[str, int] = {}
+        self.response_rows: Dict[str, int] = {}
+        self.response_bytes: Dict[str, int] = {}
+        self.latency: Dict[str, _Histogram] = {}
+        self.rows_decoded = 0
+        self.rows_inserted = 0
+        self.checkpoint: Optional[int] = None
+        self.height: Optional[int] = None
+        self.last_write: Optional[float] = None
+
+        # (time, blocks, decoded, inserted) totals for the windowed rates
+        self.samples = deque([(self.started, 0, 0, 0)])
+        self.last_export = 0.0
+
+        self.server = None
+        if port is not None:
+            self.start_server(port)
+
+    # -- recording -----------------------------------------------------------
+
+    def observe_response(self, source: str, from_block: int, next_block: Optional[int], response, seconds: float):
+        """Record one Hypersync response for source covering [from_block, next_block)."""
+        size = response_size(response)
+        with self.lock:
+            if next_block and next_block > from_block:
+                self.blocks_scanned[source] = self.blocks_scanned.get(source, 0) + next_block - from_block
+            self.response_rows[source] = self.response_rows.get(source, 0) + size["rows"]
+            self.response_bytes[source] = self.response_bytes.get(source, 0) + size["bytes"]
+            self.latency.setdefault(source, _Histogram()).observe(seconds)
+            self._sample()
+
+    def observe_write(self, decoded: int, inserted: int, checkpoint: Optional[int] = None):
+        """Record a written batch: rows offered, rows actually inserted and the checkpoint it committed."""
+        with self.lock:
+            self.rows_decoded += decoded
+            self.rows_inserted += inserted
+            if checkpoint is not None:
+                self.checkpoint = checkpoint
+            self.last_write = time.time()
+            self._sample()
+        self.export()
+
+    def set_checkpoint(self, block_number: int):
+        with self.lock:
+            self.checkpoint = block_number
+        self.export()
+
+    def set_height(self, height: int):
+        with self.lock:
+            self.height = height
+        self.export()
+
+    def _sample(self):
+        now = time.time()
+        self.samples.append((now, sum(self.blocks_scanned.values()), self.rows_decoded, self.rows_inserted))
+        while len(self.samples) > 2 and self.samples[1][0] < now - RATE_WINDOW_SECONDS:
+            self.samples.popleft()
+
+    def _rates(self) -> List[float]:
+        """blocks/s, decoded rows/s and inserted rows/s over the rate window."""
+        now = time.time()
+        # Totals as of the start of the window (the newest sample at or before it)
+        anchor = self.samples[0]
+        for sample in self.samples:
+            if sample[0] > now - RATE_WINDOW_SECONDS:
+                break
+            anchor = sample
+        last = self.samples[-1]
+        elapsed = now - anchor[0]
+        if elapsed <= 0:
+            return [0.0, 0.0, 0.0]
+        return [(last[i] - anchor[i]) / elapsed for i in (1, 2, 3)]
+
+    # -- export --------------------------------------------------------------
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        job = f'job="{self.job}"'
+
+        def metric(name: str, kind: str, help_text: str, samples: List[tuple]):
+            lines.append(f"# HELP {METRIC_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{METRIC_PREFIX}_{name}{{{labels}}} {value}")
+
+        with self.lock:
+            sources = sorted(self.latency)
+            label = {source: f'{job},source="{source}"' for source in sources}
+            blocks_rate, decoded_rate, inserted_rate = self._rates()
+
+            metric("blocks_scanned_total", "counter", "Blocks covered by Hypersync responses.",
+                   [(label[s], self.blocks_scanned.get(s, 0)) for s in sources])
+            metric("response_rows_total", "counter", "Blocks, transactions and logs received.",
+                   [(label[s], self.response_rows.get(s, 0)) for s in sources])
+            metric("response_bytes_total", "counter", "Bytes of response data received (Arrow responses only).",
+                   [(label[s], self.response_bytes.get(s, 0)) for s in sources])
+
+            lines.append(f"# HELP {METRIC_PREFIX}_request_seconds Hypersync request latency.")
+            lines.append(f"# TYPE {METRIC_PREFIX}_request_seconds histogram")
+            for source in sources:
+                histogram = self.latency[source]
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f'{METRIC_PREFIX}_request_seconds_bucket{{{label[source]},le="{bound}"}} {count}')
+                lines.append(f'{METRIC_PREFIX}_request_seconds_bucket{{{label[source]},le="+Inf"}} {histogram.count}')
+                lines.append(f"{METRIC_PREFIX}_request_seconds_sum{{{label[source]}}} {histogram.sum:.6f}")
+                lines.append(f"{METRIC_PREFIX}_request_seconds_count{{{label[source]}}} {histogram.count}")
+
+            metric("rows_decoded_total", "counter", "Rows decoded and offered to the database.", [(job, self.rows_decoded)])
+            metric("rows_inserted_total", "counter", "Rows inserted (duplicates excluded).", [(job, self.rows_inserted)])
+            metric("blocks_per_second", "gauge", f"Blocks scanned per second over the last {RATE_WINDOW_SECONDS:.0f}s.",
+                   [(job, f"{blocks_rate:.3f}")])
+            metric("rows_decoded_per_second", "gauge", f"Rows decoded per second over the last {RATE_WINDOW_SECONDS:.0f}s.",
+                   [(job, f"{decoded_rate:.3f}")])
+            metric("rows_inserted_per_second", "gauge", f"Rows inserted per second over the last {RATE_WINDOW_SECONDS:.0f}s.",
+                   [(job, f"{inserted_rate:.3f}")])
+
+            if self.checkpoint is not None:
+                metric("checkpoint_block", "gauge", "Block below which everything is stored.", [(job, self.checkpoint)])
+            if self.height is not None:
+                metric("chain_height", "gauge", "Chain height reported by get_height().", [(job, self.height)])
+            if self.checkpoint is not None and self.height is not None:
+                metric("lag_blocks", "gauge", "Blocks between the checkpoint and the chain height.",
+                       [(job, max(0, self.height - self.checkpoint))])
+            if self.last_write is not None:
+                metric("last_write_timestamp_seconds", "gauge", "Unix time of the last committed batch.",
+                       [(job, f"{self.last_write:.3f}")])
+            metric("start_timestamp_seconds", "gauge", "Unix time the ingestion process started.",
+                   [(job, f"{self.started:.3f}")])
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, force: bool = False):
+        """Rewrite the metrics file (atomically, so a collector never reads half a file)."""
+        if not self.metrics_file:
+            return
+        now = time.time()
+        if not force and now - self.last_export < MIN_EXPORT_INTERVAL:
+            return
+        self.last_export = now
+        directory = os.path.dirname(self.metrics_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.metrics_file}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(self.render())
+        os.replace(tmp_path, self.metrics_file)
+
+    def start_server(self, port: int, host: str = METRICS_HOST):
+        """Serve /metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep scrapes out of the ingestion log
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"Serving {self.job} metrics at http://{host}:{self.server.server_address[1]}/metrics")
+
+    def close(self):
+        """Write the final metrics file and stop the HTTP server."""
+        self.export(force=True)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
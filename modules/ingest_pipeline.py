@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Bounded producer/consumer pipeline from Hypersync fetch to SQLite insert.
+Fetchers push decoded batches into a bounded asyncio queue and a single writer
+commits them as they arrive, so memory use does not grow with the block range.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+DEFAULT_QUEUE_SIZE = 8
+
+_DONE = object()
+
+
+async def iter_batches(client, build_query, decode, label: str, start_block: int, end_block: int,
+                       window: int = 10000, stream_config=None, use_arrow: bool = False,
+                       pager=None, metrics=None) -> AsyncIterator[Tuple[Any, int]]:
+    """
+    Yield (decoded_batch, next_block) for every Hypersync response in [start_block, end_block).
+
+    next_block is the block the response covered up to (exclusive), so once a
+    batch is written everything below next_block for this source is stored.
+    Uses client.stream()/stream_arrow() when stream_config is given, otherwise
+    get()/get_arrow() over pages sized by `pager` (an AdaptivePager from
+    modules/adaptive_pager.py), or fixed `window`-block pages without one.
+    Every response is recorded in `metrics` (an IngestMetrics from
+    modules/ingest_metrics.py) when given; for streams the latency is the
+    time spent waiting for the next response.
+    """
+    if stream_config is not None:
+        print(f"Streaming {label} transactions from {start_block} to {end_block} "
+              f"(concurrency={stream_config.concurrency})...")
+        open_stream = client.stream_arrow if use_arrow else client.stream
+        receiver = await open_stream(build_query(start_block, end_block), stream_config)
+        current_block = start_block
+        try:
+            while True:
+                request_start = time.perf_counter()
+                response = await receiver.recv()
+                # Exit if the stream finished
+                if response is None:
+                    break
+                if metrics:
+                    metrics.observe_response(label, current_block, response.next_block, response,
+                                             time.perf_counter() - request_start)
+                    current_block = max(current_block, response.next_block or current_block)
+                yield decode(response.data if use_arrow else response), response.next_block
+        finally:
+            # Always close the receiver so it stops loading data in the background
+            await receiver.close()
+        return
+
+    print(f"Fetching {label} transactions from {start_block} to {end_block}...")
+    fetch = client.get_arrow if use_arrow else client.get
+    current_block = start_block
+    while current_block < end_block:
+        to_block = pager.request_range(current_block, end_block) if pager else min(current_block + window, end_block)
+        print(f"  {label}: processing blocks {current_block} to {to_block}...")
+        request_start = time.perf_counter()
+        response = await fetch(build_query(current_block, to_block))
+        if metrics:
+            metrics.observe_response(label, current_block, response.next_block, response,
+                                     time.perf_counter() - request_start)
+
+        if pager:
+            current_block = pager.observe(current_block, to_block, response, time.perf_counter() - request_start)
+        elif response.next_block and response.next_block > current_block:
+            current_block = response.next_block
+        else:
+            current_block += window
+
+        yield decode(response.data if use_arrow else response), min(current_block, end_block)
+
+    if pager:
+        print(f"  {pager.summary()}")
+
+
+async def run_pipeline(sources: Dict[str, AsyncIterator[Tuple[Any, int]]],
+                       write_batch: Callable[[Any, Optional[int]], int],
+                       start_block: int, queue_size: int = DEFAULT_QUEUE_SIZE) -> int:
+    """
+    Run one producer task per source and write batches as they are dequeued.
+
+    write_batch(batch, checkpoint) is called in a worker thread for every batch.
+    checkpoint is the lowest next_block reached by all sources (everything
+    below it is stored once the batch is written), or None if it did not move.
+    Producers block once queue_size batches are waiting, which bounds memory.
+    Returns the total of write_batch's return values.
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    watermarks = {name: start_block for name in sources}
+
+    async def produce(name: str, batches: AsyncIterator[Tuple[Any, int]]):
+        try:
+            async for batch, next_block in batches:
+                await queue.put((name, batch, next_block))
+        finally:
+            await queue.put((name, _DONE, None))
+
+    tasks = [asyncio.create_task(produce(name, batches)) for name, batches in sources.items()]
+    checkpoint = start_block
+    written = 0
+    remaining = len(tasks)
+
+    try:
+        while remaining:
+            name, batch, next_block = await queue.get()
+            if batch is _DONE:
+                remaining -= 1
+                continue
+
+            watermarks[name] = max(watermarks[name], next_block)
+            new_checkpoint = min(watermarks.values())
+            written += await asyncio.to_thread(
+                write_batch, batch, new_checkpoint if new_checkpoint > checkpoint else None
+            )
+            checkpoint = max(checkpoint, new_checkpoint)
+
+        # Surface fetch errors (the checkpoint never passes a failed source)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    return written
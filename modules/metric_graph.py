@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Metric graph executor for analytics generation.
+Each metric is a named function that declares the metrics it takes as
+inputs. A run computes every metric exactly once, in dependency order, on a
+thread pool: metrics whose inputs are ready run concurrently, each worker
+thread on its own connection from open_analytics (read-only SQLite
+connections release the GIL while a query runs, so independent queries
+overlap). Per-metric timings are kept for the report.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class MetricGraph:
+    """
+    Usage:
+        graph = MetricGraph()
+        graph.add("total_metrics", lambda analytics: analytics.get_total_metrics())
+        graph.add("summary", lambda analytics, total_metrics: {...}, inputs=["total_metrics"])
+        results = graph.run(lambda: FlexibleAnalytics(db_path, read_only=True), workers=4)
+        graph.print_timings()
+
+    compute is called as compute(analytics, **inputs) with the thread's
+    analytics object (already entered) and the results of its inputs.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Callable[..., Any]] = {}
+        self.inputs: Dict[str, List[str]] = {}
+        self.timings: Dict[str, float] = {}
+        self.wall_seconds = 0.0
+        self.workers = 0
+
+    def add(self, name: str, compute: Callable[..., Any], inputs: Sequence[str] = ()):
+        if name in self.metrics:
+            raise ValueError(f"Metric {name} is already defined")
+        self.metrics[name] = compute
+        self.inputs[name] = list(inputs)
+
+    def _order(self, targets: Optional[Sequence[str]]) -> List[str]:
+        """Metrics needed for targets (all if None) in dependency order; rejects unknown inputs and cycles."""
+        order: List[str] = []
+        state: Dict[str, str] = {}
+
+        def visit(name: str, path: List[str]):
+            if name not in self.metrics:
+                raise ValueError(f"Unknown metric {name}" + (f" (input of {path[-1]})" if path else ""))
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Metric cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dependency in self.inputs[name]:
+                visit(dependency, path + [name])
+            state[name] = "done"
+            order.append(name)
+
+        for name in (targets if targets is not None else self.metrics):
+            visit(name, [])
+        return order
+
+    def run(self, open_analytics: Callable[[], Any], workers: int = 4,
+            targets: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        Compute targets (every metric if None) and the metrics they depend on.
+        open_analytics returns a context manager; each worker thread enters one
+        on first use and all are exited when the run ends. The first failing
+        metric's exception is raised after running metrics finish.
+        """
+        order = self._order(targets)
+        results: Dict[str, Any] = {}
+        self.timings = {}
+        self.workers = max(1, workers)
+
+        local = threading.local()
+        opened = []
+        opened_lock = threading.Lock()
+
+        def compute(name: str):
+            analytics = getattr(local, "analytics", None)
+            if analytics is None:
+                manager = open_analytics()
+                analytics = manager.__enter__()
+                local.analytics = analytics
+                with opened_lock:
+                    opened.append(manager)
+            start = time.perf_counter()
+            value = self.metrics[name](analytics, **{dependency: results[dependency] for dependency in self.inputs[name]})
+            self.timings[name] = time.perf_counter() - start
+            return value
+
+        started = time.perf_counter()
+        pending = list(order)
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="metric") as executor:
+                while pending or running:
+                    for name in [n for n in pending if all(d in results for d in self.inputs[n])]:
+                        pending.remove(name)
+                        running[executor.submit(compute, name)] = name
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        if future.exception() is not None:
+                            pending.clear()
+                            for other in running:
+                                other.cancel()
+                            raise future.exception()
+                        results[name] = future.result()
+        finally:
+            for manager in opened:
+                manager.__exit__(None, None, None)
+            self.wall_seconds = time.perf_counter() - started
+
+        return results
+
+    def print_timings(self):
+        total = sum(self.timings.values())
+        print(f"⏱️  Metric timings ({len(self.timings)} metrics, {self.workers} workers): "
+              f"{total:.2f}s of queries in {self.wall_seconds:.2f}s")
+        for name, seconds in sorted(self.timings.items(), key=lambda item: -item[1]):
+            print(f"   {name:<32} {seconds:>8.3f}s")
@@ -57,9 +57,9 @@ class MultiTimeframeAnalytics:
         
         # Calculate new users only for D, W, M timeframes (not hourly)
         if timeframe in ['D', 'W', 'M']:
-            # Calculate new users per period (users with first transaction in that period)
-            first_interaction = df.groupby('origin_from_address')['block_timestamp'].min().reset_index()
-            first_interaction.columns = ['origin_from_address', 'first_tx_time']
+            # Calculate new users per period (users with first transaction in that period),
+            # read from the wallet_first_seen table maintained at insert time
+            first_interaction = self.db.get_wallet_first_seen(start_date, end_date)
             
             # Apply same period logic to first transactions
             if timeframe == 'D':
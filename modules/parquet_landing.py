@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Parquet landing zone for raw Hypersync data.
+Raw block/transaction/log columns are written with HypersyncClient.collect_parquet
+into block-range partitions, so history can be re-derived from local disk.
+
+Layout:
+    data/raw/<dataset>/blocks_<from>_<to>/{blocks,transactions,logs}.parquet
+    data/raw/<dataset>/blocks_<from>_<to>/_SUCCESS   (JSON: landed block range)
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow.parquet as pq
+
+RAW_DATA_DIR = "data/raw"
+DEFAULT_PARTITION_SIZE = 1_000_000
+SUCCESS_MARKER = "_SUCCESS"
+PARQUET_TABLES = ["blocks", "transactions", "logs"]
+
+
+def partition_ranges(start_block: int, end_block: int, partition_size: int = DEFAULT_PARTITION_SIZE) -> List[Tuple[int, int]]:
+    """Split [start_block, end_block) into partitions aligned to partition_size."""
+    ranges = []
+    current = (start_block // partition_size) * partition_size
+    while current < end_block:
+        ranges.append((current, current + partition_size))
+        current += partition_size
+    return ranges
+
+
+def partition_path(root: str, dataset: str, from_block: int, to_block: int) -> str:
+    return os.path.join(root, dataset, f"blocks_{from_block:012d}_{to_block:012d}")
+
+
+def read_marker(path: str) -> Optional[Dict[str, Any]]:
+    """Read a partition's _SUCCESS marker (None if the partition is not complete)."""
+    marker_path = os.path.join(path, SUCCESS_MARKER)
+    if not os.path.exists(marker_path):
+        return None
+    with open(marker_path, 'r') as f:
+        return json.load(f)
+
+
+def is_partition_landed(path: str, to_block: int) -> bool:
+    """A partition can be skipped when it was landed up to (at least) to_block."""
+    marker = read_marker(path)
+    return marker is not None and marker.get('landed_to_block', 0) >= to_block
+
+
+async def land_partition(client, query, root: str, dataset: str, partition: Tuple[int, int],
+                         landed_to_block: int, stream_config) -> bool:
+    """
+    Land one partition with collect_parquet unless it already exists.
+
+    Data is written to a temporary directory and renamed into place together
+    with its _SUCCESS marker, so an interrupted run never leaves a partition
+    that looks complete. The tail partition (landed_to_block below the
+    partition end) is re-landed on the next run.
+    Returns True if the partition was fetched.
+    """
+    path = partition_path(root, dataset, *partition)
+    if is_partition_landed(path, landed_to_block):
+        print(f"  {dataset} {partition[0]}-{partition[1]}: already landed, skipping")
+        return False
+
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+
+    print(f"  {dataset} {partition[0]}-{landed_to_block}: collecting parquet...")
+    await client.collect_parquet(tmp_path, query, stream_config)
+
+    with open(os.path.join(tmp_path, SUCCESS_MARKER), 'w') as f:
+        json.dump({
+            'from_block': partition[0],
+            'to_block': partition[1],
+            'landed_to_block': landed_to_block,
+            'landed_at': datetime.now().isoformat()
+        }, f, indent=2)
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp_path, path)
+    return True
+
+
+def list_partitions(root: str, dataset: str) -> List[Dict[str, Any]]:
+    """Complete partitions of a dataset, ordered by block range."""
+    dataset_dir = os.path.join(root, dataset)
+    if not os.path.isdir(dataset_dir):
+        return []
+
+    partitions = []
+    for name in sorted(os.listdir(dataset_dir)):
+        path = os.path.join(dataset_dir, name)
+        if not name.startswith("blocks_") or name.endswith(".tmp"):
+            continue
+        marker = read_marker(path)
+        if marker is not None:
+            partitions.append({'path': path, **marker})
+    return sorted(partitions, key=lambda p: p['from_block'])
+
+
+def read_partition(path: str) -> SimpleNamespace:
+    """Read a landed partition as an ArrowResponse-like data object (blocks, transactions, logs)."""
+    tables = {}
+    for table in PARQUET_TABLES:
+        file_path = os.path.join(path, f"{table}.parquet")
+        tables[table] = pq.read_table(file_path) if os.path.exists(file_path) else None
+    return SimpleNamespace(**tables)
+
+
+def covered_until(partitions: List[Dict[str, Any]], start_block: int) -> int:
+    """Highest block such that [start_block, block) is covered by landed partitions without gaps."""
+    covered = start_block
+    for partition in partitions:
+        if partition['from_block'] > covered:
+            break
+        covered = max(covered, partition['landed_to_block'])
+    return covered
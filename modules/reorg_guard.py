@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Reorg detection for near-head ingestion.
+The hashes of the last N blocks below the ingest height are kept in a
+recent_blocks table next to the ingested rows. Before each near-head ingest
+the stored hashes are compared with the chain (and with the response's
+RollbackGuard); on a mismatch the rows from the fork point up are deleted and
+the checkpoint is moved back so they are fetched again from the new branch.
+If even the oldest tracked block changed, the fork point is unknown and
+ReorgTooDeepError stops follow mode instead.
+"""
+
+from typing import Dict, Optional, Tuple
+
+from hypersync import Query, FieldSelection, BlockField
+
+from modules.follow_loop import StopFollowing
+
+DEFAULT_REORG_DEPTH = 128
+
+
+class ReorgTooDeepError(StopFollowing):
+    """Every tracked block hash changed: the fork is at or below oldest_block, where no hash is known."""
+
+    def __init__(self, oldest_block: int, depth: int):
+        super().__init__(
+            f"Reorg reaches past the {depth} tracked blocks: the fork is at or below block {oldest_block}, "
+            f"rows below it may belong to the orphaned branch. Roll the database back to a block before the "
+            f"fork and re-ingest from there (or raise --reorg-depth) before following again.")
+        self.oldest_block = oldest_block
+
+
+class ReorgGuard:
+    """
+    Tracks recent block hashes for one database.
+
+    db must provide get_connection() and rollback_to_block(block_number), which
+    deletes rows at or above block_number and moves the checkpoint back to it.
+    """
+
+    def __init__(self, client, db, depth: int = DEFAULT_REORG_DEPTH):
+        self.client = client
+        self.db = db
+        self.depth = depth
+        self.init_table()
+
+    def init_table(self):
+        with self.db.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS recent_blocks (
+                    block_number INTEGER PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    parent_hash TEXT
+                )
+            """)
+            conn.commit()
+
+    def _stored_hashes(self) -> Dict[int, str]:
+        with self.db.get_connection() as conn:
+            return dict(conn.execute("SELECT block_number, hash FROM recent_blocks").fetchall())
+
+    async def _fetch_hashes(self, from_block: int, to_block: int) -> Tuple[Dict[int, Tuple[str, str]], Optional[object]]:
+        """Hash and parent hash of every block in [from_block, to_block), plus the last RollbackGuard seen."""
+        hashes = {}
+        guard = None
+        current_block = from_block
+
+        while current_block < to_block:
+            query = Query(
+                from_block=current_block,
+                to_block=to_block,
+                include_all_blocks=True,
+                field_selection=FieldSelection(
+                    block=[BlockField.NUMBER, BlockField.HASH, BlockField.PARENT_HASH]
+                )
+            )
+            response = await self.client.get(query)
+            for block in response.data.blocks:
+                hashes[block.number] = (block.hash, block.parent_hash)
+            if response.rollback_guard is not None:
+                guard = response.rollback_guard
+
+            if response.next_block and response.next_block > current_block:
+                current_block = response.next_block
+            else:
+                break
+
+        return hashes, guard
+
+    async def check(self, height: int) -> Optional[int]:
+        """
+        Compare stored hashes with the chain and store the hashes of the last
+        `depth` blocks below height. Returns the fork block if a reorg was found.
+        Raises ReorgTooDeepError, storing nothing, if the oldest tracked block
+        changed too, since the common ancestor is then not known.
+
+        Hashes are stored before the rows of those blocks are ingested, so a
+        reorg that lands in between shows up as a mismatch on the next check.
+        """
+        stored = self._stored_hashes()
+        chain, guard = {}, None
+        if stored:
+            chain, guard = await self._fetch_hashes(min(stored), min(max(stored) + 1, height))
+        # Only the newest `depth` blocks are tracked, even after a long pause
+        tail_from = max(0, height - self.depth, max(stored) + 1 if stored else 0)
+        tail, tail_guard = await self._fetch_hashes(tail_from, height)
+        chain.update(tail)
+        guard = tail_guard or guard
+
+        mismatched = [number for number, block_hash in stored.items()
+                      if number < height and chain.get(number, (block_hash,))[0] != block_hash]
+        # Stored blocks at or above the height the chain now reports are gone
+        mismatched += [number for number in stored if number >= height]
+
+        if guard is not None:
+            # The server's in-memory tip must extend what we stored
+            parent_number = guard.first_block_number - 1
+            if parent_number in stored and stored[parent_number] != guard.first_parent_hash:
+                mismatched.append(parent_number)
+            if guard.block_number in stored and stored[guard.block_number] != guard.hash:
+                mismatched.append(guard.block_number)
+
+        fork_block = None
+        if mismatched:
+            fork_block = min(mismatched)
+            if fork_block == min(stored):
+                # Even the oldest tracked block changed, so its parent is not a known common
+                # ancestor either: rolling back to it could leave orphaned rows below it
+                raise ReorgTooDeepError(fork_block, self.depth)
+            print(f"⚠️  Reorg detected: block {fork_block} hash changed")
+
+        with self.db.get_connection() as conn:
+            if fork_block is not None:
+                conn.execute("DELETE FROM recent_blocks WHERE block_number >= ?", (fork_block,))
+            conn.executemany(
+                "INSERT OR REPLACE INTO recent_blocks (block_number, hash, parent_hash) VALUES (?, ?, ?)",
+                [(number, block_hash, parent_hash) for number, (block_hash, parent_hash) in chain.items()
+                 if number >= max(0, height - self.depth)]
+            )
+            conn.execute("DELETE FROM recent_blocks WHERE block_number < ?", (height - self.depth,))
+            conn.commit()
+
+        return fork_block
+
+    async def protect(self, height: int) -> Optional[int]:
+        """Run check() and, on a reorg, roll the database back to the fork block."""
+        fork_block = await self.check(height)
+        if fork_block is not None:
+            deleted = self.db.rollback_to_block(fork_block)
+            print(f"Rolled back {deleted} rows from block {fork_block}, they will be fetched again")
+        return fork_block
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Per-response hash indexes for Hypersync query results.
+Joins transactions and logs by hash in linear time instead of rescanning
+the whole response for every transaction.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _lower(value: Optional[str]) -> Optional[str]:
+    return value.lower() if value else value
+
+
+class ResponseIndex:
+    """
+    Lookup tables built once over a single Hypersync response.
+
+    - tx_by_hash: tx_hash -> transaction
+    - logs_by_tx: tx_hash -> logs emitted by that transaction (in response order)
+    - logs_by_address_topic0: (address, topic0) -> logs, keys lowercased
+    """
+
+    def __init__(self, transactions: List[Any], logs: List[Any]):
+        self.tx_by_hash: Dict[str, Any] = {}
+        self.logs_by_tx: Dict[str, List[Any]] = {}
+        self.logs_by_address_topic0: Dict[Tuple[Optional[str], Optional[str]], List[Any]] = {}
+
+        for tx in transactions or []:
+            self.tx_by_hash[tx.hash] = tx
+
+        for log in logs or []:
+            self.logs_by_tx.setdefault(log.transaction_hash, []).append(log)
+            topic0 = log.topics[0] if log.topics else None
+            key = (_lower(log.address), _lower(topic0))
+            self.logs_by_address_topic0.setdefault(key, []).append(log)
+
+    def get_transaction(self, tx_hash: str) -> Optional[Any]:
+        """Get the transaction with the given hash, if it is in the response."""
+        return self.tx_by_hash.get(tx_hash)
+
+    def logs_for(self, tx_hash: str, address: Optional[str] = None, topic0: Optional[str] = None) -> List[Any]:
+        """Get the logs of a transaction, optionally filtered by address and/or topic0."""
+        tx_logs = self.logs_by_tx.get(tx_hash, [])
+        if address is None and topic0 is None:
+            return tx_logs
+
+        address = _lower(address)
+        topic0 = _lower(topic0)
+        return [
+            log for log in tx_logs
+            if (address is None or _lower(log.address) == address)
+            and (topic0 is None or (log.topics and _lower(log.topics[0]) == topic0))
+        ]
+
+    def first_log(self, tx_hash: str, address: Optional[str] = None, topic0: Optional[str] = None) -> Optional[Any]:
+        """Get the first log of a transaction matching address and/or topic0."""
+        matches = self.logs_for(tx_hash, address, topic0)
+        return matches[0] if matches else None
+
+    def has_log(self, tx_hash: str, address: Optional[str] = None, topic0: Optional[str] = None) -> bool:
+        """Check whether a transaction emitted a log matching address and/or topic0."""
+        return self.first_log(tx_hash, address, topic0) is not None
+
+    def logs_with(self, address: str, topic0: str) -> List[Any]:
+        """Get every log in the response emitted by address with the given topic0."""
+        return self.logs_by_address_topic0.get((_lower(address), _lower(topic0)), [])
+
+    def tx_hashes_with(self, address: str, topic0: str) -> List[str]:
+        """Get the unique transaction hashes (in response order) that emitted address/topic0."""
+        return list(dict.fromkeys(log.transaction_hash for log in self.logs_with(address, topic0)))
+
+
+def build_response_index(response) -> ResponseIndex:
+    """Build a ResponseIndex for a Hypersync QueryResponse."""
+    if not response.data:
+        return ResponseIndex([], [])
+    return ResponseIndex(response.data.transactions, response.data.logs)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Process-pool sharded historical backfill.
+[start_block, end_block) is split into block shards; each shard is fetched,
+decoded and written by its own worker process into its own SQLite file, then
+the shards are merged into the main database with ATTACH and INSERT ... SELECT.
+Shards only store raw rows and blocks; derived columns and rollups are left
+to the caller, once, after the merge.
+
+Shard files and the shard plan live next to the main database:
+    <db_path>.shards/plan.json
+    <db_path>.shards/shard_000.db, shard_001.db, ...
+A failed backfill keeps them, so re-running with the same start block and
+shard count resumes every shard from its own checkpoint.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+PLAN_FILE = "plan.json"
+
+
+def shard_dir(db_path: str) -> str:
+    return db_path + ".shards"
+
+
+def shard_ranges(start_block: int, end_block: int, shards: int) -> List[Tuple[int, int]]:
+    """Split [start_block, end_block) into `shards` contiguous ranges of (nearly) equal size."""
+    shards = max(1, min(shards, end_block - start_block))
+    size, extra = divmod(end_block - start_block, shards)
+    ranges = []
+    current = start_block
+    for i in range(shards):
+        next_block = current + size + (1 if i < extra else 0)
+        ranges.append((current, next_block))
+        current = next_block
+    return ranges
+
+
+def load_plan(db_path: str, start_block: int, end_block: int, shards: int) -> Dict[str, Any]:
+    """
+    Reuse the shard plan of an interrupted backfill with the same start block and
+    shard count (blocks past its end are left to the next incremental run),
+    otherwise write a new one.
+    """
+    directory = shard_dir(db_path)
+    plan_path = os.path.join(directory, PLAN_FILE)
+
+    if os.path.exists(plan_path):
+        with open(plan_path, 'r') as f:
+            plan = json.load(f)
+        if plan['start_block'] == start_block and plan['shards'] == shards:
+            print(f"Resuming shard plan {plan['start_block']}-{plan['end_block']} ({shards} shards)")
+            return plan
+        print(f"Discarding shard plan {plan['start_block']}-{plan['end_block']} ({plan['shards']} shards)")
+        shutil.rmtree(directory)
+
+    os.makedirs(directory, exist_ok=True)
+    ranges = shard_ranges(start_block, end_block, shards)
+    plan = {
+        'start_block': start_block,
+        'end_block': end_block,
+        'shards': shards,
+        'ranges': ranges,
+        'paths': [os.path.join(directory, f"shard_{i:03d}.db") for i in range(len(ranges))],
+    }
+    with open(plan_path, 'w') as f:
+        json.dump(plan, f, indent=2)
+    return plan
+
+
+def run_shards(worker: Callable[..., int], db_path: str, start_block: int, end_block: int, shards: int,
+               processes: Optional[int] = None, **worker_kwargs) -> Dict[str, Any]:
+    """
+    Run worker(shard_path, from_block, to_block, **worker_kwargs) for every shard
+    in a process pool. worker must be a module-level function (it is pickled to
+    spawned processes) that returns its inserted row count.
+    Returns the shard plan once every shard has finished.
+    """
+    plan = load_plan(db_path, start_block, end_block, shards)
+    processes = processes or min(len(plan['ranges']), os.cpu_count() or 1)
+    print(f"Backfilling blocks {plan['start_block']} to {plan['end_block']} in "
+          f"{len(plan['ranges'])} shards on {processes} processes")
+
+    start = time.time()
+    # Spawn instead of fork: the parent may already hold a Hypersync client and its runtime threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=context) as pool:
+        futures = {
+            pool.submit(worker, path, from_block, to_block, **worker_kwargs): (path, from_block, to_block)
+            for path, (from_block, to_block) in zip(plan['paths'], plan['ranges'])
+        }
+        for future in as_completed(futures):
+            path, from_block, to_block = futures[future]
+            inserted = future.result()
+            print(f"  Shard {from_block}-{to_block} done: {inserted:,} rows ({time.time() - start:.1f}s)")
+
+    return plan
+
+
+def merge_shards(db_path: str, paths: List[str], table: str, columns: List[str],
+                 converters: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                 wallet_column: Optional[str] = None) -> int:
+    """
+    Merge shard files into db_path with ATTACH + INSERT OR IGNORE ... SELECT. Returns rows inserted.
+    converters (column -> function, as for BulkWriter) are applied to shard values on the way in.
+    wallet_column names the shard column holding the wallet address: its addresses are
+    registered in wallets and stored as wallet_id (see modules/wallets.py).
+    """
+    conn = sqlite3.connect(db_path)
+    values = {c: c for c in columns}
+    if converters:
+        for column, convert in converters.items():
+            conn.create_function(f"convert_{column}", 1, convert, deterministic=True)
+        values.update({c: f"convert_{c}({c})" for c in columns if c in converters})
+    targets = list(columns)
+    if wallet_column:
+        address = values[wallet_column]
+        targets[columns.index(wallet_column)] = 'wallet_id'
+        values[wallet_column] = f"(SELECT id FROM main.wallets WHERE address = {address})"
+    column_list = ', '.join(targets)
+    select_list = ', '.join(values[c] for c in columns)
+    inserted = 0
+
+    try:
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            start = time.time()
+            conn.execute("ATTACH DATABASE ? AS shard", (path,))
+            try:
+                with conn:
+                    if wallet_column:
+                        conn.execute(f"INSERT OR IGNORE INTO main.wallets (address) "
+                                     f"SELECT DISTINCT {address} FROM shard.{table}")
+                    cursor = conn.execute(
+                        f"INSERT OR IGNORE INTO {table} ({column_list}) "
+                        f"SELECT {select_list} FROM shard.{table} ORDER BY block_number"
+                    )
+                    inserted += cursor.rowcount
+            finally:
+                conn.execute("DETACH DATABASE shard")
+            print(f"  Merged {os.path.basename(path)}: {cursor.rowcount:,} rows ({time.time() - start:.2f}s)")
+    finally:
+        conn.close()
+
+    return inserted
+
+
+def remove_shards(db_path: str):
+    """Delete the shard files and plan once they have been merged."""
+    shutil.rmtree(shard_dir(db_path), ignore_errors=True)
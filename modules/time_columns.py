@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Integer time columns for index-friendly date filtering.
+The fact tables store timestamp as an ISO string, and queries that filter on
+DATE(timestamp, 'utc') cannot use an index. Each row also carries
+    ts_epoch  unix seconds (UTC) of timestamp
+    day_id    ts_epoch // 86400, i.e. the UTC day number
+so that date ranges become half-open integer ranges on indexed columns:
+    DATE(timestamp, 'utc') BETWEEN :start AND :end
+    -> day_id >= day_id(:start) AND day_id < day_id(:end) + 1
+In SQL, the day_id of a 'YYYY-MM-DD' value is CAST(strftime('%s', value) AS INTEGER) / 86400.
+"""
+
+import sqlite3
+from datetime import date
+
+SECONDS_PER_DAY = 86400
+
+
+def day_id(date_str: str) -> int:
+    """UTC day number of a 'YYYY-MM-DD' date."""
+    return (date.fromisoformat(date_str[:10]) - date(1970, 1, 1)).days
+
+
+def ensure_time_columns(conn: sqlite3.Connection, table: str):
+    """Add and index ts_epoch and day_id on a fact table and fill rows that lack them (the caller commits)."""
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    for column in ('ts_epoch', 'day_id'):
+        if column not in columns:
+            print(f"Adding {column} to {table}...")
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_ts_epoch ON {table}(ts_epoch)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_day_id ON {table}(day_id)")
+    assign_time_columns(conn, table)
+
+
+def assign_time_columns(conn: sqlite3.Connection, table: str) -> int:
+    """
+    Set ts_epoch and day_id on rows written since the last call (the caller commits).
+    Uses the same local -> UTC conversion as DATE(timestamp, 'utc'), so day_id
+    matches the dates the previous queries produced.
+    """
+    cursor = conn.execute(f"""
+        UPDATE {table}
+        SET ts_epoch = CAST(strftime('%s', timestamp, 'utc') AS INTEGER),
+            day_id = CAST(strftime('%s', timestamp, 'utc') AS INTEGER) / {SECONDS_PER_DAY}
+        WHERE ts_epoch IS NULL
+    """)
+    return cursor.rowcount
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Dictionary-encoded wallet addresses.
+Each address gets an integer id in a `wallets(id, address)` dimension table
+and fact rows store only that `wallet_id`: the writers resolve the address of
+every row before the insert (WalletIds, a BulkWriter converter, or
+merge_shards for backfill shards), so distinct counts and per-wallet GROUP BYs
+compare integers and the 42-character address is stored once per wallet
+instead of once per row. Readers that need the address use the
+`<table>_v` view, which joins it back in as from_address.
+Tables created before wallet ids are migrated when they are opened: ids are
+assigned from from_address, then the column is dropped.
+wallets only holds addresses that some row references (rollbacks drop the
+others), so COUNT(*) FROM wallets is the number of distinct users.
+"""
+
+import sqlite3
+from typing import Any, Callable, Dict, Optional
+
+# BulkWriter renames of the fact tables: the address of the rows is written as its wallet id
+WALLET_RENAMES = {'from_address': 'wallet_id'}
+
+
+class WalletIds:
+    """
+    BulkWriter converter from an address to its wallet id, registering new
+    addresses in wallets. convert puts the address in the format of wallets
+    first (hex_to_blob for compact databases). Ids are only cached for one
+    write, a rollback between writes may delete wallets.
+    """
+
+    def __init__(self, convert: Optional[Callable[[Any], Any]] = None):
+        self.convert = convert
+        self.conn = None
+        self.ids = {}
+
+    def bind(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self.ids = {}
+
+    def __call__(self, address: Any) -> int:
+        wallet_id = self.ids.get(address)
+        if wallet_id is None:
+            value = self.convert(address) if self.convert else address
+            row = self.conn.execute("SELECT id FROM wallets WHERE address = ?", (value,)).fetchone()
+            if row:
+                wallet_id = row[0]
+            else:
+                wallet_id = self.conn.execute("INSERT INTO wallets (address) VALUES (?)", (value,)).lastrowid
+            self.ids[address] = wallet_id
+        return wallet_id
+
+
+def wallet_converters(converters: Optional[Dict[str, Callable[[Any], Any]]] = None) -> Dict[str, Callable[[Any], Any]]:
+    """BulkWriter converters for a fact table: converters (e.g. compact_converters()) plus WalletIds for from_address."""
+    converters = dict(converters or {})
+    converters['from_address'] = WalletIds(converters.get('from_address'))
+    return converters
+
+
+def ensure_wallet_ids(conn: sqlite3.Connection, table: str):
+    """
+    Create the wallets table, the wallet_id index and the <table>_v view, and
+    migrate a table that still stores from_address (the caller commits).
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS wallets (
+            id INTEGER PRIMARY KEY,
+            address TEXT UNIQUE NOT NULL
+        )
+    """)
+    columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+    if 'wallet_id' not in columns:
+        print(f"Adding wallet_id to {table}...")
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN wallet_id INTEGER REFERENCES wallets(id)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_wallet_id ON {table}(wallet_id)")
+    if 'from_address' in columns:
+        assign_wallet_ids(conn, table)
+        print(f"Dropping from_address from {table} (VACUUM or compact_database.py returns the space)...")
+        # Address lookups go through wallets, the TEXT index would block the drop
+        conn.execute("DROP INDEX IF EXISTS idx_from_address")
+        conn.execute(f"DROP VIEW IF EXISTS {table}_v")
+        conn.execute(f"ALTER TABLE {table} DROP COLUMN from_address")
+    ensure_wallet_view(conn, table)
+
+
+def ensure_wallet_view(conn: sqlite3.Connection, table: str):
+    """The <table>_v view: the rows of table with their address as from_address, for legacy readers."""
+    conn.execute(f"""
+        CREATE VIEW IF NOT EXISTS {table}_v AS
+        SELECT t.*, w.address as from_address
+        FROM {table} t JOIN wallets w ON w.id = t.wallet_id
+    """)
+
+
+def assign_wallet_ids(conn: sqlite3.Connection, table: str) -> int:
+    """
+    Register the addresses of a table that still has from_address and set
+    wallet_id on its rows that have none (the caller commits).
+    """
+    conn.execute(f"""
+        INSERT OR IGNORE INTO wallets (address)
+        SELECT DISTINCT from_address FROM {table} WHERE wallet_id IS NULL
+    """)
+    cursor = conn.execute(f"""
+        UPDATE {table}
+        SET wallet_id = (SELECT id FROM wallets WHERE address = {table}.from_address)
+        WHERE wallet_id IS NULL
+    """)
+    return cursor.rowcount
+
+
+def drop_unused_wallets(conn: sqlite3.Connection, table: str, wallet_ids) -> int:
+    """
+    Delete the wallets among wallet_ids that no row of table references any more,
+    e.g. after a rollback deleted their only rows (the caller commits).
+    """
+    cursor = conn.executemany(
+        f"DELETE FROM wallets WHERE id = ? AND NOT EXISTS (SELECT 1 FROM {table} WHERE wallet_id = ?)",
+        [(wallet_id, wallet_id) for wallet_id in wallet_ids]
+    )
+    return cursor.rowcount
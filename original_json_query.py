@@ -90,7 +90,7 @@ class FlexibleAnalytics:
         query = """
         SELECT 
             tx_hash, from_address, token, amount, n_cards, timestamp
-        FROM betting_transactions 
+        FROM betting_transactions_v 
         WHERE timestamp > ?
         ORDER BY timestamp
         """
@@ -119,7 +119,7 @@ class FlexibleAnalytics:
             SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon_volume,
             SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END) as total_jerry_volume,
             SUM(n_cards) as total_cards
-        FROM betting_transactions
+        FROM betting_transactions_v
         """
         self.cursor.execute(query)
         result = self.cursor.fetchone()
@@ -138,7 +138,7 @@ class FlexibleAnalytics:
             SELECT 
                 from_address,
                 COUNT(DISTINCT tx_hash) as bet_tx_count
-            FROM betting_transactions
+            FROM betting_transactions_v
             GROUP BY from_address
         ),
         categorized_users AS (
@@ -215,7 +215,7 @@ class FlexibleAnalytics:
             ROUND(AVG(n_cards), 2) as avg_cards_per_slip,
             COUNT(DISTINCT tx_hash) as total_bets,
             COUNT(DISTINCT DATE(timestamp)) as active_days
-        FROM betting_transactions
+        FROM betting_transactions_v
         GROUP BY from_address
         ORDER BY total_bets DESC
         LIMIT ?
@@ -321,7 +321,7 @@ class FlexibleAnalytics:
             SELECT 
                 from_address,
                 MIN(timestamp) as first_bet_date
-            FROM betting_transactions
+            FROM betting_transactions_v
             GROUP BY from_address
         )
         SELECT 
@@ -339,7 +339,7 @@ class FlexibleAnalytics:
             SUM(CASE WHEN t.token = 'MON' THEN 1 ELSE 0 END) as mon_transactions,
             SUM(CASE WHEN t.token = 'Jerry' THEN 1 ELSE 0 END) as jerry_transactions
         FROM periods p
-        LEFT JOIN betting_transactions t ON 
+        LEFT JOIN betting_transactions_v t ON 
             DATE(t.timestamp) >= p.period_start AND DATE(t.timestamp) <= p.period_end
             {timestamp_filter}
         LEFT JOIN first_time_users ftu ON t.from_address = ftu.from_address
@@ -404,7 +404,7 @@ class FlexibleAnalytics:
             SUM(CASE WHEN t.token = 'Jerry' THEN t.amount ELSE 0 END) as jerry_volume,
             ROUND(CAST(COUNT(DISTINCT t.from_address) AS FLOAT) / COUNT(DISTINCT t.tx_hash), 2) as avg_submissions_per_player
         FROM periods p
-        LEFT JOIN betting_transactions t ON 
+        LEFT JOIN betting_transactions_v t ON 
             DATE(t.timestamp) >= p.week_start AND DATE(t.timestamp) <= p.week_end
         GROUP BY p.week_number, p.week_start, p.week_end
         ORDER BY p.week_number
@@ -448,7 +448,7 @@ class FlexibleAnalytics:
 def get_overall_slips_by_card_count(analytics, min_cards=2, max_cards=7):
     query = f"""
         SELECT n_cards, COUNT(DISTINCT tx_hash) as bet_count
-        FROM betting_transactions
+        FROM betting_transactions_v
         WHERE n_cards BETWEEN ? AND ?
         GROUP BY n_cards
         ORDER BY n_cards
@@ -491,7 +491,7 @@ def get_weekly_slips_by_card_count(analytics, min_cards=2, max_cards=7):
         t.n_cards,
         COUNT(DISTINCT t.tx_hash) as bets
     FROM weeks w
-    LEFT JOIN betting_transactions t ON 
+    LEFT JOIN betting_transactions_v t ON 
         DATE(t.timestamp) >= w.week_start AND 
         DATE(t.timestamp) <= w.week_end AND
         t.n_cards BETWEEN ? AND ?
@@ -597,7 +597,7 @@ def get_timeframe_slips_by_card_count(analytics, timeframe, start_date='2025-02-
         t.n_cards,
         COUNT(DISTINCT t.tx_hash) as bets
     FROM periods p
-    LEFT JOIN betting_transactions t ON 
+    LEFT JOIN betting_transactions_v t ON 
         DATE(t.timestamp) >= p.period_start AND 
         DATE(t.timestamp) <= p.period_end AND
         t.n_cards BETWEEN ? AND ?
@@ -640,7 +640,7 @@ def get_average_metrics(analytics):
         ROUND(AVG(n_cards)) as avg_cards,
         SUM(n_cards) as tot_cards,
         COUNT(DISTINCT DATE(timestamp)) as total_days
-    FROM betting_transactions
+    FROM betting_transactions_v
     """
     
     analytics.cursor.execute(query)
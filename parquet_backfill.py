@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Parquet Backfill
+================
+
+Two-step history ingestion through a local Parquet landing zone:
+
+1. --land: HypersyncClient.collect_parquet writes the raw block/transaction/log
+   columns of the combined betting (MON + Jerry) and claiming queries to data/raw/,
+   partitioned by block range. Partitions that already exist are skipped, so an
+   interrupted backfill resumes where it stopped.
+2. --load: the landed partitions are decoded column-wise (modules/arrow_decode.py)
+   and bulk-inserted into betting_transactions and claiming_transactions.
+   Reprocessing history only reads local disk.
+
+Usage:
+    python parquet_backfill.py --land --start-block 0
+    python parquet_backfill.py --load
+    python parquet_backfill.py              # land, then load
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import betting_database
+import claiming_database
+from betting_database import BettingDatabase, HypersyncClient, ClientConfig, build_stream_config
+from claiming_database import ComprehensiveClaimingDatabase
+from modules.arrow_decode import decode_bets_arrow, decode_claiming_arrow, arrow_block_rows
+from modules.parquet_landing import (
+    RAW_DATA_DIR, DEFAULT_PARTITION_SIZE, partition_ranges, land_partition,
+    list_partitions, read_partition, covered_until
+)
+
+# dataset -> (query builder, columnar decoder, target database)
+DATASETS = {
+    "bets": (betting_database.build_bets_query, decode_bets_arrow, "betting"),
+    "claiming": (claiming_database.build_claiming_query, decode_claiming_arrow, "claiming"),
+}
+
+# =============================================================================
+# LANDING
+# =============================================================================
+
+async def land_all(client: HypersyncClient, root: str, start_block: int, end_block: int,
+                   partition_size: int, stream_config) -> int:
+    """Land every dataset partition in [start_block, end_block). Returns the number of partitions fetched."""
+    print(f"Landing raw parquet from {start_block} to {end_block} into {root} "
+          f"({partition_size:,} blocks per partition)")
+
+    fetched = 0
+    for dataset, (build_query, _, _) in DATASETS.items():
+        for partition in partition_ranges(start_block, end_block, partition_size):
+            landed_to_block = min(partition[1], end_block)
+            query = build_query(partition[0], landed_to_block)
+            if await land_partition(client, query, root, dataset, partition, landed_to_block, stream_config):
+                fetched += 1
+
+    print(f"Landed {fetched} new partitions")
+    return fetched
+
+# =============================================================================
+# LOADING
+# =============================================================================
+
+def load_all(root: str, betting_db: BettingDatabase, claiming_db: ComprehensiveClaimingDatabase) -> dict:
+    """Decode every landed partition and bulk-insert it into the matching database."""
+    databases = {"betting": betting_db, "claiming": claiming_db}
+    inserted = {"betting": 0, "claiming": 0}
+
+    for dataset, (_, decode, target) in DATASETS.items():
+        partitions = list_partitions(root, dataset)
+        print(f"Loading {dataset}: {len(partitions)} partitions")
+
+        for partition in partitions:
+            start = time.time()
+            data = read_partition(partition['path'])
+            batch = decode(data)
+            # Rows and the partition's block timestamps go in together
+            count = databases[target].commit_batch(batch, blocks=arrow_block_rows(data))
+            inserted[target] += count
+            print(f"  {partition['from_block']}-{partition['landed_to_block']}: "
+                  f"{batch.num_rows:,} rows decoded, {count:,} inserted ({time.time() - start:.2f}s)")
+
+    # Advance checkpoints over the gap-free landed range so incremental runs continue from there
+    for target, datasets in (("betting", ["bets"]), ("claiming", ["claiming"])):
+        db = databases[target]
+        last_block = db.get_last_processed_block()
+        covered = min(covered_until(list_partitions(root, dataset), last_block) for dataset in datasets)
+        if covered > last_block:
+            db.update_last_processed_block(covered)
+
+    return inserted
+
+# =============================================================================
+# MAIN EXECUTION
+# =============================================================================
+
+async def main():
+    parser = argparse.ArgumentParser(description="Parquet landing zone backfill")
+    parser.add_argument("--land", action="store_true", help="Land raw parquet partitions from Hypersync")
+    parser.add_argument("--load", action="store_true", help="Derive database rows from landed partitions")
+    parser.add_argument("--start-block", type=int, default=0, help="First block to land")
+    parser.add_argument("--end-block", type=int, help="Block to stop landing at (defaults to current height)")
+    parser.add_argument("--partition-size", type=int, default=DEFAULT_PARTITION_SIZE, help="Blocks per partition")
+    parser.add_argument("--raw-dir", type=str, default=RAW_DATA_DIR, help="Landing zone directory")
+    parser.add_argument("--concurrency", type=int, default=betting_database.DEFAULT_STREAM_CONCURRENCY, help="Parallel stream queries while landing")
+
+    if betting_database.IS_PRODUCTION:
+        default_betting_db = "/app/data/betting_transactions.db"
+    else:
+        default_betting_db = os.getenv('DB_PATH', 'betting_transactions.db')
+    parser.add_argument("--betting-db-path", type=str, default=default_betting_db, help="Betting database file")
+    parser.add_argument("--claiming-db-path", type=str, default="data/comprehensive_claiming_transactions_fixed.db", help="Claiming database file")
+    args = parser.parse_args()
+
+    # Without an explicit step, land then load
+    land = args.land or not args.load
+    load = args.load or not args.land
+
+    try:
+        if land:
+            client = HypersyncClient(ClientConfig(
+                url=betting_database.MONAD_HYPERSYNC_URL,
+                bearer_token=betting_database.HYPERSYNC_BEARER_TOKEN
+            ))
+            end_block = args.end_block if args.end_block is not None else await client.get_height()
+            await land_all(client, args.raw_dir, args.start_block, end_block, args.partition_size,
+                           build_stream_config(concurrency=args.concurrency))
+
+        if load:
+            inserted = load_all(args.raw_dir, BettingDatabase(db_path=args.betting_db_path),
+                                ComprehensiveClaimingDatabase(args.claiming_db_path))
+            print(f"\nLoad complete! Inserted {inserted['betting']:,} betting and "
+                  f"{inserted['claiming']:,} claiming transactions.")
+
+    except Exception as e:
+        print(f"Error: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    asyncio.run(main())
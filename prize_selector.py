@@ -19,6 +19,8 @@ import json
 import sys
 from pathlib import Path
 
+from modules.compact_storage import blob_to_hex
+
 class PrizeSelector:
     def __init__(self, db_path: str = "betting_transactions.db"):
         """Initialize the prize selector with database path."""
@@ -65,7 +67,7 @@ class PrizeSelector:
                     from_address,
                     timestamp,
                     n_cards
-                FROM betting_transactions 
+                FROM betting_transactions_v 
                 WHERE timestamp BETWEEN ? AND ?
                 ORDER BY timestamp ASC
             """
@@ -134,7 +136,7 @@ class PrizeSelector:
                     bet_id,
                     block_number
                 FROM betting_transactions 
-                WHERE from_address = ?
+                WHERE wallet_id = (SELECT id FROM wallets WHERE address = ?)
                 ORDER BY timestamp DESC
                 LIMIT ?
             """
@@ -176,12 +178,13 @@ class PrizeSelector:
                 winner_bet_id = submission[0]  # bet_id
                 break
         
-        # Get example transactions for the winner
-        winner_transactions = self.get_wallet_transactions(winner_address, 10)
+        # Get example transactions for the winner (hashes as hex for output)
+        winner_transactions = [(blob_to_hex(tx[0]),) + tuple(tx[1:])
+                               for tx in self.get_wallet_transactions(winner_address, 10)]
         
         winner_info = {
             "bet_id": winner_bet_id,
-            "wallet_address": winner_address,
+            "wallet_address": blob_to_hex(winner_address),
             "entries": winner_entries,
             "total_entries": len(entry_pool),
             "total_submissions": len(submissions),
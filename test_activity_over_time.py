@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Checks the bucketed get_activity_over_time against the original per-period
+raw-row query (benchmark_activity.raw_rows_activity) on a small synthetic
+database, built and queried in several timezones.
+"""
+
+import os
+import time
+
+import pytest
+
+from benchmark_activity import SINCE_TIMESTAMP, START_DATE, build_synthetic_database, first_difference, raw_rows_activity
+from json_query import FlexibleAnalytics
+
+@pytest.fixture(params=['UTC', 'America/New_York', 'Asia/Tokyo'])
+def timezone(request):
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = request.param
+    time.tzset()
+    yield request.param
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+@pytest.mark.parametrize('since_timestamp', [None, SINCE_TIMESTAMP])
+def test_activity_matches_raw_rows(tmp_path, timezone, since_timestamp):
+    db_path = str(tmp_path / "bets.db")
+    build_synthetic_database(db_path, 1500)
+    with FlexibleAnalytics(db_path) as analytics:
+        for timeframe in ('day', 'week', 'month'):
+            expected = raw_rows_activity(analytics.cursor, START_DATE, timeframe, since_timestamp)
+            assert expected
+            actual = analytics.get_activity_over_time(START_DATE, timeframe, since_timestamp)
+            assert first_difference(expected, actual) == "", f"{timeframe} in {timezone}"
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Checks that incremental bet_id enrichment fills the same bet IDs as ingestion
+and still reaches rows that were written below the watermark after a scan
+(reorg rollbacks, --start-block reprocessing, shard merges).
+"""
+
+import asyncio
+
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from fast_bet_id_query import enrich_bet_ids, get_bet_id_watermark
+
+def bet_ids(db):
+    with db.get_connection() as conn:
+        return dict(conn.execute("SELECT tx_hash, bet_id FROM betting_transactions"))
+
+def clear_mon_bet_ids(db, from_block: int = 0):
+    """Drop MON bet IDs like rows ingested by the old split MON query."""
+    with db.get_connection() as conn:
+        conn.execute("UPDATE betting_transactions SET bet_id = 0 WHERE token = 'MON' AND block_number >= ?",
+                     (from_block,))
+        conn.commit()
+
+def test_rows_written_below_watermark_are_rescanned(tmp_path):
+    chain = FakeChain()
+    db_path = str(tmp_path / "bets.db")
+    db = BettingDatabase(db_path)
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain)))
+    expected = bet_ids(db)
+
+    clear_mon_bet_ids(db)
+    assert bet_ids(db) != expected
+    asyncio.run(enrich_bet_ids(FakeHypersyncClient(chain), db_path))
+    assert bet_ids(db) == expected
+    watermark = get_bet_id_watermark(db_path)
+    assert watermark > chain.blocks[30].number
+
+    # Roll back and re-ingest the upper half; the new rows lack bet IDs but sit below the watermark
+    rollback_block = chain.blocks[30].number
+    db.rollback_to_block(rollback_block)
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain)))
+    clear_mon_bet_ids(db, rollback_block)
+    assert bet_ids(db) != expected
+
+    asyncio.run(enrich_bet_ids(FakeHypersyncClient(chain), db_path))
+    assert bet_ids(db) == expected
+    assert get_bet_id_watermark(db_path) == watermark
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Checks that the batched INSERT OR IGNORE writer reports the same inserted and
+skipped counts, and stores the same rows, as the original per-row INSERT loop
+that caught IntegrityError for duplicates.
+"""
+
+import sqlite3
+
+from betting_database import BettingDatabase
+from modules.bulk_writer import BulkWriter
+from modules.contracts import BETTING_COLUMNS
+
+TABLE_SQL = """
+    CREATE TABLE betting_transactions (
+        timestamp DATETIME NOT NULL,
+        tx_hash TEXT PRIMARY KEY,
+        from_address TEXT NOT NULL,
+        to_address TEXT NOT NULL,
+        token TEXT NOT NULL,
+        amount REAL NOT NULL,
+        n_cards INTEGER NOT NULL,
+        bet_id INTEGER NOT NULL,
+        block_number INTEGER NOT NULL
+    )
+"""
+
+def make_bets(start: int, count: int):
+    """Bets with tx hashes start..start+count-1, spread over a few wallets and days."""
+    return [{
+        'timestamp': f"2025-07-{1 + i % 5:02d} {i % 24:02d}:15:00",
+        'tx_hash': f"0x{i:064x}",
+        'from_address': f"0x{i % 7:040x}",
+        'to_address': '0x740990cb01e893a371a050736c62ae0b779109e7',
+        'token': 'MON' if i % 3 else 'Jerry',
+        'amount': 1.5 * (i % 11),
+        'n_cards': 1 + i % 4,
+        'bet_id': i,
+        'block_number': 1000 + i,
+    } for i in range(start, start + count)]
+
+def baseline_insert(conn, transactions):
+    """The original insert_transactions loop."""
+    cursor = conn.cursor()
+    inserted_count = 0
+    for tx in transactions:
+        try:
+            cursor.execute(f"INSERT INTO betting_transactions ({', '.join(BETTING_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           tuple(tx[c] for c in BETTING_COLUMNS))
+            inserted_count += 1
+        except sqlite3.IntegrityError:
+            continue
+    conn.commit()
+    return inserted_count
+
+# First batch is new, the second overlaps it and repeats a hash within itself
+BATCHES = [make_bets(0, 40), make_bets(30, 25) + make_bets(50, 3)]
+
+def test_counts_match_per_row_insert():
+    baseline = sqlite3.connect(":memory:")
+    baseline.execute(TABLE_SQL)
+    bulk = sqlite3.connect(":memory:")
+    bulk.execute(TABLE_SQL)
+    # A batch size that does not divide the batches exercises partial executemany calls
+    writer = BulkWriter("betting_transactions", BETTING_COLUMNS, batch_size=7)
+
+    for batch in BATCHES:
+        expected = baseline_insert(baseline, batch)
+        inserted, skipped = writer.write_dicts(bulk, batch)
+        bulk.commit()
+        assert (inserted, skipped) == (expected, len(batch) - expected)
+
+    query = f"SELECT {', '.join(BETTING_COLUMNS)} FROM betting_transactions ORDER BY tx_hash"
+    assert bulk.execute(query).fetchall() == baseline.execute(query).fetchall()
+
+def test_betting_database_insert_counts(tmp_path):
+    baseline = sqlite3.connect(":memory:")
+    baseline.execute(TABLE_SQL)
+    db = BettingDatabase(str(tmp_path / "bets.db"), insert_batch_size=7)
+
+    for batch in BATCHES:
+        assert db.insert_transactions(batch) == baseline_insert(baseline, batch)
+
+    stored = db.get_all_transactions().sort_values('tx_hash')
+    expected = baseline.execute(f"SELECT {', '.join(BETTING_COLUMNS)} FROM betting_transactions ORDER BY tx_hash").fetchall()
+    assert [tuple(row) for row in stored[BETTING_COLUMNS].itertuples(index=False)] == expected
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Checks that an ingestion run interrupted mid-range only leaves committed
+batches behind (rows and checkpoint move together) and that resuming from the
+checkpoint ends with the same table as an uninterrupted run.
+"""
+
+import asyncio
+
+import pytest
+
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from modules.contracts import BETTING_COLUMNS
+
+def stored_rows(db):
+    return sorted(tuple(row) for row in db.get_all_transactions()[BETTING_COLUMNS].itertuples(index=False))
+
+def stored_blocks(db):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT block_number, timestamp FROM blocks ORDER BY block_number").fetchall()
+
+def test_resume_after_crash_matches_uninterrupted_run(tmp_path):
+    chain = FakeChain()
+
+    full = BettingDatabase(str(tmp_path / "full.db"))
+    asyncio.run(process_all_transactions(full, FakeHypersyncClient(chain, page_blocks=10)))
+    expected = stored_rows(full)
+    assert expected and full.get_last_processed_block() == chain.height
+
+    db = BettingDatabase(str(tmp_path / "resumed.db"), insert_batch_size=4)
+    with pytest.raises(ConnectionError):
+        asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain, page_blocks=10, fail_after=3),
+                                             queue_size=1))
+
+    # Everything below the checkpoint is stored and nothing at or above it
+    checkpoint = db.get_last_processed_block()
+    assert chain.blocks[0].number < checkpoint < chain.height
+    assert stored_rows(db) == [row for row in expected if row[-1] < checkpoint]
+
+    # A restart picks up at the checkpoint and only fetches what is left
+    client = FakeHypersyncClient(chain, page_blocks=10)
+    asyncio.run(process_all_transactions(db, client))
+    assert client.calls == -(-(chain.height - checkpoint) // 10)
+    assert stored_rows(db) == expected
+    assert stored_blocks(db) == stored_blocks(full)
+    assert db.get_last_processed_block() == chain.height
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Checks the top bettors read from the daily rollups against the original
+raw-row query, in timezones where local dates and UTC days differ.
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from json_query import FlexibleAnalytics
+from modules.compact_storage import blob_to_hex
+from modules.daily_rollups import ensure_daily_rollups
+
+# get_top_bettors before the rollups
+RAW_TOP_BETTORS = """
+    SELECT
+        from_address as user_address,
+        SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as total_mon,
+        SUM(CASE WHEN token = 'Jerry' THEN amount ELSE 0 END) as total_jerry,
+        SUM(amount) as total_bet,
+        ROUND(AVG(n_cards), 2) as avg_cards_per_slip,
+        COUNT(DISTINCT tx_hash) as total_bets,
+        COUNT(DISTINCT DATE(timestamp)) as active_days
+    FROM betting_transactions_v
+    GROUP BY from_address
+    ORDER BY total_bets DESC
+"""
+
+@pytest.fixture(params=['UTC', 'America/New_York', 'Asia/Tokyo'])
+def timezone(request):
+    previous = os.environ.get('TZ')
+    os.environ['TZ'] = request.param
+    time.tzset()
+    yield request.param
+    if previous is None:
+        del os.environ['TZ']
+    else:
+        os.environ['TZ'] = previous
+    time.tzset()
+
+def by_address(rows):
+    """Top bettor rows keyed by address, floats rounded (sums differ in order only)."""
+    return {blob_to_hex(row[0]): tuple(round(v, 9) if isinstance(v, float) else v for v in row[1:]) for row in rows}
+
+def top_bettors(db_path):
+    with FlexibleAnalytics(db_path) as analytics:
+        bettors = analytics.get_top_bettors()
+    assert [b['rank'] for b in bettors] == list(range(1, len(bettors) + 1))
+    assert [b['total_bets'] for b in bettors] == sorted((b['total_bets'] for b in bettors), reverse=True)
+    return by_address([(b['user_address'], b['total_mon'], b['total_jerry'], b['total_bet'],
+                        b['avg_cards_per_slip'], b['total_bets'], b['active_days']) for b in bettors])
+
+def test_top_bettors_match_raw_rows(tmp_path, timezone):
+    db = BettingDatabase(str(tmp_path / "bets.db"))
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(FakeChain(num_blocks=200))))
+    with db.get_connection() as conn:
+        expected = by_address(conn.execute(RAW_TOP_BETTORS).fetchall())
+        utc_days = dict(conn.execute("SELECT wallet_id, COUNT(DISTINCT day_id) FROM betting_transactions GROUP BY wallet_id"))
+
+    assert top_bettors(db.db_path) == expected
+    if timezone != 'UTC':
+        # Counting UTC days would give other active_days here
+        assert sorted(utc_days.values()) != sorted(row[-1] for row in expected.values())
+
+    # Rollups created before local_day existed are refilled on open
+    with db.get_connection() as conn:
+        conn.execute("DROP TABLE daily_wallet_stats")
+        conn.execute("""CREATE TABLE daily_wallet_stats (day_id INTEGER, wallet_id INTEGER, submissions INTEGER,
+                        mon_amount REAL, jerry_amount REAL, amount REAL, cards INTEGER)""")
+        ensure_daily_rollups(conn)
+        conn.commit()
+    assert top_bettors(db.db_path) == expected
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Checks the single combined bets query against the two original MON / Jerry
+queries, and the Arrow decoders against the row decoders, on the synthetic
+chain from chain_fixture.py. Rows are compared as stored in SQLite.
+"""
+
+import asyncio
+
+import pytest
+
+from betting_database import (BettingDatabase, build_bets_query, build_mon_query, build_jerry_query,
+                              decode_bets_response, decode_mon_response, decode_jerry_response)
+from claiming_database import ComprehensiveClaimingDatabase, build_claiming_query, decode_claiming_rows
+from chain_fixture import FakeChain, FakeHypersyncClient
+from modules.arrow_decode import decode_bets_arrow, decode_claiming_arrow
+from modules.contracts import BETTING_COLUMNS, CLAIMING_COLUMNS, CARDS_LOG_TOPIC_0
+
+@pytest.fixture
+def chain():
+    return FakeChain()
+
+def fetch(client, fetch_method, build_query):
+    chain = client.chain
+    return asyncio.run(getattr(client, fetch_method)(build_query(chain.blocks[0].number, chain.height)))
+
+def stored(db, rows, columns):
+    """Insert rows (dicts or an Arrow table) into a fresh database and read them back in tx_hash order."""
+    if isinstance(rows, list):
+        db.insert_transactions(rows)
+    else:
+        db.insert_arrow_batch(rows)
+    with db.get_connection() as conn:
+        return conn.execute(f"SELECT {', '.join(columns)} FROM {db.writer.table}_v ORDER BY tx_hash").fetchall()
+
+def test_combined_query_matches_split_queries(chain, tmp_path):
+    client = FakeHypersyncClient(chain)
+    split = (decode_mon_response(fetch(client, 'get', build_mon_query))
+             + decode_jerry_response(fetch(client, 'get', build_jerry_query)))
+    combined = decode_bets_response(fetch(client, 'get', build_bets_query))
+
+    # The MON query never returned logs, so its rows had bet_id 0; the combined
+    # query carries the cards events and fills it from their second indexed topic
+    bet_ids = {log.transaction_hash: int(log.topics[2], 16) for log in chain.logs
+               if log.topics[0] == CARDS_LOG_TOPIC_0}
+    for row in split:
+        if row['token'] == 'MON':
+            assert row['bet_id'] == 0
+            row['bet_id'] = bet_ids[row['tx_hash']]
+
+    expected = stored(BettingDatabase(str(tmp_path / "split.db")), split, BETTING_COLUMNS)
+    assert {row[4] for row in expected} == {'MON', 'Jerry'}
+    assert stored(BettingDatabase(str(tmp_path / "combined.db")), combined, BETTING_COLUMNS) == expected
+
+def test_bets_arrow_decoder_matches_row_decoder(chain, tmp_path):
+    client = FakeHypersyncClient(chain)
+    rows = decode_bets_response(fetch(client, 'get', build_bets_query))
+    batch = decode_bets_arrow(fetch(client, 'get_arrow', build_bets_query).data)
+
+    expected = stored(BettingDatabase(str(tmp_path / "rows.db")), rows, BETTING_COLUMNS)
+    assert stored(BettingDatabase(str(tmp_path / "arrow.db")), batch, BETTING_COLUMNS) == expected
+
+def test_claiming_arrow_decoder_matches_row_decoder(chain, tmp_path):
+    client = FakeHypersyncClient(chain)
+    rows = decode_claiming_rows(fetch(client, 'get', build_claiming_query))
+    batch = decode_claiming_arrow(fetch(client, 'get_arrow', build_claiming_query).data)
+
+    expected = stored(ComprehensiveClaimingDatabase(str(tmp_path / "rows.db")), rows, CLAIMING_COLUMNS)
+    assert {row[4] for row in expected} == {'MON', 'JERRY', 'RBSD'}
+    assert stored(ComprehensiveClaimingDatabase(str(tmp_path / "arrow.db")), batch, CLAIMING_COLUMNS) == expected
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Checks that wallet_first_seen picks the same first bet whatever order the rows
+arrive in (ties on the timestamp go to the lowest block, then tx_hash, also
+when the tied rows come in different batches), and
+that the new-user counts read from it match the groupby().min() over all rows
+they replaced. modules/database.py and its users import each other as
+top-level modules, so modules/ is put on the path like when they run.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from modules.daily_rollups import rebuild_daily_rollups
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'modules'))
+from database import BettingAnalyticsDB
+from multi_timeframe_analytics import MultiTimeframeAnalytics
+
+def transactions(count: int = 300):
+    """Bets of 13 wallets over ~40 days; every third one shares wallet and timestamp with the one before."""
+    start = datetime(2025, 6, 28, 21, 30)
+    rows = []
+    for i in range(count):
+        slot = i - (i % 3 == 2)
+        rows.append({
+            'tx_hash': f"0x{(i * 7919) % 1000003:064x}",
+            'origin_from_address': f"0x{1 + (slot * 5) % 13:040x}",
+            'bet_amt': 1.0 + i % 5,
+            'betting_token': 'MON' if i % 2 else 'Jerry',
+            'cards_in_slip': 2 + i % 4,
+            'bet_id_decoded': i,
+            'block_number': 1000 + (i * 37) % count,
+            'block_timestamp': start + timedelta(hours=3 * slot),
+        })
+    return rows
+
+def first_seen(db):
+    with db.get_connection() as conn:
+        return conn.execute("SELECT * FROM wallet_first_seen ORDER BY wallet").fetchall()
+
+def test_first_seen_does_not_depend_on_insert_order(tmp_path):
+    rows = transactions()
+    forward = BettingAnalyticsDB(str(tmp_path / "forward.db"))
+    for start in range(0, len(rows), 40):
+        forward.insert_transactions(rows[start:start + 40])
+    backward = BettingAnalyticsDB(str(tmp_path / "backward.db"))
+    for start in range(0, len(rows), 40):
+        backward.insert_transactions(rows[::-1][start:start + 40])
+
+    df = pd.DataFrame(rows)
+    df['first_ts'] = (df['block_timestamp'] - datetime(1970, 1, 1)) // timedelta(seconds=1)
+    first = df.sort_values(['first_ts', 'block_number', 'tx_hash']).groupby('origin_from_address').head(1)
+    expected = sorted(first[['origin_from_address', 'first_ts', 'block_number', 'tx_hash', 'betting_token']]
+                      .itertuples(index=False, name=None))
+    assert first_seen(forward) == expected
+    assert first_seen(backward) == expected
+
+def test_new_users_match_groupby_min(tmp_path):
+    rows = transactions()
+    db = BettingAnalyticsDB(str(tmp_path / "analytics.db"))
+    for start in range(0, len(rows), 40):
+        db.insert_transactions(rows[::-1][start:start + 40])
+    df = db.get_all_transactions()
+    first = df.groupby('origin_from_address')['block_timestamp'].min()
+
+    analytics = MultiTimeframeAnalytics(db.db_path)
+    for timeframe, period in (('D', lambda t: t.dt.date),
+                              ('W', lambda t: t.dt.to_period('W').dt.to_timestamp()),
+                              ('M', lambda t: t.dt.to_period('M').dt.to_timestamp())):
+        expected = period(first).value_counts().sort_index()
+        new_users = analytics.get_user_metrics_for_timeframe(timeframe)['new_users']
+        assert new_users[new_users > 0].to_dict() == expected.to_dict(), timeframe
+
+    # calculate_user_engagement_metrics takes this frame in place of its own groupby().min()
+    from_table = db.get_wallet_first_seen().set_index('origin_from_address')['first_tx_time']
+    assert from_table.sort_index().to_dict() == first.to_dict()
+
+def test_betting_first_seen_matches_raw_rows(tmp_path):
+    # MON and Jerry bets of a wallet share a block every sixth block
+    db = BettingDatabase(str(tmp_path / "bets.db"))
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(FakeChain(), page_blocks=5)))
+    with db.get_connection() as conn:
+        incremental = conn.execute("SELECT * FROM wallet_first_seen ORDER BY wallet").fetchall()
+        df = pd.read_sql_query("SELECT wallet_id, ts_epoch, timestamp, block_number, tx_hash, token "
+                               "FROM betting_transactions", conn)
+        rebuild_daily_rollups(conn)
+        assert conn.execute("SELECT * FROM wallet_first_seen ORDER BY wallet").fetchall() == incremental
+
+    first = df.sort_values(['ts_epoch', 'block_number', 'tx_hash']).groupby('wallet_id').head(1)
+    assert (first.set_index('wallet_id')['ts_epoch'].sort_index()
+            == df.groupby('wallet_id')['ts_epoch'].min()).all()
+    first_day = pd.to_datetime(first['timestamp'].str[:10]).sub(pd.Timestamp(0)).dt.days
+    expected = sorted(zip(first['wallet_id'], first['ts_epoch'], first_day, first['block_number'],
+                          first['tx_hash'], first['token']))
+    assert incremental == expected
+
+def test_same_block_tie_across_batches(tmp_path):
+    # Two bets of one wallet in the same block, inserted one batch each, in both orders
+    analytics_bets = [{'tx_hash': f"0x{n:064x}", 'origin_from_address': f"0x{0xaa:040x}", 'bet_amt': 1.0,
+                       'betting_token': token, 'cards_in_slip': 2, 'bet_id_decoded': n, 'block_number': 7,
+                       'block_timestamp': datetime(2025, 7, 1, 12)} for n, token in ((2, 'MON'), (1, 'Jerry'))]
+    betting_bets = [{'timestamp': datetime(2025, 7, 1, 12), 'tx_hash': f"0x{n:064x}", 'from_address': f"0x{0xaa:040x}",
+                     'to_address': f"0x{0xbb:040x}", 'token': token, 'amount': 1.0, 'n_cards': 2, 'bet_id': n,
+                     'block_number': 7} for n, token in ((2, 'MON'), (1, 'Jerry'))]
+    for name, order in (('forward', [0, 1]), ('backward', [1, 0])):
+        analytics = BettingAnalyticsDB(str(tmp_path / f"analytics_{name}.db"))
+        betting = BettingDatabase(str(tmp_path / f"bets_{name}.db"))
+        for i in order:
+            analytics.insert_transactions([analytics_bets[i]])
+            betting.insert_transactions([betting_bets[i]])
+        assert [row[-2:] for row in first_seen(analytics)] == [(f"0x{1:064x}", 'Jerry')], name
+        assert [row[-2:] for row in first_seen(betting)] == [(f"0x{1:064x}", 'Jerry')], name
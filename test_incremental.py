@@ -1,120 +1,73 @@
 #!/usr/bin/env python3
 """
-Test script to demonstrate incremental analytics functionality.
+Checks incremental analytics: a full generation over part of the synthetic
+chain, then the remaining blocks ingested and run_incremental_generation()
+merged into that dump, must give the same dump as a full generation over
+everything (compared with analytics_differences, metadata aside).
 """
 
+import asyncio
 import json
-import os
-from datetime import datetime, timedelta
-from json_query import FlexibleAnalytics, merge_analytics_data, load_existing_analytics
 
-def create_test_data():
-    """Create sample analytics data for testing."""
-    return {
-        "success": True,
-        "metadata": {
-            "generated_at": "2025-07-22T01:00:00.000000Z",
-            "timeframes_available": ["daily", "weekly", "monthly"],
-            "default_timeframe": "weekly",
-            "last_incremental_update": "2025-07-22T01:30:00.000000"
-        },
-        "total_metrics": {
-            "total_submissions": 100,
-            "total_active_addresses": 50,
-            "total_mon_volume": 1000.0,
-            "total_jerry_volume": 500.0,
-            "total_cards": 300
-        },
-        "average_metrics": {
-            "avg_submissions_per_day": 10.0,
-            "avg_cards_per_slip": 3.0,
-            "avg_players_per_day": 8.0
-        },
-        "timeframes": {
-            "daily": {
-                "activity_over_time": [
-                    {
-                        "period": 1,
-                        "start_date": "2025-07-21",
-                        "end_date": "2025-07-21",
-                        "submissions": 10,
-                        "active_addresses": 8,
-                        "total_cards": 30,
-                        "mon_volume": 100.0,
-                        "jerry_volume": 50.0,
-                        "total_volume": 150.0,
-                        "avg_cards_per_submission": 3.0,
-                        "avg_bet_amount": 15.0,
-                        "mon_transactions": 8,
-                        "jerry_transactions": 2
-                    }
-                ]
-            }
-        }
-    }
+import json_query
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from json_query import (ANALYTICS_START_DATE, FlexibleAnalytics, analytics_differences, generation_watermark,
+                        run_full_generation, run_incremental_generation, save_analytics_checkpoint)
 
-def create_test_transactions():
-    """Create sample new transactions."""
-    return [
-        {
-            "tx_hash": "0x1234567890abcdef",
-            "from_address": "0xabcdef1234567890",
-            "token": "MON",
-            "amount": 25.0,
-            "n_cards": 2,
-            "timestamp": "2025-07-22T02:00:00.000000"
-        },
-        {
-            "tx_hash": "0x0987654321fedcba",
-            "from_address": "0xfedcba0987654321",
-            "token": "Jerry",
-            "amount": 15.0,
-            "n_cards": 1,
-            "timestamp": "2025-07-22T03:00:00.000000"
-        }
-    ]
+def as_written(data):
+    """The dump as read back from its JSON file."""
+    return json.loads(json.dumps(data))
 
-def test_incremental_update():
-    """Test the incremental update functionality."""
-    print("🧪 Testing Incremental Analytics System")
-    print("=" * 50)
-    
-    # Create test data
-    existing_data = create_test_data()
-    new_transactions = create_test_transactions()
-    since_timestamp = "2025-07-22T01:30:00.000000"
-    
-    print(f"📊 Original total submissions: {existing_data['total_metrics']['total_submissions']}")
-    print(f"📊 Original total cards: {existing_data['total_metrics']['total_cards']}")
-    print(f"📊 Original MON volume: {existing_data['total_metrics']['total_mon_volume']}")
-    print(f"📊 Original Jerry volume: {existing_data['total_metrics']['total_jerry_volume']}")
-    
-    print(f"\n🔄 New transactions to process: {len(new_transactions)}")
-    for tx in new_transactions:
-        print(f"  - {tx['token']}: {tx['amount']} ({tx['n_cards']} cards)")
-    
-    # Perform incremental update
-    print(f"\n🔄 Performing incremental update...")
-    updated_data = merge_analytics_data(existing_data, new_transactions, since_timestamp)
-    
-    if updated_data:
-        print(f"\n✅ Incremental update successful!")
-        print(f"📊 Updated total submissions: {updated_data['total_metrics']['total_submissions']}")
-        print(f"📊 Updated total cards: {updated_data['total_metrics']['total_cards']}")
-        print(f"📊 Updated MON volume: {updated_data['total_metrics']['total_mon_volume']}")
-        print(f"📊 Updated Jerry volume: {updated_data['total_metrics']['total_jerry_volume']}")
-        
-        # Check if periods were updated
-        daily_data = updated_data['timeframes']['daily']['activity_over_time']
-        for period in daily_data:
-            if period['start_date'] == "2025-07-21":
-                print(f"📅 Period {period['start_date']} updated:")
-                print(f"  - Submissions: {period['submissions']}")
-                print(f"  - Total cards: {period['total_cards']}")
-                print(f"  - Total volume: {period['total_volume']}")
-                break
-    else:
-        print("❌ Incremental update failed!")
+def full_generation(db_path: str, generated_at: str):
+    """A full generation of db_path written as the existing dump, with its checkpoint."""
+    with FlexibleAnalytics(db_path) as analytics:
+        watermark = generation_watermark(analytics)
+    data = run_full_generation(1, generated_at)
+    with open(json_query.FRONTEND_PUBLIC, 'w') as f:
+        json.dump(data, f)
+    save_analytics_checkpoint(watermark, data['metadata']['generated_at'], ANALYTICS_START_DATE)
+    return data
 
-if __name__ == "__main__":
-    test_incremental_update() 
\ No newline at end of file
+def incremental_generation(db_path: str):
+    with FlexibleAnalytics(db_path) as analytics:
+        return run_incremental_generation(analytics, 1)
+
+def test_incremental_merge_matches_full_rebuild(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "bets.db")
+    monkeypatch.setattr(json_query, 'DB_PATH', db_path)
+    monkeypatch.setattr(json_query, 'FRONTEND_PUBLIC', str(tmp_path / "analytics_dump.json"))
+    monkeypatch.setattr(json_query, 'CHECKPOINT_FILE', str(tmp_path / "analytics_checkpoint.json"))
+
+    chain = FakeChain()
+    db = BettingDatabase(db_path)
+    # Stops mid-day, so the incremental run recomputes periods the first dump already has
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain), end_block=chain.blocks[35].number))
+    first = full_generation(db_path, "2025-07-02T03:00:00")
+
+    # Nothing added: only the rolling windows are recomputed
+    merged = incremental_generation(db_path)
+    assert merged['metadata']['full_generation'] is False
+    assert analytics_differences(as_written(first), as_written(merged)) == []
+
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain)))
+    merged = incremental_generation(db_path)
+    assert merged['metadata']['full_generation'] is False
+    expected = run_full_generation(1, "2025-07-03T03:00:00")
+    assert analytics_differences(as_written(first), as_written(expected)) != []
+    assert analytics_differences(as_written(expected), as_written(merged)) == []
+
+def test_rollback_falls_back_to_full_generation(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "bets.db")
+    monkeypatch.setattr(json_query, 'DB_PATH', db_path)
+    monkeypatch.setattr(json_query, 'FRONTEND_PUBLIC', str(tmp_path / "analytics_dump.json"))
+    monkeypatch.setattr(json_query, 'CHECKPOINT_FILE', str(tmp_path / "analytics_checkpoint.json"))
+
+    chain = FakeChain()
+    db = BettingDatabase(db_path)
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain)))
+    full_generation(db_path, "2025-07-03T03:00:00")
+
+    # The checkpointed last row is gone, the dump cannot be patched
+    db.rollback_to_block(chain.blocks[35].number)
+    assert incremental_generation(db_path) is None
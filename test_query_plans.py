@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Checks with EXPLAIN QUERY PLAN that the date-filtered queries of
+custom_range_query.py, claiming_custom_range_query.py and claiming_query.py
+search the fact table through idx_day_id instead of scanning it. The
+statements are captured as executed (parameters expanded) on databases
+ingested from the synthetic chain.
+"""
+
+import asyncio
+import sqlite3
+
+import pytest
+
+import claiming_custom_range_query
+import custom_range_query
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from claiming_database import ComprehensiveClaimingDatabase, process_all_claiming_transactions
+from claiming_query import ClaimingAnalytics
+
+START_DATE, END_DATE = '2025-07-01', '2025-07-02'
+
+@pytest.fixture
+def databases(tmp_path):
+    chain = FakeChain()
+    betting = BettingDatabase(str(tmp_path / "bets.db"))
+    asyncio.run(process_all_transactions(betting, FakeHypersyncClient(chain)))
+    claiming = ComprehensiveClaimingDatabase(str(tmp_path / "claims.db"))
+    asyncio.run(process_all_claiming_transactions(claiming, FakeHypersyncClient(chain)))
+    return betting.db_path, claiming.db_path
+
+def trace(monkeypatch, module, db_path):
+    """Point module at db_path and record the statements run on its connections."""
+    statements = []
+    connect = module.get_connection
+    def get_connection():
+        conn = connect()
+        conn.set_trace_callback(statements.append)
+        return conn
+    monkeypatch.setattr(module, 'DB_PATH', db_path)
+    monkeypatch.setattr(module, 'get_connection', get_connection)
+    return statements
+
+def assert_day_id_searches(db_path, statements, table):
+    """
+    Every captured statement filtering on day_id searches table on an
+    idx_day_id range and never reads it in a plain table scan. (The all-time first claims of
+    claiming_query.py walk idx_wallet_id, that is not a date filter.)
+    """
+    filtered = [sql for sql in statements if 'day_id >=' in sql]
+    assert filtered
+    conn = sqlite3.connect(db_path)
+    try:
+        for sql in filtered:
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            # Both ends of the half-open range bound the index search
+            assert any('INDEX idx_day_id (day_id>? AND day_id<?)' in step for step in plan), plan
+            assert not any(step in (f'SCAN {table}', 'SCAN t') for step in plan), plan
+    finally:
+        conn.close()
+
+@pytest.mark.parametrize('module, which, table', [
+    (custom_range_query, 0, 'betting_transactions'),
+    (claiming_custom_range_query, 1, 'claiming_transactions'),
+])
+def test_custom_range_queries_use_day_id_index(databases, monkeypatch, module, which, table):
+    db_path = databases[which]
+    statements = trace(monkeypatch, module, db_path)
+    assert module.get_custom_range_metrics(START_DATE, END_DATE)
+    assert module.get_daily_activity(START_DATE, END_DATE)
+    assert len([sql for sql in statements if 'day_id >=' in sql]) == 2
+    assert_day_id_searches(db_path, statements, table)
+
+def test_claiming_period_queries_use_day_id_index(databases):
+    db_path = databases[1]
+    statements = []
+    with ClaimingAnalytics(db_path) as analytics:
+        analytics.conn.set_trace_callback(statements.append)
+        for timeframe in ('day', 'week', 'month'):
+            assert analytics.get_activity_over_time('2025-06-30', timeframe)
+        assert analytics.get_claiming_stats_by_periods()
+    assert_day_id_searches(db_path, statements, 'claiming_transactions')
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Checks reorg handling: ReorgGuard's fork block, that a reorg deeper than the
+tracked blocks stops follow mode, and that rollback_to_block leaves rows,
+rollups, wallets and first-seen entries as if the orphaned blocks had never
+been ingested.
+"""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from betting_database import BettingDatabase, process_all_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from modules.follow_loop import follow_chain
+from modules.reorg_guard import ReorgGuard, ReorgTooDeepError
+
+class BranchClient:
+    """Serves block hashes of a chain whose blocks from fork_block up belong to branch."""
+
+    def __init__(self, height: int = 100):
+        self.height = height
+        self.fork_block = None
+        self.branch = 'a'
+
+    async def get_height(self) -> int:
+        return self.height
+
+    def block_hash(self, number: int) -> str:
+        branch = self.branch if self.fork_block is not None and number >= self.fork_block else 'a'
+        return f"0x{branch}{number:063x}"
+
+    async def get(self, query):
+        blocks = [SimpleNamespace(number=n, hash=self.block_hash(n), parent_hash=self.block_hash(n - 1))
+                  for n in range(query.from_block, query.to_block)]
+        return SimpleNamespace(data=SimpleNamespace(blocks=blocks), next_block=query.to_block, rollback_guard=None)
+
+def test_fork_block(tmp_path):
+    client = BranchClient()
+    guard = ReorgGuard(client, BettingDatabase(str(tmp_path / "bets.db")), depth=10)
+    assert asyncio.run(guard.check(100)) is None
+
+    client.fork_block, client.branch = 95, 'b'
+    assert asyncio.run(guard.check(100)) == 95
+
+def test_reorg_past_tracked_blocks_stops_following(tmp_path):
+    client = BranchClient()
+    db = BettingDatabase(str(tmp_path / "bets.db"))
+    guard = ReorgGuard(client, db, depth=10)
+    assert asyncio.run(guard.check(100)) is None
+
+    # Every tracked block (90-99) changed: the fork is somewhere at or below 90
+    client.fork_block, client.branch = 50, 'c'
+    with pytest.raises(ReorgTooDeepError) as error:
+        asyncio.run(guard.check(100))
+    assert error.value.oldest_block == 90
+    # Nothing was overwritten, the next check still sees the mismatch
+    with pytest.raises(ReorgTooDeepError):
+        asyncio.run(guard.check(100))
+
+    # follow_chain retries other errors, this one ends it before anything is rolled back
+    async def step(height):
+        await guard.protect(height)
+        return 0
+    with pytest.raises(ReorgTooDeepError):
+        asyncio.run(follow_chain(client, {'bets': step}, poll_interval=0, max_polls=3))
+    with db.get_connection() as conn:
+        assert conn.execute("SELECT MIN(block_number), MAX(block_number) FROM recent_blocks").fetchone() == (90, 99)
+
+SNAPSHOT_QUERIES = [
+    "SELECT tx_hash, wallet_id, ts_epoch, day_id FROM betting_transactions ORDER BY tx_hash",
+    "SELECT id, address FROM wallets ORDER BY id",
+    """SELECT day_id, token, n_cards, submissions, ROUND(amount, 9), cards
+       FROM daily_token_stats ORDER BY day_id, token, n_cards""",
+    """SELECT day_id, wallet_id, local_day, submissions, ROUND(mon_amount, 9), ROUND(jerry_amount, 9),
+              ROUND(amount, 9), cards
+       FROM daily_wallet_stats ORDER BY day_id, wallet_id, local_day""",
+    "SELECT * FROM wallet_first_seen ORDER BY wallet",
+    "SELECT * FROM blocks ORDER BY block_number",
+]
+
+def snapshot(db):
+    with db.get_connection() as conn:
+        return [conn.execute(query).fetchall() for query in SNAPSHOT_QUERIES]
+
+def test_rollback_matches_ingesting_up_to_the_fork(tmp_path):
+    chain = FakeChain()
+    fork_block = chain.blocks[40].number
+
+    expected = BettingDatabase(str(tmp_path / "expected.db"))
+    asyncio.run(process_all_transactions(expected, FakeHypersyncClient(chain), end_block=fork_block))
+
+    db = BettingDatabase(str(tmp_path / "rolled_back.db"))
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain), end_block=fork_block))
+    asyncio.run(process_all_transactions(db, FakeHypersyncClient(chain)))
+    # A wallet that only bet on the orphaned branch
+    db.insert_transactions([{
+        'timestamp': datetime.fromtimestamp(int(chain.blocks[-1].timestamp, 16)),
+        'tx_hash': f"0x{0xff:064x}", 'from_address': f"0x{0xabc:040x}",
+        'to_address': '0x3ad50059d6008b711209a509fe58e68f0b672a42', 'token': 'MON',
+        'amount': 1.0, 'n_cards': 2, 'bet_id': 1, 'block_number': chain.blocks[-1].number,
+    }])
+    assert snapshot(db) != snapshot(expected)
+
+    db.rollback_to_block(fork_block)
+    assert db.get_last_processed_block() == fork_block
+    assert snapshot(db) == snapshot(expected)
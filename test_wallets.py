@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Checks that the wallet-id based user counts match the original
+COUNT(DISTINCT from_address) queries, also after a rollback, and that a table
+from before wallet ids loses from_address on open while its _v view, and the
+rows written afterwards (also in the compact format), keep their addresses.
+"""
+
+import asyncio
+import sqlite3
+
+from betting_database import BettingDatabase, process_all_transactions
+from claiming_database import ComprehensiveClaimingDatabase, process_all_claiming_transactions
+from chain_fixture import FakeChain, FakeHypersyncClient
+from compact_database import migrate
+from modules.compact_storage import blob_to_hex
+from modules.contracts import BETTING_COLUMNS
+
+def distinct_addresses(db, table):
+    with db.get_connection() as conn:
+        return conn.execute(f"SELECT COUNT(DISTINCT from_address) FROM {table}_v").fetchone()[0]
+
+def test_unique_users_match_distinct_addresses(tmp_path):
+    # More wallets than bets in the last blocks, so a rollback orphans some of them
+    chain = FakeChain(wallets=41)
+    betting = BettingDatabase(str(tmp_path / "bets.db"))
+    asyncio.run(process_all_transactions(betting, FakeHypersyncClient(chain)))
+    claiming = ComprehensiveClaimingDatabase(str(tmp_path / "claims.db"))
+    asyncio.run(process_all_claiming_transactions(claiming, FakeHypersyncClient(chain)))
+
+    for db, table in ((betting, "betting_transactions"), (claiming, "claiming_transactions")):
+        users = db.get_database_stats()['unique_users']
+        assert users == distinct_addresses(db, table)
+
+        db.rollback_to_block(chain.blocks[45].number)
+        assert db.get_database_stats()['unique_users'] == distinct_addresses(db, table) < users
+
+def bet(i: int):
+    return {'timestamp': f"2025-07-{1 + i % 3:02d} {i % 24:02d}:00:00", 'tx_hash': f"0x{i:064x}",
+            'from_address': f"0x{i % 4:040x}", 'to_address': f"0x{0xbb:040x}", 'token': 'MON' if i % 2 else 'Jerry',
+            'amount': 1.0 + i, 'n_cards': 2, 'bet_id': i, 'block_number': 100 + i}
+
+def view_rows(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"SELECT {', '.join(BETTING_COLUMNS)} FROM betting_transactions_v ORDER BY tx_hash")
+        return [tuple(blob_to_hex(value) for value in row) for row in rows]
+    finally:
+        conn.close()
+
+def test_legacy_table_migrates_to_wallet_ids(tmp_path):
+    # The table as created before wallet ids
+    db_path = str(tmp_path / "bets.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE betting_transactions (
+            timestamp DATETIME NOT NULL, tx_hash TEXT PRIMARY KEY, from_address TEXT NOT NULL,
+            to_address TEXT NOT NULL, token TEXT NOT NULL, amount REAL NOT NULL, n_cards INTEGER NOT NULL,
+            bet_id INTEGER NOT NULL, block_number INTEGER NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX idx_from_address ON betting_transactions(from_address)")
+    conn.executemany(f"INSERT INTO betting_transactions ({', '.join(BETTING_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' for _ in BETTING_COLUMNS)})",
+                     [tuple(bet(i)[c] for c in BETTING_COLUMNS) for i in range(10)])
+    conn.commit()
+    conn.close()
+    expected = [tuple(bet(i)[c] for c in BETTING_COLUMNS) for i in range(14)]
+
+    db = BettingDatabase(db_path)
+    with db.get_connection() as conn:
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(betting_transactions)")]
+    assert 'from_address' not in columns and 'wallet_id' in columns
+    assert view_rows(db_path) == expected[:10]
+
+    db.insert_transactions([bet(i) for i in range(8, 12)])
+    assert view_rows(db_path) == expected[:12]
+    assert db.get_database_stats()['unique_users'] == 4
+
+    compact_path = str(tmp_path / "bets.compact.db")
+    assert migrate(db_path, compact_path, benchmark=False)
+    compact = BettingDatabase(compact_path)
+    compact.insert_transactions([bet(i) for i in range(10, 14)])
+    assert view_rows(compact_path) == expected
+    # Known addresses are found in their BLOB form instead of registered again
+    assert compact.get_database_stats()['unique_users'] == 4
+    assert compact.get_all_transactions()[BETTING_COLUMNS].to_records(index=False).tolist() == sorted(
+        expected, key=lambda row: row[0])
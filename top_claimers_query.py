@@ -14,6 +14,8 @@ from datetime import datetime
 from typing import Dict, List, Any
 from dotenv import load_dotenv
 
+from modules.compact_storage import blob_to_hex, address_param
+
 # Load environment variables
 load_dotenv()
 
@@ -65,7 +67,7 @@ def get_top_claimers(limit: int = 20) -> List[Dict[str, Any]]:
         print(f"Claiming block range in database: {block_range[0]} to {block_range[1]}")
         
         # Debug: Check sample data
-        cursor_claiming.execute("SELECT * FROM claiming_transactions LIMIT 3")
+        cursor_claiming.execute("SELECT * FROM claiming_transactions_v LIMIT 3")
         sample_data = cursor_claiming.fetchone()
         print(f"Sample claiming data: {sample_data}")
         
@@ -73,7 +75,7 @@ def get_top_claimers(limit: int = 20) -> List[Dict[str, Any]]:
         query = """
         WITH claimer_stats AS (
             SELECT 
-                from_address as usr,
+                wallet_id,
                 SUM(CASE WHEN token = 'MON' THEN amount ELSE 0 END) as mon_claimed,
                 SUM(CASE WHEN token = 'JERRY' THEN amount ELSE 0 END) as jerry_claimed,
                 COUNT(CASE WHEN token = 'MON' THEN 1 END) as mon_claims,
@@ -81,11 +83,11 @@ def get_top_claimers(limit: int = 20) -> List[Dict[str, Any]]:
                 COUNT(*) as total_claims,
                 AVG(amount) as avg_claim_amount
             FROM claiming_transactions
-            GROUP BY from_address
+            GROUP BY wallet_id
         )
         
         SELECT 
-            usr,
+            w.address as usr,
             mon_claimed,
             jerry_claimed,
             (mon_claimed + jerry_claimed) as total_claimed,
@@ -94,6 +96,7 @@ def get_top_claimers(limit: int = 20) -> List[Dict[str, Any]]:
             total_claims,
             avg_claim_amount
         FROM claimer_stats
+        JOIN wallets w ON w.id = claimer_stats.wallet_id
         WHERE (mon_claimed + jerry_claimed) > 0
         ORDER BY (mon_claimed + jerry_claimed) DESC
         LIMIT ?
@@ -118,8 +121,8 @@ def get_top_claimers(limit: int = 20) -> List[Dict[str, Any]]:
                     COUNT(*) as total_submissions,
                     AVG(n_cards) as avg_slip_size
                 FROM betting_transactions
-                WHERE from_address = ?
-            """, (usr,))
+                WHERE wallet_id = (SELECT id FROM wallets WHERE address = ?)
+            """, (address_param(conn_betting, usr),))
             
             betting_result = cursor_betting.fetchone()
             mon_bet = betting_result[0] if betting_result and betting_result[0] else 0
@@ -136,7 +139,7 @@ def get_top_claimers(limit: int = 20) -> List[Dict[str, Any]]:
             profit_percentage = ((total_claimed - total_bet) / total_bet * 100) if total_bet > 0 else 0
             
             claimer_data = {
-                'address': usr,
+                'address': blob_to_hex(usr),
                 'mon_claimed': mon_claimed,
                 'jerry_claimed': jerry_claimed,
                 'total_claimed': total_claimed,
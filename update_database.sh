@@ -116,7 +116,7 @@ fi
 
 # Generate updated betting analytics JSON
 log_message "Generating betting analytics JSON..."
-python3 json_query.py
+python3 json_query.py --incremental
 
 if [ $? -eq 0 ]; then
     log_message "Betting analytics JSON generated successfully"